@@ -0,0 +1,130 @@
+"""
+Benchmark of the all-quarters top N figure: SVG traces (a glow and a line per
+title) against the high-capacity mode (WebGL lines and a single glow trace),
+at N = 18, 100 and 500.
+
+The build time and the payload sent to the browser are measured here. The
+render time needs a browser: the benchmark writes a page with the figures that
+times the first draw (Plotly.newPlot) and the redraws of a pan of each figure.
+
+Usage:
+    python benchmarks/bench_all_quarters.py [--html bench_all_quarters.html]
+    (then open the page in a browser)
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+from diff13f import app
+from synthetic import make_filing
+
+CIK        = "0000000001"
+N_QUARTERS = 40
+N_ROWS     = 1_500
+TOP_N      = [18, 100, 500]
+N_REPEATS  = 3
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><script>{plotlyjs}</script></head>
+<body style="background: black; color: white; font-family: monospace">
+<pre id="results">Rendering...</pre>
+<div id="graph"></div>
+<script>
+const figures = {figures};
+const frame = () => new Promise(resolve => requestAnimationFrame(() => requestAnimationFrame(resolve)));
+(async () => {{
+    const lines = ["   N mode    | traces | first draw ms | pan redraw ms"];
+    for (const figure of figures) {{
+        const graph = document.getElementById("graph");
+        Plotly.purge(graph);
+        let t0 = performance.now();
+        await Plotly.newPlot(graph, figure.data, figure.layout);
+        await frame();
+        const draw = performance.now() - t0;
+        // Pan of the x axis by one quarter per redraw
+        t0 = performance.now();
+        for (let i = 0; i < 20; i++) {{
+            await Plotly.relayout(graph, {{"xaxis.range": [i / 2, {n_quarters} - 1 + i / 2]}});
+            await frame();
+        }}
+        const redraw = (performance.now() - t0) / 20;
+        lines.push(`${{String(figure.top_n).padStart(4)}} ${{figure.mode.padEnd(7)}} | ${{String(figure.data.length).padStart(6)}} | ${{draw.toFixed(1).padStart(13)}} | ${{redraw.toFixed(1).padStart(13)}}`);
+        document.getElementById("results").textContent = lines.join("\\n");
+    }}
+}})();
+</script>
+</body>
+</html>
+"""
+
+def write_filings(
+    path,
+):
+    # One 13F-HR per quarter
+    for i in range(N_QUARTERS):
+        year, q = 2010 + i // 4, i % 4 + 1
+        period = f"{year}{3*q:02d}{30 if q in (2, 3) else 31}"
+        with open(os.path.join(path, f"{i}.txt"), "w") as f:
+            f.write(make_filing(
+                n_rows    = N_ROWS,
+                cik       = CIK,
+                period    = period,
+                filed     = f"{year + (q == 4)}{(3*q) % 12 + 2:02d}14",
+                accession = f"{CIK}-{year % 100:02d}-{i:06d}",
+                seed      = i,
+            ))
+
+def build(
+    top_n,
+    high_capacity,
+):
+    # Best build time of the figure (holdings in the cache) and its JSON
+    best = float("inf")
+    for _ in range(N_REPEATS):
+        t0 = time.perf_counter()
+        fig = app.generate_all_quarters_top_n_figure(CIK, top_n=top_n, high_capacity=high_capacity)
+        best = min(best, time.perf_counter() - t0)
+    return fig, best, pio.to_json(fig)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--html", default="bench_all_quarters.html")
+    args = parser.parse_args()
+    html_path = os.path.abspath(args.html)
+    cwd = os.getcwd()
+    figures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            os.makedirs("filings")
+            write_filings("filings")
+            app.ingest_paths(["filings"])
+            print(f"{N_QUARTERS} quarters of {N_ROWS} rows")
+            print(f"{'N':>4} | {'SVG traces':>10} {'kB':>6} {'build s':>7} | {'WebGL traces':>12} {'kB':>6} {'build s':>7}")
+            for top_n in TOP_N:
+                row = f"{top_n:>4}"
+                for high_capacity, mode in [(False, "svg"), (True, "webgl")]:
+                    fig, elapsed, figure_json = build(top_n, high_capacity)
+                    width = 10 if mode=="svg" else 12
+                    row += f" | {len(fig.data):>{width}} {len(figure_json)/1e3:>6.0f} {elapsed:>7.3f}"
+                    figures.append(dict(json.loads(figure_json), top_n=top_n, mode=mode))
+                print(row)
+        finally:
+            os.chdir(cwd)
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(PAGE.format(
+            plotlyjs   = get_plotlyjs(),
+            figures    = json.dumps(figures),
+            n_quarters = N_QUARTERS,
+        ))
+    print(f"Open {html_path} in a browser for the render times.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark of the import of a Form 13F data set of the SEC.
+
+A synthetic data set is written first (the INFOTABLE table has n_filers x
+n_rows rows), then each measure imports it in a fresh subprocess and reports
+the time, the throughput and the increase of the peak RSS, with and without
+a memory limit. The peak RSS should not grow with the size of the data set.
+
+Usage:
+    python benchmarks/bench_bulk.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+from synthetic import write_bulk_dataset
+
+N_ROWS = 2_000
+
+CODE = """
+import os, resource, sys, time
+from diff13f import app
+os.chdir({tmp!r})
+if {memory_limit_mb!r} is not None:
+    app.set_memory_limit({memory_limit_mb!r})
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+report = app.ingest_bulk_dataset({path!r})
+rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(report['n_rows'], report['seconds_parse'], report['seconds'], rss_after - rss_before)
+"""
+
+def measure(
+    path,
+    memory_limit_mb,
+):
+    with tempfile.TemporaryDirectory() as tmp:
+        output = subprocess.run(
+            [sys.executable, "-c", CODE.format(tmp=tmp, path=path, memory_limit_mb=memory_limit_mb)],
+            capture_output = True,
+            text           = True,
+            check          = True,
+        ).stdout.split()
+    # ru_maxrss is in kilobytes on Linux
+    return int(output[0]), float(output[1]), float(output[2]), int(output[3]) / 1024
+
+def main():
+    print(f"{'rows':>9} {'TSV MB':>7} | {'limit MB':>8} | {'parse s':>8} {'total s':>8} {'rows/s':>10} | {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_filers in [50, 250, 500]:
+            path = os.path.join(tmp, f"{n_filers}.zip")
+            write_bulk_dataset(path, n_filers, N_ROWS)
+            tsv_size = zipfile.ZipFile(path).getinfo("INFOTABLE.tsv").file_size
+            for memory_limit_mb in [None, 8]:
+                n_rows, t_parse, t_total, rss = measure(path, memory_limit_mb)
+                print(
+                    f"{n_rows:>9,} {tsv_size/1e6:>7.1f} | {str(memory_limit_mb):>8} | {t_parse:>8.2f} {t_total:>8.2f} {n_rows/t_total:>10,.0f} | {rss:>8.1f}"
+                )
+
+if __name__ == "__main__":
+    main()
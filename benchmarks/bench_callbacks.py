@@ -0,0 +1,399 @@
+"""
+Benchmark of the latency of a CIK switch in the dashboard: the former
+monolithic callback against the tab-aware callbacks.
+
+The former update_latest_company_name is copied below, with the one quarter
+and two quarters figure generators it called: on a CIK switch it builds the
+figures of the three tabs (and the all-quarters top N figure that it throws
+away). The new callbacks update the quarter dropdowns and send the
+proportion matrix of the cik, from which the browser renders the one quarter
+and two quarters figures; the all-quarters figure is only rendered if its tab
+is shown. Each switch is timed end to end through the Dash endpoint of the
+server, with cold caches, and summed over all the requests the browser sends
+for it. A change of quarter makes a request with the former callback and none
+with the new ones (the figure is ranked in the browser, see assets/quarters.js).
+
+Usage:
+    python benchmarks/bench_callbacks.py
+"""
+
+import os
+import tempfile
+import time
+
+import plotly.express as px
+import polars as pl
+from dash import Dash, html, Input, Output, callback_context, no_update
+
+from diff13f import app
+from synthetic import make_filing
+
+CIK_LIST   = ["0000000001", "0000000002"]
+N_QUARTERS = 16
+N_ROWS     = 2_000
+N_REPEATS  = 3
+
+def write_filings(
+    path,
+):
+    # One 13F-HR per quarter and per cik
+    for cik in CIK_LIST:
+        for i in range(N_QUARTERS):
+            year, q = 2015 + i // 4, i % 4 + 1
+            period = f"{year}{3*q:02d}{30 if q in (2, 3) else 31}"
+            with open(os.path.join(path, f"{cik}_{i}.txt"), "w") as f:
+                f.write(make_filing(
+                    n_rows    = N_ROWS,
+                    cik       = cik,
+                    period    = period,
+                    filed     = f"{year + (q == 4)}{(3*q) % 12 + 2:02d}14",
+                    accession = f"{cik}-{year % 100:02d}-{i:06d}",
+                    seed      = i,
+                ))
+
+def legacy_generate_one_quarter_figure(
+    cik,
+    quarter,
+    merge_key = 'name',
+    top_n     = 20,
+):
+    # Former generate_one_quarter_figure (the figure is now rendered in the browser)
+    if (not cik) or (not quarter):
+        if not cik:
+            title = "Select a CIK"
+        elif not quarter:
+            title = "Select a quarter"
+        return app.generate_default_figure(
+            title = title,
+        )
+
+    # Take the data corresponding to that quarter
+    df = app.query_holdings(
+        cik             = cik,
+        merge_key       = merge_key,
+        target_variable = 'proportion',
+        quarters        = [quarter],
+    ).filter(
+        pl.col(quarter).is_not_null()
+    )
+    # Sort and top N and convert to Pandas for Plotly
+    df = df.sort(
+        quarter,
+        descending = True,
+    ).head(
+        top_n
+    ).to_pandas()
+    # Rename the column
+    df.rename(columns={quarter: "proportion"}, inplace=True)
+    # Créer une colonne pour les noms complets
+    df["full_name"] = df[merge_key]
+    # Tronquer les noms trop longs
+    max_chars = 30
+    df[merge_key] = df[merge_key].apply(
+        lambda x: x if len(x) <= max_chars else x[:max_chars-1] + "\u2026"
+    )
+    # Création du barplot cyberpunk
+    fig = px.bar(
+        data_frame  = df,
+        x           = 'proportion',
+        y           = merge_key,
+        orientation = 'h',
+        hover_data  = {
+            'full_name': True,
+            'proportion': ':.2f',
+        },
+    )
+    fig.update_layout(
+        title={
+            "text": f"Top {top_n} Holdings for {quarter}",
+            "x": 0.5,
+            "y": 0.95,
+            "xanchor": "center",
+            "yanchor": "top",
+            "font": {
+                "family": "monospace",
+                "size": 20,
+                "color": "white",
+            },
+        },
+        font = dict(
+            family = 'monospace',
+            color = 'white',
+            size = 12,
+        ),
+        autosize      = True,
+        height        = app.FIG_HEIGHT,
+        width         = app.FIG_WIDTH,
+        plot_bgcolor  = "black",
+        paper_bgcolor = "black",
+        xaxis_title   = "Percentage",
+        yaxis_title   = "Name",
+        margin        = dict(l=40, r=40, t=60, b=40),
+    )
+    fig.update_traces(
+        marker_color  = "#00ffcc",
+        textposition  = "outside",
+        hovertemplate = "<b>%{customdata[0]}</b><br>%{x:.2f}%",
+        customdata    = df[["full_name"]].values,
+    )
+    fig.update_yaxes(
+        autorange = "reversed",
+    )
+    return fig
+
+def legacy_generate_two_quarters_figure(
+    cik,
+    quarter0,
+    quarter1,
+    merge_key = 'name',
+    top_n     = 20,
+):
+    # Former generate_two_quarters_figure (the figure is now rendered in the browser)
+    if quarter0 == quarter1:
+        title = f"Both dropdown have the value {quarter0}. Select two different quarters to compare"
+        return app.generate_default_figure(
+            title = title,
+        )
+
+    # Lire les proportions des deux trimestres
+    df = app.query_holdings(
+        cik             = cik,
+        merge_key       = merge_key,
+        target_variable = 'proportion',
+        quarters        = [quarter0, quarter1],
+    ).select([merge_key, quarter0, quarter1])
+    # Filtrer les lignes où les deux colonnes ne sont pas null
+    df = df.drop_nulls(subset=[quarter0, quarter1])
+    # Calculer la différence
+    df = df.with_columns([
+        (pl.col(quarter1) / pl.col(quarter0)).alias("ratio")
+    ])
+    # Prendre les top N en valeur absolue
+    df = df.sort("ratio", descending=True).head(top_n).to_pandas()
+
+    # Conserver les noms complets pour le hover
+    df["full_name"] = df[merge_key]
+
+    # Tronquer les noms trop longs pour l'affichage
+    max_chars = 30
+    df[merge_key] = df[merge_key].apply(
+        lambda x: x if len(x) <= max_chars else x[:max_chars-1] + "\u2026"
+    )
+
+    # Créer le barplot horizontal
+    fig = px.bar(
+        data_frame  = df,
+        x           = "ratio",
+        y           = merge_key,
+        orientation = "h",
+        labels      = {
+            "ratio": f"Variation {quarter0}→{quarter1}",
+            merge_key: "Name",
+        },
+        hover_data  = {
+            "full_name": True,
+            "ratio": ':.2f',
+        },
+    )
+    fig.update_layout(
+        title = {
+            "text": f"Top {top_n} proportion ratios from {quarter0} to {quarter1}",
+            "x": 0.5,
+            "y": 0.95,
+            "xanchor": "center",
+            "yanchor": "top",
+            "font": {
+                "family": "monospace",
+                "size": 20,
+                "color": "white",
+            },
+        },
+        font = dict(
+            family="monospace",
+            color="white",
+            size = 12,
+        ),
+        autosize      = True,
+        height        = app.FIG_HEIGHT,
+        width         = app.FIG_WIDTH,
+        plot_bgcolor  = "black",
+        paper_bgcolor = "black",
+        margin        = dict(l=40, r=40, t=60, b=40),
+    )
+    fig.update_traces(
+        marker_color = "#00ffcc",
+        textfont     = dict(
+            color  = "white",
+            family = "monospace",
+        ),
+        hovertemplate = "<b>%{customdata[0]}</b><br>Ratio : %{x:.2f}",
+        customdata    = df[["full_name"]].values,
+    )
+    # mettre les plus grandes valeurs en haut
+    fig.update_yaxes(
+        autorange = "reversed",
+    )
+    return fig
+
+def legacy_update_latest_company_name(
+    cik,
+    one_quarter_dropdown_value,
+    all_quarters_dropdown_value = "total_value",
+):
+    # Former callback on a change of quarter: the one quarter figure
+    if callback_context.triggered[0]["prop_id"]=="one-quarter-dropdown.value":
+        figure = app.cached_figure(legacy_generate_one_quarter_figure, cik=cik, quarter=one_quarter_dropdown_value)
+        return tuple(figure if output=="one-quarter-graph.figure" else no_update for output in LEGACY_OUTPUTS)
+    # Former callback on a CIK switch: the dropdowns and the figures of the three tabs
+    quarters = app.get_cik_quarters(cik=cik, ascending=False)
+    dropdown_options     = [{"label": q, "value": q} for q in quarters]
+    dropdown_placeholder = "Select quarter" if dropdown_options else "No quarters found"
+    quarter  = quarters[0] if quarters else None
+    quarter0 = quarters[1] if len(quarters)>=2 else None
+    quarter1 = quarters[0] if len(quarters)>=2 else None
+    one_quarter_figure  = app.cached_figure(legacy_generate_one_quarter_figure, cik=cik, quarter=quarter)
+    two_quarters_figure = app.cached_figure(legacy_generate_two_quarters_figure, cik=cik, quarter0=quarter0, quarter1=quarter1)
+    all_quarters_figure = app.cached_figure(app.generate_all_quarters_top_n_figure, cik=cik)
+    if all_quarters_dropdown_value!="top_n":
+        all_quarters_figure = app.cached_figure(app.generate_all_quarters_total_value_figure, cik=cik)
+    return (
+        dropdown_options, quarter, dropdown_placeholder, one_quarter_figure,
+        dropdown_options, quarter0, dropdown_placeholder,
+        dropdown_options, quarter1, dropdown_placeholder,
+        two_quarters_figure, all_quarters_figure,
+    )
+
+LEGACY_OUTPUTS = [
+    "one-quarter-dropdown.options", "one-quarter-dropdown.value", "one-quarter-dropdown.placeholder",
+    "one-quarter-graph.figure",
+    "two-quarters-dropdown-0.options", "two-quarters-dropdown-0.value", "two-quarters-dropdown-0.placeholder",
+    "two-quarters-dropdown-1.options", "two-quarters-dropdown-1.value", "two-quarters-dropdown-1.placeholder",
+    "two-quarters-graph.figure", "all-quarters-graph.figure",
+]
+
+def create_legacy_app():
+    # Minimal app with the former callback only
+    legacy = Dash(__name__)
+    legacy.layout = html.Div()
+    legacy.callback(
+        *[Output(*output.split(".")) for output in LEGACY_OUTPUTS],
+        Input("cik-dropdown", "value"),
+        Input("one-quarter-dropdown", "value"),
+    )(legacy_update_latest_company_name)
+    return legacy
+
+def update_request(
+    outputs,
+    inputs,
+    state   = (),
+    changed = "cik-dropdown.value",
+):
+    # Body of a request of the Dash renderer to the endpoint of the callbacks
+    def props(items):
+        return [{"id": k.split(".")[0], "property": k.split(".")[1], "value": v} for k, v in items]
+    return {
+        "output":         outputs[0] if len(outputs)==1 else ".." + "...".join(outputs) + "..",
+        "outputs":        [{"id": o.split(".")[0], "property": o.split(".")[1]} for o in outputs] if len(outputs)>1 else
+                          {"id": outputs[0].split(".")[0], "property": outputs[0].split(".")[1]},
+        "inputs":         props(inputs),
+        "state":          props(state),
+        "changedPropIds": [changed],
+    }
+
+def post(
+    client,
+    body,
+):
+    # Latency and size of the response of a request
+    t0 = time.perf_counter()
+    response = client.post("/_dash-update-component", json=body)
+    return time.perf_counter() - t0, len(response.data), response.json if response.status_code==200 else None
+
+def switch_legacy(
+    client,
+    cik,
+    tab,
+):
+    elapsed, size, _ = post(client, update_request(LEGACY_OUTPUTS, [("cik-dropdown.value", cik), ("one-quarter-dropdown.value", None)]))
+    return elapsed, size
+
+def switch_tabs(
+    client,
+    cik,
+    tab,
+):
+    # The dropdowns, the proportion matrix and the all-quarters graph (a 204 unless its tab is shown)
+    elapsed, size, _ = post(client, update_request(
+        outputs = LEGACY_OUTPUTS[:3] + LEGACY_OUTPUTS[4:10],
+        inputs  = [("cik-dropdown.options", []), ("cik-dropdown.value", cik)],
+    ))
+    for body in [
+        update_request(
+            outputs = ["cik-data-store.data"],
+            inputs  = [("cik-dropdown.options", []), ("cik-dropdown.value", cik)],
+        ),
+        update_request(
+            outputs = ["all-quarters-graph.figure", "all-quarters-rendered.data"],
+            inputs  = [("tabs.value", tab), ("cik-dropdown.value", cik), ("all-quarters-dropdown.value", "total_value")],
+            state   = [("all-quarters-rendered.data", None)],
+        ),
+    ]:
+        t, n, _ = post(client, body)
+        elapsed += t
+        size    += n
+    return elapsed, size
+
+def change_quarter_legacy(
+    client,
+    cik,
+):
+    # Server round trip of the former callback for each quarter of the cik
+    quarters = app.get_cik_quarters(cik=cik, ascending=False)
+    elapsed = 0
+    for quarter in quarters:
+        t, _, _ = post(client, update_request(
+            outputs = LEGACY_OUTPUTS,
+            inputs  = [("cik-dropdown.value", cik), ("one-quarter-dropdown.value", quarter)],
+            changed = "one-quarter-dropdown.value",
+        ))
+        elapsed += t
+    return elapsed / len(quarters)
+
+def measure(
+    switch,
+    client,
+    tab,
+):
+    # Best latency of a cold CIK switch, and the bytes sent to the browser
+    best = float("inf")
+    for i in range(N_REPEATS):
+        app.FIGURE_CACHE.clear()
+        app.DATA_CACHE.clear()
+        elapsed, size = switch(client, CIK_LIST[i % len(CIK_LIST)], tab)
+        best = min(best, elapsed)
+    return best, size
+
+def main():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            os.makedirs("filings")
+            write_filings("filings")
+            app.ingest_paths(["filings"])
+            legacy_client = create_legacy_app().server.test_client()
+            client        = app.create_dash_app().server.test_client()
+            print(f"{len(CIK_LIST)} ciks, {N_QUARTERS} quarters of {N_ROWS} rows, cold caches")
+            print(f"{'tab shown':>12} | {'monolithic s':>12} {'kB':>6} | {'per tab s':>9} {'kB':>6} | {'speedup':>7}")
+            for tab in ["one-quarter", "two-quarters", "all-quarters"]:
+                t_old, n_old = measure(switch_legacy, legacy_client, tab)
+                t_new, n_new = measure(switch_tabs, client, tab)
+                print(f"{tab:>12} | {t_old:>12.3f} {n_old/1e3:>6.0f} | {t_new:>9.3f} {n_new/1e3:>6.0f} | {t_old/t_new:>6.1f}x")
+            app.FIGURE_CACHE.clear()
+            t_quarter = change_quarter_legacy(legacy_client, CIK_LIST[0])
+            print(f"Change of quarter: {t_quarter:.3f} s per server request (former callback), no request (browser)")
+        finally:
+            os.chdir(cwd)
+
+if __name__ == "__main__":
+    main()
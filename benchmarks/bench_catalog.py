@@ -0,0 +1,156 @@
+"""
+Benchmark of the discovery of the output directory: the former scans of the
+files (glob of the cik folders, clean tables and meta JSON files, JSON registry
+of the ingested filings) against the queries of the SQLite catalog.
+
+The former functions are copied below. The output directory is synthetic: a
+meta file, a raw table and a clean table per filing (the tables are empty
+files, only their names are read), and the JSON registry of the filings. The
+catalog is built from it once (like the first run of a new version on an
+existing output directory), then each discovery is timed with both. The page
+cache of the OS is warm, so the scans are faster here than on a cold disk.
+
+Usage:
+    python benchmarks/bench_catalog.py [--n-ciks 2000] [--n-filings 10]
+"""
+
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+
+from diff13f import app
+
+N_REPEATS = 3
+
+def write_output(
+    n_ciks,
+    n_filings,
+):
+    # Meta file, raw and clean tables of each filing, and the former registry
+    registry = {}
+    for i_cik in range(n_ciks):
+        cik = f"{i_cik + 1:010d}"
+        for folder in ['meta', 'raw', 'clean']:
+            os.makedirs(f"output/{cik}/{folder}")
+        for i in range(n_filings):
+            year, q = 2015 + i // 4, i % 4 + 1
+            quarter, filed = f"{year}-q{q}", f"{year + (q == 4)}-{(3*q) % 12 + 2:02d}-14"
+            accession_number = f"{cik}-{year % 100:02d}-{i:06d}"
+            meta_file = f"output/{cik}/meta/{quarter}_{filed}.json"
+            with open(meta_file, "w", encoding="utf-8") as f:
+                json.dump({
+                    'central_index_key':          cik,
+                    'accession_number':           accession_number,
+                    'company_conformed_name':     f"SYNTHETIC MANAGER {i_cik} {year}",
+                    'filed_as_of_date':           filed,
+                    'conformed_period_of_report': f"{year}-{3*q:02d}-30",
+                    'quarter':                    quarter,
+                }, f, indent=4)
+            open(f"output/{cik}/raw/{quarter}_{filed}.{app.STORAGE_FORMAT}", "w").close()
+            open(f"output/{cik}/clean/{quarter}.{app.STORAGE_FORMAT}", "w").close()
+            registry[accession_number] = {'sha256': f"{i_cik:032x}{i:032x}", 'central_index_key': cik, 'meta_file': meta_file}
+    with open(app.INGEST_REGISTRY_FILE, "w", encoding="utf-8") as f:
+        json.dump(registry, f, indent=4)
+
+def legacy_get_cik_folders():
+    # Former get_cik_folders
+    return sorted(glob.glob("output/"+10*"[0-9]"))
+
+def legacy_get_cik_quarters(
+    cik,
+):
+    # Former get_cik_quarters
+    return [app.table_stem(filename) for filename in app.list_tables(f"output/{cik}/clean")]
+
+def legacy_cik_to_company_conformed_name(
+    cik,
+):
+    # Former cik_to_company_conformed_name
+    meta_files = sorted(glob.glob(f"output/{cik}/meta/*.json"), reverse=True)
+    if not meta_files:
+        return ""
+    with open(meta_files[0], "r", encoding="utf-8") as f:
+        return json.load(f).get("company_conformed_name", "")
+
+def legacy_cik_dropdown():
+    # Former labels of the CIK dropdown (create_import_bar and handle_upload)
+    return [
+        f"{cik} - {legacy_cik_to_company_conformed_name(cik)}"
+        for cik in [cik_folder.split('/')[-1] for cik_folder in legacy_get_cik_folders()]
+    ]
+
+def cik_dropdown():
+    # Labels of the CIK dropdown from the catalog
+    return [f"{cik} - {name}" for cik, name in app.get_cik_names().items()]
+
+def legacy_load_ingest_registry():
+    # Former load_ingest_registry
+    with open(app.INGEST_REGISTRY_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def legacy_get_ingested_accession_numbers(
+    cik,
+):
+    # Former get_ingested_accession_numbers (fetch)
+    accession_numbers = set()
+    for meta_file in glob.glob(f"output/{cik}/meta/*.json"):
+        with open(meta_file, "r", encoding="utf-8") as f:
+            accession_numbers.add(json.load(f).get('accession_number'))
+    return accession_numbers
+
+def best_time(
+    function,
+    *args,
+):
+    # Best time of a call, and its result
+    best = float("inf")
+    for _ in range(N_REPEATS):
+        t0 = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-ciks", type=int, default=2_000)
+    parser.add_argument("--n-filings", type=int, default=10)
+    args = parser.parse_args()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            write_output(args.n_ciks, args.n_filings)
+            # Sample of cik for the per-cik discoveries
+            ciks = [f"{i + 1:010d}" for i in range(0, args.n_ciks, max(1, args.n_ciks // 100))]
+            # The former registry is imported (and removed) when the catalog is built: time it first
+            t_registry, registry = best_time(legacy_load_ingest_registry)
+            t0 = time.perf_counter()
+            with app.open_catalog():
+                pass
+            t_build = time.perf_counter() - t0
+            print(f"{args.n_ciks} cik, {args.n_ciks*args.n_filings} filings, catalog built in {t_build:.2f} s (once)")
+            print(f"{'discovery':>28} | {'files s':>8} | {'catalog s':>9} | {'speedup':>7}")
+            cases = [
+                ("cik folders",                 legacy_get_cik_folders,                                                app.get_cik_folders),
+                ("cik dropdown (names)",        legacy_cik_dropdown,                                                   cik_dropdown),
+                ("quarters (100 cik)",          lambda: [legacy_get_cik_quarters(cik) for cik in ciks],               lambda: [app.get_cik_quarters(cik) for cik in ciks]),
+                ("name (100 cik)",              lambda: [legacy_cik_to_company_conformed_name(cik) for cik in ciks],  lambda: [app.cik_to_company_conformed_name(cik) for cik in ciks]),
+                ("accession numbers (100 cik)", lambda: [legacy_get_ingested_accession_numbers(cik) for cik in ciks], lambda: [app.get_ingested_accession_numbers(cik) for cik in ciks]),
+            ]
+            for name, legacy, query in cases:
+                t_old, old = best_time(legacy)
+                t_new, new = best_time(query)
+                assert old == new, name
+                print(f"{name:>28} | {t_old:>8.4f} | {t_new:>9.4f} | {t_old/t_new:>6.1f}x")
+            # The former registry was timed before the catalog was built
+            t_new, new = best_time(app.load_ingest_registry)
+            assert registry == new
+            print(f"{'registry of the filings':>28} | {t_registry:>8.4f} | {t_new:>9.4f} | {t_registry/t_new:>6.1f}x")
+        finally:
+            os.chdir(cwd)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of the streaming infoTable parser against the former xmltodict path.
+
+Usage (xmltodict is only needed for the comparison):
+    pip install xmltodict
+    python benchmarks/bench_infotable_parser.py
+"""
+
+import time
+import tracemalloc
+
+import pandas as pd
+import xmltodict
+
+from diff13f.app import INFO_TABLE_INT_COLUMNS, parse_info_table_xml
+from synthetic import make_filing
+
+def xml_payload(
+    text,
+):
+    # Slice the last <XML> block like parse_txt_data_to_raw_csv does
+    start = text.rindex('<XML>')
+    end   = text.rindex('</XML>')
+    return text[start+6:end]
+
+def parse_xmltodict(
+    xml,
+):
+    # Former implementation of parse_txt_data_to_raw_csv
+    d      = xmltodict.parse(xml)
+    d_info = d['informationTable']['infoTable']
+    return pd.DataFrame({
+        'nameOfIssuer': [d_i['nameOfIssuer'] for d_i in d_info],
+        'titleOfClass': [d_i['titleOfClass'] for d_i in d_info],
+        'cusip': [d_i['cusip'] for d_i in d_info],
+        'value': [d_i['value'] for d_i in d_info],
+        'shrsOrPrnAmt_sshPrnamt': [d_i['shrsOrPrnAmt']['sshPrnamt'] for d_i in d_info],
+        'shrsOrPrnAmt_sshPrnamtType': [d_i['shrsOrPrnAmt']['sshPrnamtType'] for d_i in d_info],
+        'investmentDiscretion': [d_i['investmentDiscretion'] for d_i in d_info],
+        'otherManager': [d_i['otherManager'] if 'otherManager' in d_i else '' for d_i in d_info],
+        'votingAuthority_Sole': [d_i['votingAuthority']['Sole'] for d_i in d_info],
+        'votingAuthority_Shared': [d_i['votingAuthority']['Shared'] for d_i in d_info],
+        'votingAuthority_None': [d_i['votingAuthority']['None'] for d_i in d_info],
+    })
+
+def parse_streaming(
+    xml,
+):
+    columns = parse_info_table_xml(xml)
+    return pd.DataFrame({
+        column: pd.array(values, dtype="Int64") if column in INFO_TABLE_INT_COLUMNS else values
+        for column, values in columns.items()
+    })
+
+def measure(
+    function,
+    xml,
+):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    df = function(xml)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, elapsed, peak
+
+def main():
+    print(f"{'rows':>8} {'MB':>7} | {'xmltodict s':>11} {'peak MB':>8} | {'streaming s':>11} {'peak MB':>8} | same csv")
+    for n_rows in [1_000, 5_000, 20_000, 50_000]:
+        xml = xml_payload(make_filing(n_rows))
+        df_old, t_old, m_old = measure(parse_xmltodict, xml)
+        df_new, t_new, m_new = measure(parse_streaming, xml)
+        same = df_old.to_csv(index=False) == df_new.to_csv(index=False)
+        print(
+            f"{n_rows:>8} {len(xml)/1e6:>7.1f} | {t_old:>11.3f} {m_old/1e6:>8.1f} | {t_new:>11.3f} {m_new/1e6:>8.1f} | {same}"
+        )
+
+if __name__ == "__main__":
+    main()
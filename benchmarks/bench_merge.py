@@ -0,0 +1,151 @@
+"""
+Benchmark of the single-pass holdings table against the former nine-loop merge.
+
+The former merge_portfolio_proportions is copied below: it re-reads every
+clean quarter nine times, once per (merge key, target) pair. The new path
+builds the holdings table (each clean quarter read once) and exports the same
+nine wide files from it.
+
+Usage:
+    python benchmarks/bench_merge.py
+"""
+
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from diff13f import app
+from synthetic import make_issuers
+
+CIK    = "0000000001"
+N_ROWS = 2_000
+
+def legacy_merge_portfolio_proportions(
+    cik,
+):
+    # Former implementation of merge_portfolio_proportions (for a single cik)
+    target_variable_to_target_column = {
+        'proportion': 'portfolio %',
+        'shares':     'shrsOrPrnAmt_sshPrnamt',
+        'value':      'value',
+    }
+    merge_keys       = ['nameOfIssuer', 'cusip', 'name']
+    target_variables = ['proportion', 'shares', 'value']
+    input_file_map = f"output/{cik}/mapping/nameOfIssuer_titleOfClass_cusip.csv"
+    df_map = pl.read_csv(input_file_map, columns=['nameOfIssuer', 'name'])
+    df_map = df_map.unique(subset=['nameOfIssuer'])
+    input_path = f'output/{cik}/clean/'
+    for merge_key in merge_keys:
+        for target_variable in target_variables:
+            target_column = target_variable_to_target_column[target_variable]
+            input_files = sorted(glob.glob(os.path.join(input_path, '*.csv')))
+            l_df = []
+            for input_file in input_files:
+                quarter = os.path.basename(input_file).split('.')[0]
+                if merge_key!='name':
+                    df = pl.read_csv(
+                        input_file,
+                        columns          = [merge_key, target_column],
+                        schema_overrides = {merge_key: pl.Utf8},
+                    )
+                else:
+                    df = pl.read_csv(
+                        input_file,
+                        columns          = ['nameOfIssuer', target_column],
+                        schema_overrides = {'nameOfIssuer': pl.Utf8},
+                    )
+                    df = df.join(df_map, on='nameOfIssuer', how='left')
+                    df = df.select(['name', target_column])
+                df = df.group_by(merge_key).agg(pl.sum(target_column).alias(target_column))
+                df = df.with_columns(pl.lit(quarter).alias("quarter"))
+                l_df.append(df)
+            df_all = pl.concat(l_df, rechunk=True)
+            df_out = df_all.pivot(
+                values             = target_column,
+                index              = merge_key,
+                on                 = "quarter",
+                aggregate_function = "first"
+            )
+            cols = df_out.columns
+            cols = [merge_key] + sorted([c for c in cols if c != merge_key], reverse=True)
+            df_out = df_out.select(cols).sort(merge_key)
+            output_dir = f'output/{cik}/merge'
+            os.makedirs(output_dir, exist_ok=True)
+            df_out.write_csv(f'{output_dir}/{merge_key}_to_{target_variable}.csv')
+
+def make_clean_store(
+    n_quarters,
+):
+    # Write n_quarters clean csv files and the mapping of a single cik
+    clean_dir = f"output/{CIK}/clean"
+    os.makedirs(clean_dir, exist_ok=True)
+    for i in range(n_quarters):
+        quarter = f"{2000 + i // 4}-q{i % 4 + 1}"
+        issuers = make_issuers(N_ROWS, seed=i)
+        df = pd.DataFrame({
+            'nameOfIssuer':               [d['nameOfIssuer'] for d in issuers],
+            'titleOfClass':               [d['titleOfClass'] for d in issuers],
+            'cusip':                      [f"{int(d['cusip']) % 5000:09d}" for d in issuers],
+            'value':                      [d['value'] for d in issuers],
+            'shrsOrPrnAmt_sshPrnamt':     [d['sshPrnamt'] for d in issuers],
+            'shrsOrPrnAmt_sshPrnamtType': 'SH',
+            'investmentDiscretion':       'SOLE',
+            'otherManager':               '',
+            'votingAuthority_Sole':       [d['Sole'] for d in issuers],
+            'votingAuthority_Shared':     [d['Shared'] for d in issuers],
+            'votingAuthority_None':       [d['None'] for d in issuers],
+        })
+        df['portfolio %'] = 100*df['value']/df['value'].sum()
+        df.to_csv(f"{clean_dir}/{quarter}.csv", index=False)
+    app.map_nameOfIssuer_variants(cik_set={CIK})
+
+def same_csv(
+    path_old,
+    path_new,
+):
+    # Same table up to the rounding of the float sums (their order differs)
+    merge_key = os.path.basename(path_old).split('_to_')[0]
+    df_old = pl.read_csv(path_old, schema_overrides={merge_key: pl.Utf8})
+    df_new = pl.read_csv(path_new, schema_overrides={merge_key: pl.Utf8})
+    try:
+        assert_frame_equal(df_old, df_new, check_exact=False)
+    except AssertionError:
+        return False
+    return True
+
+def timed(
+    function,
+):
+    t0 = time.perf_counter()
+    function()
+    return time.perf_counter() - t0
+
+def main():
+    print(f"{'quarters':>8} | {'nine loops s':>12} | {'holdings s':>10} {'+ export s':>10} | {'speedup':>7} | same views")
+    cwd = os.getcwd()
+    for n_quarters in [10, 50, 100]:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                make_clean_store(n_quarters)
+                t_old = timed(lambda: legacy_merge_portfolio_proportions(CIK))
+                shutil.move(f"output/{CIK}/merge", "legacy")
+                t_build  = timed(lambda: app.build_holdings_table(cik_set={CIK}))
+                t_export = timed(lambda: app.export_wide_views(CIK, output_dir="export"))
+                same = all(
+                    same_csv(path, os.path.join("export", os.path.basename(path)))
+                    for path in glob.glob("legacy/*.csv")
+                )
+            finally:
+                os.chdir(cwd)
+        t_new = t_build + t_export
+        print(f"{n_quarters:>8} | {t_old:>12.3f} | {t_build:>10.3f} {t_new:>10.3f} | {t_old/t_new:>6.1f}x | {same}")
+
+if __name__ == "__main__":
+    main()
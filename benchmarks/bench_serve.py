@@ -0,0 +1,155 @@
+"""
+Benchmark of the throughput of the dashboard reads served by `diff13f serve`
+(gunicorn) with 1, 2 and 4 read-only workers, against the Flask development
+server of `diff13f`.
+
+Client threads send the requests of a CIK switch (the proportion matrix of
+the cik and the figure of the total value, see bench_callbacks.py) for random
+cik, for a fixed duration, and the requests per second and the latencies are
+reported. The reads scale with the workers up to the number of CPUs.
+
+Usage:
+    python benchmarks/bench_serve.py [--duration 10] [--threads 16]
+"""
+
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from diff13f import app
+from synthetic import make_filing
+from bench_callbacks import update_request
+
+CIK_LIST   = [f"{i:010d}" for i in range(1, 9)]
+N_QUARTERS = 12
+N_ROWS     = 1_000
+WORKERS    = [1, 2, 4]
+PORT       = 8765
+# Port of the development server of `diff13f`
+DEV_PORT   = 8050
+
+def write_filings(
+    path,
+):
+    # One 13F-HR per quarter and per cik
+    for cik in CIK_LIST:
+        for i in range(N_QUARTERS):
+            year, q = 2015 + i // 4, i % 4 + 1
+            period = f"{year}{3*q:02d}{30 if q in (2, 3) else 31}"
+            with open(os.path.join(path, f"{cik}_{i}.txt"), "w") as f:
+                f.write(make_filing(
+                    n_rows    = N_ROWS,
+                    cik       = cik,
+                    period    = period,
+                    filed     = f"{year + (q == 4)}{(3*q) % 12 + 2:02d}14",
+                    accession = f"{cik}-{year % 100:02d}-{i:06d}",
+                    seed      = i,
+                ))
+
+def switch_requests(
+    cik,
+):
+    # Requests of a CIK switch with the all-quarters tab shown
+    return [
+        update_request(
+            outputs = ["cik-data-store.data"],
+            inputs  = [("cik-dropdown.options", []), ("cik-dropdown.value", cik)],
+        ),
+        update_request(
+            outputs = ["all-quarters-graph.figure", "all-quarters-rendered.data"],
+            inputs  = [("tabs.value", "all-quarters"), ("cik-dropdown.value", cik), ("all-quarters-dropdown.value", "total_value")],
+            state   = [("all-quarters-rendered.data", None)],
+        ),
+    ]
+
+def start_server(
+    command,
+    port,
+):
+    # Start a server in its own process group and wait for its first page
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    for _ in range(600):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"the server {' '.join(command)} did not start")
+
+def stop_server(
+    process,
+):
+    # Ctrl+C of the process group (gunicorn, its workers and the ingest process)
+    os.killpg(process.pid, signal.SIGINT)
+    process.wait()
+
+def load(
+    port,
+    duration,
+    n_threads,
+):
+    # Requests per second and latencies of n_threads clients during duration seconds
+    latencies = []
+    lock      = threading.Lock()
+    deadline  = time.perf_counter() + duration
+    def client(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            for body in switch_requests(rng.choice(CIK_LIST)):
+                t0 = time.perf_counter()
+                urllib.request.urlopen(urllib.request.Request(
+                    f"http://127.0.0.1:{port}/_dash-update-component",
+                    data    = json.dumps(body).encode(),
+                    headers = {"Content-Type": "application/json"},
+                )).read()
+                with lock:
+                    latencies.append(time.perf_counter() - t0)
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return len(latencies)/duration, latencies[len(latencies)//2], latencies[int(len(latencies)*0.95)]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            os.makedirs("filings")
+            write_filings("filings")
+            app.ingest_paths(["filings"])
+            diff13f = [sys.executable, "-c", "from diff13f.app import main; main(open_browser=False)"]
+            servers = [("flask dev server", diff13f, DEV_PORT)] + [
+                (f"serve, {workers} worker(s)", diff13f + ["serve", "--port", str(PORT), "--workers", str(workers)], PORT)
+                for workers in WORKERS
+            ]
+            print(f"{len(CIK_LIST)} cik, {N_QUARTERS} quarters of {N_ROWS} rows, {args.threads} clients, {os.cpu_count()} CPUs")
+            print(f"{'server':>20} | {'req/s':>7} | {'p50 ms':>7} | {'p95 ms':>7}")
+            for name, command, port in servers:
+                process = start_server(command, port)
+                try:
+                    # Warm up the caches of the workers
+                    load(port, 1, args.threads)
+                    rate, p50, p95 = load(port, args.duration, args.threads)
+                finally:
+                    stop_server(process)
+                print(f"{name:>20} | {rate:>7.1f} | {1e3*p50:>7.1f} | {1e3*p95:>7.1f}")
+        finally:
+            os.chdir(cwd)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark of the peak RSS of the upload decode path.
+
+Each measure runs in a fresh subprocess: the base64 data URL of a synthetic
+filing is built first (like the content posted by dcc.Upload), then the file
+is decoded and parsed, and the increase of the peak RSS is reported. The last
+column imports the upload with parse_contents_to_raw_csv (decode, parse and
+raw table written in a temporary output folder, in a single worker).
+
+Usage:
+    python benchmarks/bench_upload_memory.py
+"""
+
+import subprocess
+import sys
+
+CODE = """
+import base64, os, resource, sys, tempfile
+sys.path.insert(0, {benchmarks_dir!r})
+from synthetic import make_filing
+from diff13f.app import decode_base64_content, parse_contents_to_raw_csv, parse_txt_data
+
+mode   = {mode!r}
+n_rows = {n_rows}
+content = "data:text/plain;base64," + base64.b64encode(make_filing(n_rows).encode()).decode()
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if mode == "str":
+    # Former path: split the data URL, decode the base64 and the UTF-8 text
+    content_type, content_string = content.split(",")
+    text = base64.b64decode(content_string).decode("utf-8")
+    metadata, df = parse_txt_data(text)
+elif mode == "bytes":
+    # Bytes-native path
+    data = decode_base64_content(content)
+    metadata, df = parse_txt_data(data)
+else:
+    # Import of the upload to a raw table
+    os.chdir(tempfile.mkdtemp())
+    cik_set = parse_contents_to_raw_csv([content], ["upload.txt"], n_workers=1)
+    assert cik_set == {{"0000000001"}}, cik_set
+rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(len(content), rss_after - rss_before)
+"""
+
+def measure(
+    mode,
+    n_rows,
+):
+    benchmarks_dir = sys.path[0]
+    output = subprocess.run(
+        [sys.executable, "-c", CODE.format(benchmarks_dir=benchmarks_dir, mode=mode, n_rows=n_rows)],
+        capture_output = True,
+        text           = True,
+        check          = True,
+    ).stdout.split()
+    # ru_maxrss is in kilobytes on Linux
+    return int(output[0]), int(output[1]) / 1024
+
+def main():
+    print(f"{'rows':>8} {'upload MB':>10} | {'str path MB':>12} | {'bytes path MB':>13} | {'import MB':>9}")
+    for n_rows in [5_000, 20_000, 50_000]:
+        size, rss_str    = measure("str", n_rows)
+        _,    rss_bytes  = measure("bytes", n_rows)
+        _,    rss_import = measure("import", n_rows)
+        print(f"{n_rows:>8} {size/1e6:>10.1f} | {rss_str:>12.1f} | {rss_bytes:>13.1f} | {rss_import:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Local stand-in of EDGAR serving synthetic 13F filings, to test `diff13f fetch`.
+
+It serves the submissions JSON of each cik (/submissions/CIK##########.json)
+and the complete submission text files of its filings
+(/Archives/edgar/data/<cik>/<accession without dashes>/<accession>.txt).
+A share of the requests can fail with a 503 to exercise the retries, and the
+number of requests per second is printed when the server stops.
+
+Usage:
+    python benchmarks/edgar_stand_in.py --cik 1 2 --filings 8 --fail-rate 0.1
+    diff13f fetch --cik 1 2 --base-url http://127.0.0.1:8765
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from synthetic import make_filing
+
+def make_edgar(
+    cik_list,
+    n_filings,
+    n_rows,
+):
+    # Submissions JSON and filings of each cik: one 13F-HR per quarter (and a 10-K that is not fetched)
+    files = {}
+    for cik in cik_list:
+        cik = cik.zfill(10)
+        accession_numbers, forms, report_dates, filing_dates = [], [], [], []
+        for i in range(n_filings):
+            year, q = 2015 + i // 4, i % 4 + 1
+            period = f"{year}{3*q:02d}{30 if q in (2, 3) else 31}"
+            accession_number = f"{cik}-{year % 100:02d}-{i:06d}"
+            accession_numbers.append(accession_number)
+            forms.append("13F-HR")
+            report_dates.append(f"{period[:4]}-{period[4:6]}-{period[6:]}")
+            filing_dates.append(f"{year + (q == 4)}-{(3*q) % 12 + 2:02d}-14")
+            files[f"/Archives/edgar/data/{int(cik)}/{accession_number.replace('-', '')}/{accession_number}.txt"] = make_filing(
+                n_rows    = n_rows,
+                cik       = cik,
+                period    = period,
+                filed     = f"{year + (q == 4)}{(3*q) % 12 + 2:02d}14",
+                accession = accession_number,
+                seed      = i,
+            ).encode()
+        accession_numbers.append(f"{cik}-99-999999")
+        forms.append("10-K")
+        report_dates.append("2099-12-31")
+        filing_dates.append("2099-12-31")
+        files[f"/submissions/CIK{cik}.json"] = json.dumps({
+            "cik":     str(int(cik)),
+            "filings": {
+                "recent": {"accessionNumber": accession_numbers, "form": forms, "reportDate": report_dates, "filingDate": filing_dates},
+                "files":  [],
+            },
+        }).encode()
+    return files
+
+def make_handler(
+    files,
+    fail_rate,
+    requests_log,
+):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_log.append(time.monotonic())
+            if self.path not in files:
+                self.send_error(404)
+            elif random.random() < fail_rate:
+                self.send_error(503)
+            else:
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(files[self.path])))
+                self.end_headers()
+                self.wfile.write(files[self.path])
+        def log_message(self, *args):
+            pass
+    return Handler
+
+def max_requests_per_second(
+    requests_log,
+):
+    # Maximum number of requests in a sliding window of one second
+    times = sorted(requests_log)
+    best, start = 0, 0
+    for end in range(len(times)):
+        while times[end] - times[start] >= 1:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cik", nargs="+", default=["1"])
+    parser.add_argument("--filings", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=1_000)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    requests_log = []
+    files  = make_edgar(args.cik, args.filings, args.rows)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(files, args.fail_rate, requests_log))
+    print(f"Serving {len(files)} files on http://127.0.0.1:{args.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"{len(requests_log)} requests, at most {max_requests_per_second(requests_log)} in one second.")
+
+if __name__ == "__main__":
+    main()
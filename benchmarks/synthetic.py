@@ -0,0 +1,186 @@
+"""
+Synthetic 13F complete submission text files for the benchmarks.
+
+The generated files mimic the layout of the EDGAR complete submission text
+files: a SEC-HEADER block followed by the primary document and the
+information table (XML since 2013-q2, fixed-width before).
+"""
+
+import random
+
+def make_header(
+    cik        = "0000000001",
+    name       = "SYNTHETIC CAPITAL MANAGEMENT",
+    period     = "20240331",
+    filed      = "20240515",
+    accession  = None,
+):
+    if accession is None:
+        accession = f"{cik}-{filed[2:4]}-{random.randint(0, 999999):06d}"
+    return (
+        f"<SEC-DOCUMENT>{accession}.txt : {filed}\n"
+        f"<SEC-HEADER>{accession}.hdr.sgml : {filed}\n"
+        f"ACCESSION NUMBER:\t\t{accession}\n"
+        f"CONFORMED SUBMISSION TYPE:\t13F-HR\n"
+        f"PUBLIC DOCUMENT COUNT:\t\t2\n"
+        f"CONFORMED PERIOD OF REPORT:\t{period}\n"
+        f"FILED AS OF DATE:\t\t{filed}\n"
+        f"\n"
+        f"FILER:\n"
+        f"\n"
+        f"\tCOMPANY DATA:\t\n"
+        f"\t\tCOMPANY CONFORMED NAME:\t\t\t{name}\n"
+        f"\t\tCENTRAL INDEX KEY:\t\t\t{cik}\n"
+        f"</SEC-HEADER>\n"
+    )
+
+def make_primary_document():
+    return (
+        "<DOCUMENT>\n"
+        "<TYPE>13F-HR\n"
+        "<SEQUENCE>1\n"
+        "<FILENAME>primary_doc.xml\n"
+        "<TEXT>\n"
+        "<XML>\n"
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<edgarSubmission xmlns="http://www.sec.gov/edgar/thirteenffiler">\n'
+        "  <headerData><submissionType>13F-HR</submissionType></headerData>\n"
+        "</edgarSubmission>\n"
+        "</XML>\n"
+        "</TEXT>\n"
+        "</DOCUMENT>\n"
+    )
+
+def make_issuers(
+    n_rows,
+    seed = 0,
+):
+    rng = random.Random(seed)
+    issuers = []
+    for i in range(n_rows):
+        issuers.append({
+            "nameOfIssuer": f"ISSUER {i % max(1, n_rows // 2):06d} {rng.choice(['INC', 'CORP', 'LTD', 'PLC'])}",
+            "titleOfClass": rng.choice(["COM", "CL A", "SHS", "ADR"]),
+            "cusip":        f"{rng.randint(0, 999999999):09d}",
+            "value":        rng.randint(1, 10_000_000),
+            "sshPrnamt":    rng.randint(1, 5_000_000),
+            "Sole":         rng.randint(0, 5_000_000),
+            "Shared":       0,
+            "None":         rng.randint(0, 1000),
+        })
+    return issuers
+
+def make_xml_info_table(
+    issuers,
+    prefix = "",
+):
+    ns = f"xmlns:{prefix[:-1]}" if prefix else "xmlns"
+    parts = [
+        "<DOCUMENT>\n<TYPE>INFORMATION TABLE\n<SEQUENCE>2\n<FILENAME>infotable.xml\n<TEXT>\n<XML>\n",
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        f'<{prefix}informationTable {ns}="http://www.sec.gov/edgar/document/thirteenf/informationtable">\n',
+    ]
+    p = prefix
+    for d in issuers:
+        parts.append(
+            f"  <{p}infoTable>\n"
+            f"    <{p}nameOfIssuer>{d['nameOfIssuer']}</{p}nameOfIssuer>\n"
+            f"    <{p}titleOfClass>{d['titleOfClass']}</{p}titleOfClass>\n"
+            f"    <{p}cusip>{d['cusip']}</{p}cusip>\n"
+            f"    <{p}value>{d['value']}</{p}value>\n"
+            f"    <{p}shrsOrPrnAmt>\n"
+            f"      <{p}sshPrnamt>{d['sshPrnamt']}</{p}sshPrnamt>\n"
+            f"      <{p}sshPrnamtType>SH</{p}sshPrnamtType>\n"
+            f"    </{p}shrsOrPrnAmt>\n"
+            f"    <{p}investmentDiscretion>SOLE</{p}investmentDiscretion>\n"
+            f"    <{p}votingAuthority>\n"
+            f"      <{p}Sole>{d['Sole']}</{p}Sole>\n"
+            f"      <{p}Shared>{d['Shared']}</{p}Shared>\n"
+            f"      <{p}None>{d['None']}</{p}None>\n"
+            f"    </{p}votingAuthority>\n"
+            f"  </{p}infoTable>\n"
+        )
+    parts.append(f"</{prefix}informationTable>\n</XML>\n</TEXT>\n</DOCUMENT>\n")
+    return "".join(parts)
+
+def make_fwf_info_table(
+    issuers,
+    style = "<",
+):
+    widths = [31, 9, 10, 12, 12, 5, 8, 9]
+    def row(cells):
+        return "".join(str(c).ljust(w) for c, w in zip(cells, widths)) + "\n"
+    parts = ["<DOCUMENT>\n<TYPE>13F-HR\n<SEQUENCE>1\n<TEXT>\n<TABLE>\n"]
+    parts.append(row(["NAME OF ISSUER", "TITLE", "CUSIP", "VALUE", "SHARES", "SH/", "INV", "OTHER"]))
+    if style == "<":
+        parts.append(row(["<S>", "<C>", "<C>", "<C>", "<C>", "<C>", "<C>", "<C>"]))
+    else:
+        parts.append(row(["_" * (w - 1) for w in widths]))
+    for d in issuers:
+        parts.append(row([
+            d["nameOfIssuer"][:30],
+            d["titleOfClass"],
+            d["cusip"],
+            f"{d['value']:,}",
+            f"{d['sshPrnamt']:,}",
+            "SH",
+            "SOLE",
+            "",
+        ]))
+    parts.append("</TABLE>\n</TEXT>\n</DOCUMENT>\n")
+    return "".join(parts)
+
+def make_filing(
+    n_rows,
+    cik       = "0000000001",
+    period    = "20240331",
+    filed     = "20240515",
+    accession = None,
+    seed      = 0,
+    prefix    = "",
+    fwf_style = None,
+):
+    """
+    Return the text of a synthetic complete submission text file with n_rows holdings.
+    If fwf_style is '<' or '_', the table is a pre-2013 fixed-width table instead of XML.
+    """
+    issuers = make_issuers(n_rows, seed=seed)
+    header  = make_header(cik=cik, period=period, filed=filed, accession=accession)
+    if fwf_style is None:
+        body = make_primary_document() + make_xml_info_table(issuers, prefix=prefix)
+    else:
+        body = make_fwf_info_table(issuers, style=fwf_style)
+    return header + body + "</SEC-DOCUMENT>\n"
+
+def write_bulk_dataset(
+    path,
+    n_filers,
+    n_rows,
+    period = "31-MAR-2024",
+    filed  = "15-MAY-2024",
+):
+    """
+    Write a synthetic Form 13F data set (ZIP file with the SUBMISSION, COVERPAGE
+    and INFOTABLE tables) with n_filers filings of n_rows holdings each.
+    """
+    import zipfile
+    submission = ["ACCESSION_NUMBER\tFILING_DATE\tSUBMISSIONTYPE\tCIK\tPERIODOFREPORT\n"]
+    coverpage  = ["ACCESSION_NUMBER\tREPORTCALENDARORQUARTER\tFILINGMANAGER_NAME\n"]
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open("INFOTABLE.tsv", "w", force_zip64=True) as f:
+            f.write(
+                b"ACCESSION_NUMBER\tINFOTABLE_SK\tNAMEOFISSUER\tTITLEOFCLASS\tCUSIP\tFIGI\tVALUE\tSSHPRNAMT\tSSHPRNAMTTYPE\t"
+                b"PUTCALL\tINVESTMENTDISCRETION\tOTHERMANAGER\tVOTING_AUTH_SOLE\tVOTING_AUTH_SHARED\tVOTING_AUTH_NONE\n"
+            )
+            for i_filer in range(n_filers):
+                cik       = f"{i_filer + 1:010d}"
+                accession = f"{cik}-24-{i_filer:06d}"
+                submission.append(f"{accession}\t{filed}\t13F-HR\t{int(cik)}\t{period}\n")
+                coverpage.append(f"{accession}\t{period}\tSYNTHETIC CAPITAL MANAGEMENT {i_filer}\n")
+                f.write("".join(
+                    f"{accession}\t{i}\t{d['nameOfIssuer']}\t{d['titleOfClass']}\t{d['cusip']}\t\t{d['value']}\t{d['sshPrnamt']}\tSH\t"
+                    f"\tSOLE\t\t{d['Sole']}\t{d['Shared']}\t{d['None']}\n"
+                    for i, d in enumerate(make_issuers(n_rows, seed=i_filer))
+                ).encode())
+        archive.writestr("SUBMISSION.tsv", "".join(submission))
+        archive.writestr("COVERPAGE.tsv", "".join(coverpage))
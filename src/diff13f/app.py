@@ -19,26 +19,52 @@ For development:
 # Import libraries
 
 import dash
-from dash import Dash, html, dcc, Input, Output, State, no_update, callback_context
+from dash import Dash, html, dcc, Input, Output, State, ClientsideFunction, DiskcacheManager
+import diskcache
+import multiprocess
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import webbrowser
 import os
 import random
 import time
 import math
 import base64
+import hashlib
+import multiprocessing
+import binascii
 import io
 import glob
 import os
 import re
 import shutil
 import json
+import sqlite3
+import contextlib
 import pandas as pd
-import xmltodict
 import polars as pl
+import zipfile
+import tarfile
+import xml.etree.ElementTree as ET
 import colorsys
+import argparse
+import threading
+import signal
+import subprocess
+import sys
+import importlib.util
+import inspect
+from collections import OrderedDict
+import asyncio
+import gzip
+import bz2
+import lzma
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from flask import request, jsonify
+from html import unescape
 
 ################################################################################
 ################################################################################
@@ -50,6 +76,1035 @@ WIDTH = "1000px"
 FIG_HEIGHT = 520
 FIG_WIDTH = 960
 
+# Tab shown when the app is opened (the figures of the other tabs are rendered on their first view)
+DEFAULT_TAB = "one-quarter"
+
+# Above this top N, the all-quarters top N figure is drawn with WebGL and a single glow trace
+ALL_QUARTERS_WEBGL_TOP_N = 30
+
+# Number of worker processes used to parse the imported files
+INGEST_WORKERS = 1
+
+# Snapshot of the ingested filings (accession number -> content hash) given to the ingest workers
+_INGEST_REGISTRY = {}
+# Zip files opened by the ingest of this process, by path (their central directory is read once)
+_ZIP_ARCHIVES = {}
+
+# Catalog of the output directory (filings, cik, quarters and status of the stages of each cik)
+CATALOG_FILE = "output/catalog.sqlite"
+# Version of the schema of the catalog (a catalog of an older version is rebuilt from the output directory)
+CATALOG_VERSION = 3
+# Seconds to wait for the lock of the catalog held by another process
+CATALOG_TIMEOUT = 60
+# Stages of the outputs of a cik whose status is kept in the catalog (see update_cik_outputs)
+CATALOG_STAGES = ['clean', 'map', 'merge', 'snapshot']
+# Former registry of the ingested filings (JSON), imported in the catalog when it is built
+INGEST_REGISTRY_FILE = "output/ingested_filings.json"
+# Connections to the catalog of each thread, by process and path (see open_catalog)
+_CATALOG_CONNECTIONS = threading.local()
+
+# Columns of the raw csv files parsed from the XML information tables
+INFO_TABLE_COLUMNS = [
+    'nameOfIssuer',
+    'titleOfClass',
+    'cusip',
+    'value',
+    'shrsOrPrnAmt_sshPrnamt',
+    'shrsOrPrnAmt_sshPrnamtType',
+    'investmentDiscretion',
+    'otherManager',
+    'votingAuthority_Sole',
+    'votingAuthority_Shared',
+    'votingAuthority_None',
+]
+# Columns of the information tables that are parsed as integers
+INFO_TABLE_INT_COLUMNS = {
+    'value',
+    'shrsOrPrnAmt_sshPrnamt',
+    'votingAuthority_Sole',
+    'votingAuthority_Shared',
+    'votingAuthority_None',
+}
+# Mapping from the leaf elements of an infoTable to the columns
+INFO_TABLE_LEAF_TO_COLUMN = {
+    'nameOfIssuer':         'nameOfIssuer',
+    'titleOfClass':         'titleOfClass',
+    'cusip':                'cusip',
+    'value':                'value',
+    'sshPrnamt':            'shrsOrPrnAmt_sshPrnamt',
+    'sshPrnamtType':        'shrsOrPrnAmt_sshPrnamtType',
+    'investmentDiscretion': 'investmentDiscretion',
+    'otherManager':         'otherManager',
+    'Sole':                 'votingAuthority_Sole',
+    'Shared':               'votingAuthority_Shared',
+    'None':                 'votingAuthority_None',
+}
+# Tokenizer of the information tables: opening/closing infoTable tags and leaf elements
+# (the attributes may contain '/', the self-closing elements are not leaves)
+_INFO_TABLE_TOKEN = (
+    r'<(/?)(?:[A-Za-z_][\w.-]*:)?(infoTable)\b[^>]*>'
+    r'|<(?:[A-Za-z_][\w.-]*:)?([A-Za-z_][\w.-]*)\b[^>]*(?<!/)>([^<]*)</'
+)
+_INFO_TABLE_TOKENS = (
+    re.compile(_INFO_TABLE_TOKEN),
+    re.compile(_INFO_TABLE_TOKEN.encode()),
+)
+# CDATA sections and comments (not handled by the tokenizer)
+_XML_SPECIAL = (
+    re.compile(r'<!\[CDATA\[|<!--'),
+    re.compile(rb'<!\[CDATA\[|<!--'),
+)
+# Tags of the SGML envelope of the complete submission text files
+_ENVELOPE_TAGS_PATTERN = r'<(/?)(SEC-HEADER|IMS-HEADER|DOCUMENT|XML|TABLE)>|<TYPE>([^\r\n<]*)'
+_ENVELOPE_TAGS = (
+    re.compile(_ENVELOPE_TAGS_PATTERN),
+    re.compile(_ENVELOPE_TAGS_PATTERN.encode()),
+)
+# Accession number in the SEC-HEADER block
+_ACCESSION_NUMBER = (
+    re.compile(r'ACCESSION NUMBER:\s*([\d-]+)'),
+    re.compile(rb'ACCESSION NUMBER:\s*([\d-]+)'),
+)
+# Format of a complete accession number (the meta files of the first versions only kept its first digits)
+_ACCESSION_NUMBER_FORMAT = re.compile(r'\d{10}-\d{2}-\d{6}')
+# Number of bytes at the start of a filing searched for the accession number
+ACCESSION_NUMBER_PEEK_SIZE = 1 << 16
+# Fields of the SEC-HEADER block
+_SEC_HEADER_PATTERNS = {
+    'accession_number':           _ACCESSION_NUMBER[0],
+    'conformed_period_of_report': re.compile(r'CONFORMED PERIOD OF REPORT:\s*(\d+)'),
+    'filed_as_of_date':           re.compile(r'FILED AS OF DATE:\s*(\d+)'),
+    'company_conformed_name':     re.compile(r'COMPANY CONFORMED NAME:\s*(.+)'),
+    'central_index_key':          re.compile(r'CENTRAL INDEX KEY:\s*(\d+)'),
+}
+# Size of the chunks of base64 characters decoded at once (multiple of 4)
+BASE64_CHUNK_SIZE = 1 << 22
+# Size of the chunks fed to the incremental XML parser
+XML_CHUNK_SIZE = 1 << 20
+
+# Cache of the background jobs of the app (imports)
+JOBS_CACHE_DIR = "output/.jobs"
+# Range of the progress bar (in %) covered by each stage of an import, and its label
+INGEST_PROGRESS_STAGES = {
+    'parse':    (0,  70,  "Parsing file"),
+    'clean':    (70, 80,  "Cleaning cik"),
+    'map':      (80, 90,  "Mapping cik"),
+    'merge':    (90, 95,  "Merging cik"),
+    'snapshot': (95, 100, "Rendering cik"),
+}
+
+# Spool directory of the chunked uploads of the app (partial files, complete files and ingest reports)
+UPLOAD_SPOOL_DIR = "output/.uploads"
+# Route of the chunked uploads on the server of the app
+UPLOAD_ROUTE = "/_diff13f/upload"
+# Size of the chunks sent by the browser
+UPLOAD_CHUNK_SIZE = 1 << 22
+# Size of the blocks copied from a request to the spool file
+UPLOAD_COPY_SIZE = 1 << 20
+# Interval in seconds between two checks of the ingest of the uploaded files
+UPLOAD_POLL_INTERVAL = 0.2
+# Seconds without any uploaded file ingested after which the files still waiting are skipped
+UPLOAD_INGEST_TIMEOUT = 600
+# Heartbeat of the ingest process of `diff13f serve` (touched every INGEST_HEARTBEAT_INTERVAL seconds),
+# which is considered stopped after INGEST_HEARTBEAT_TIMEOUT seconds without it
+INGEST_HEARTBEAT_FILE     = "output/.uploads/ingest.heartbeat"
+INGEST_HEARTBEAT_INTERVAL = 1
+INGEST_HEARTBEAT_TIMEOUT  = 10
+# Identifier of an upload (computed by the browser from the name, size and date of the file)
+_UPLOAD_ID = re.compile(r'^[A-Za-z0-9_-]{1,128}$')
+# Base URLs of the EDGAR submissions (list of the filings of a cik) and archives (filings)
+FETCH_SUBMISSIONS_URL = "https://data.sec.gov/submissions"
+FETCH_ARCHIVES_URL    = "https://www.sec.gov/Archives/edgar/data"
+# User-Agent of the requests to EDGAR (the SEC asks for a name and a contact email)
+FETCH_USER_AGENT = "diff13f admin@example.com"
+# Forms fetched from EDGAR
+FETCH_FORMS = ['13F-HR', '13F-HR/A']
+# Maximum number of requests per second (the fair access policy of EDGAR allows 10)
+FETCH_RATE_LIMIT = 10
+# Number of downloads in flight at once
+FETCH_CONCURRENCY = 8
+# Number of downloaded filings parsed at once while the next ones are downloaded
+FETCH_BATCH_SIZE = 64
+# Number of retries of a failed request, and delay in seconds before the first retry (doubled at each retry)
+FETCH_RETRIES       = 3
+FETCH_RETRY_BACKOFF = 1.0
+# Timeout in seconds of a request
+FETCH_TIMEOUT = 30
+# HTTP status codes of the requests that are retried
+FETCH_RETRY_STATUS = {429, 500, 502, 503, 504}
+# Types of the archives of filings by suffix (their .txt members are parsed without being extracted)
+ARCHIVE_SUFFIXES = {
+    '.zip':     'zip',
+    '.tar':     'tar',
+    '.tar.gz':  'tar-compressed',
+    '.tgz':     'tar-compressed',
+    '.tar.bz2': 'tar-compressed',
+    '.tbz2':    'tar-compressed',
+    '.tar.xz':  'tar-compressed',
+    '.txz':     'tar-compressed',
+    '.gz':      'gz',
+    '.bz2':     'bz2',
+    '.xz':      'xz',
+}
+# Openers of the single compressed filings by type of archive
+COMPRESSED_OPENERS = {
+    'gz':  gzip.open,
+    'bz2': bz2.open,
+    'xz':  lzma.open,
+}
+# Tables of the quarterly Form 13F data sets of the SEC (ZIP files)
+BULK_SUBMISSION_FILE = "SUBMISSION.tsv"
+BULK_COVERPAGE_FILE  = "COVERPAGE.tsv"
+BULK_INFOTABLE_FILE  = "INFOTABLE.tsv"
+# Columns of INFOTABLE.tsv -> columns of the raw tables
+BULK_INFOTABLE_COLUMNS = {
+    'NAMEOFISSUER':         'nameOfIssuer',
+    'TITLEOFCLASS':         'titleOfClass',
+    'CUSIP':                'cusip',
+    'VALUE':                'value',
+    'SSHPRNAMT':            'shrsOrPrnAmt_sshPrnamt',
+    'SSHPRNAMTTYPE':        'shrsOrPrnAmt_sshPrnamtType',
+    'INVESTMENTDISCRETION': 'investmentDiscretion',
+    'OTHERMANAGER':         'otherManager',
+    'VOTING_AUTH_SOLE':     'votingAuthority_Sole',
+    'VOTING_AUTH_SHARED':   'votingAuthority_Shared',
+    'VOTING_AUTH_NONE':     'votingAuthority_None',
+}
+# Size of the blocks of INFOTABLE.tsv read at once
+BULK_BLOCK_SIZE = 1 << 22
+# Bounds of the cache of the figures (number of figures, and bytes of their JSON)
+FIGURE_CACHE_MAX_ENTRIES = 256
+FIGURE_CACHE_MAX_BYTES   = 64 << 20
+# Bounds of the cache of the holdings tables loaded in memory (number of cik, and bytes)
+DATA_CACHE_MAX_ENTRIES = 64
+DATA_CACHE_MAX_BYTES   = 512 << 20
+# Route of the counters of the caches
+CACHE_STATS_ROUTE = "/_diff13f/cache"
+# Format of the tables written in the output directory ('csv' or 'parquet')
+STORAGE_FORMAT  = "csv"
+STORAGE_FORMATS = ["csv", "parquet"]
+# Engine of the Polars queries ('streaming' runs them by batches, within a bounded memory)
+POLARS_ENGINE = "streaming"
+# Memory limit of the ingest in bytes, None for no limit (see set_memory_limit)
+MEMORY_LIMIT = None
+# Read-only store: the workers of `diff13f serve` only read the outputs, the ingest process writes them (see set_read_only)
+READ_ONLY = False
+# Estimate of the memory taken by a row of the tables, used to size the streaming batches
+ROW_BYTES_ESTIMATE = 256
+# Ratio between the memory taken by a parsed filing and the size of its file
+FILING_MEMORY_FACTOR = 4
+# Schema of the raw and clean tables
+RAW_SCHEMA = {
+    'nameOfIssuer':               pl.Utf8,
+    'titleOfClass':               pl.Utf8,
+    'cusip':                      pl.Utf8,
+    'value':                      pl.Int64,
+    'shrsOrPrnAmt_sshPrnamt':     pl.Int64,
+    'shrsOrPrnAmt_sshPrnamtType': pl.Utf8,
+    'investmentDiscretion':       pl.Utf8,
+    'otherManager':               pl.Utf8,
+    'votingAuthority_Sole':       pl.Int64,
+    'votingAuthority_Shared':     pl.Int64,
+    'votingAuthority_None':       pl.Int64,
+    'portfolio %':                pl.Float64,
+}
+# Schema of the mapping tables
+MAPPING_SCHEMA = {
+    'nameOfIssuer': pl.Utf8,
+    'titleOfClass': pl.Utf8,
+    'cusip':        pl.Utf8,
+    'name':         pl.Utf8,
+}
+
+# Schema of the holdings tables (long format, one row per holding and quarter)
+HOLDINGS_SCHEMA = {
+    'quarter':      pl.Utf8,
+    'cusip':        pl.Utf8,
+    'nameOfIssuer': pl.Utf8,
+    'name':         pl.Utf8,
+    'value':        pl.Int64,
+    'shares':       pl.Int64,
+    'proportion':   pl.Float64,
+}
+# Columns of the clean tables that are kept in the holdings tables
+HOLDINGS_CLEAN_COLUMNS = {
+    'cusip':                  'cusip',
+    'nameOfIssuer':           'nameOfIssuer',
+    'value':                  'value',
+    'shrsOrPrnAmt_sshPrnamt': 'shares',
+    'portfolio %':            'proportion',
+}
+# Merge keys and target variables of the wide views of the holdings
+MERGE_KEYS       = ['nameOfIssuer', 'cusip', 'name']
+TARGET_VARIABLES = ['proportion', 'shares', 'value']
+
+################################################################################
+################################################################################
+# Storage of the tables
+
+def table_file(
+    stem: str,
+)->str:
+    # File of a table (path without extension) in the current storage format
+    return f"{stem}.{STORAGE_FORMAT}"
+
+def table_stem(
+    path: str,
+)->str:
+    # Name of a table file without directory and extension (e.g. '2024-q1')
+    return os.path.splitext(os.path.basename(path))[0]
+
+def find_table(
+    stem: str,
+):
+    """
+    Return the existing file of a table whatever its format (the current format first), None if missing.
+    """
+    for storage_format in [STORAGE_FORMAT] + STORAGE_FORMATS:
+        path = f"{stem}.{storage_format}"
+        if os.path.exists(path):
+            return path
+    return None
+
+def list_tables(
+    directory: str,
+):
+    """
+    Return the sorted list of the table files of a directory (a single file per table).
+    """
+    d_stem_to_file = {}
+    for storage_format in STORAGE_FORMATS:
+        for path in glob.glob(os.path.join(directory, f"*.{storage_format}")):
+            stem = table_stem(path)
+            if stem not in d_stem_to_file or storage_format == STORAGE_FORMAT:
+                d_stem_to_file[stem] = path
+    return [d_stem_to_file[stem] for stem in sorted(d_stem_to_file)]
+
+def scan_table(
+    path: str,
+    schema_overrides = None,
+):
+    """
+    Lazily scan a table file (csv or parquet), so that the column projections
+    and the filters are pushed down to the reader.
+    """
+    if path.endswith(".parquet"):
+        df_lazy = pl.scan_parquet(path)
+        if schema_overrides:
+            names   = df_lazy.collect_schema().names()
+            df_lazy = df_lazy.with_columns([
+                pl.col(column).cast(dtype) for column, dtype in schema_overrides.items() if column in names
+            ])
+        return df_lazy
+    return pl.scan_csv(path, schema_overrides=schema_overrides)
+
+def read_table(
+    path: str,
+    columns          = None,
+    schema_overrides = None,
+    filters          = None,
+):
+    """
+    Read a table file (csv or parquet) keeping only the given columns and the rows matching the filters.
+    """
+    df_lazy = scan_table(path, schema_overrides=schema_overrides)
+    if columns is not None:
+        df_lazy = df_lazy.select(columns)
+    if filters is not None:
+        df_lazy = df_lazy.filter(filters)
+    return df_lazy.collect(engine=POLARS_ENGINE)
+
+def write_table(
+    df,
+    stem: str,
+    schema = None,
+):
+    """
+    Write a table (polars DataFrame or LazyFrame) in the current storage format and
+    remove the file of the same table in the other formats. With parquet, the
+    columns are cast to the given schema and the column statistics are written.
+    A LazyFrame is streamed to a temporary file by a sink, so it is never fully
+    materialized and it can read the file it replaces.
+    Returns the path of the written file.
+    """
+    path = table_file(stem)
+    if STORAGE_FORMAT == "parquet" and schema:
+        names = df.collect_schema().names() if isinstance(df, pl.LazyFrame) else df.columns
+        df = df.with_columns([
+            pl.col(column).cast(dtype) for column, dtype in schema.items() if column in names
+        ])
+    if isinstance(df, pl.LazyFrame):
+        path_tmp = path + ".tmp"
+        if STORAGE_FORMAT == "parquet":
+            df.sink_parquet(path_tmp, statistics=True, engine=POLARS_ENGINE)
+        else:
+            df.sink_csv(path_tmp, engine=POLARS_ENGINE)
+        os.replace(path_tmp, path)
+    elif STORAGE_FORMAT == "parquet":
+        df.write_parquet(path, statistics=True)
+    else:
+        df.write_csv(path)
+    remove_other_tables(stem)
+    return path
+
+def set_memory_limit(
+    memory_limit_mb,
+):
+    """
+    Cap the memory materialized at once by the ingest: the size of the batches of
+    the streaming engine, and the size of the filings parsed at once (see
+    parse_filings_to_raw_csv). None removes the limit.
+    """
+    global MEMORY_LIMIT
+    if memory_limit_mb is None:
+        MEMORY_LIMIT = None
+        pl.Config.set_streaming_chunk_size(None)
+        return
+    MEMORY_LIMIT = int(memory_limit_mb*(1 << 20))
+    # Each thread of the streaming engine holds its own batch
+    pl.Config.set_streaming_chunk_size(max(1_000, MEMORY_LIMIT//(ROW_BYTES_ESTIMATE*pl.thread_pool_size())))
+
+def set_read_only(
+    read_only,
+):
+    """
+    Open the store read-only in this process: the catalog is opened in read-only
+    mode and the functions that write the outputs raise a PermissionError. The
+    writes are left to the ingest process (see run_ingest_process).
+    """
+    global READ_ONLY
+    READ_ONLY = bool(read_only)
+
+def check_writable(
+    action,
+):
+    # Raise if the store is read-only in this process
+    if READ_ONLY:
+        raise PermissionError(f"the store is read-only in this process: {action} is left to the ingest process.")
+
+def get_store_settings():
+    # Settings of the store set from the command line (given to the spawned background jobs)
+    return {
+        'storage_format':  STORAGE_FORMAT,
+        'memory_limit_mb': None if MEMORY_LIMIT is None else MEMORY_LIMIT/(1 << 20),
+        'read_only':       READ_ONLY,
+        'data_cache_mb':   DATA_CACHE.max_bytes/(1 << 20),
+    }
+
+def apply_store_settings(
+    settings,
+):
+    # Apply the settings of get_store_settings in a spawned process
+    global STORAGE_FORMAT
+    STORAGE_FORMAT = settings['storage_format']
+    set_memory_limit(settings['memory_limit_mb'])
+    set_read_only(settings.get('read_only', False))
+    # Cap of the holdings tables kept in memory (used by the workers of `diff13f serve`)
+    if settings.get('data_cache_mb') is not None:
+        DATA_CACHE.max_bytes = int(settings['data_cache_mb']*(1 << 20))
+
+def set_storage_format(
+    storage_format = None,
+):
+    """
+    Set the storage format of this process to the one saved with the output
+    directory in its catalog (see rebuild_catalog). A given format is saved for an
+    output directory without filings; one that differs from the format of the
+    filings already stored raises a ValueError (convert them with migrate_store).
+    Returns the storage format.
+    """
+    global STORAGE_FORMAT
+    if storage_format is not None:
+        STORAGE_FORMAT = storage_format
+    # Without output directory, the format is saved when the catalog is built
+    if not os.path.isdir(os.path.dirname(CATALOG_FILE)):
+        return STORAGE_FORMAT
+    with open_catalog() as db:
+        saved     = db.execute("SELECT value FROM settings WHERE key = 'storage_format'").fetchone()[0]
+        n_filings = db.execute("SELECT COUNT(*) FROM filings").fetchone()[0]
+        if storage_format is None or storage_format == saved:
+            STORAGE_FORMAT = saved
+        elif n_filings == 0 and not READ_ONLY:
+            db.execute("UPDATE settings SET value = ? WHERE key = 'storage_format'", (storage_format,))
+        else:
+            raise ValueError(f"the output directory is stored as {saved}: convert it first with `diff13f migrate --to {storage_format}`.")
+    return STORAGE_FORMAT
+
+def remove_other_tables(
+    stem: str,
+):
+    # Remove the files of a table that are not in the current storage format
+    for storage_format in STORAGE_FORMATS:
+        if storage_format != STORAGE_FORMAT and os.path.exists(f"{stem}.{storage_format}"):
+            os.remove(f"{stem}.{storage_format}")
+
+def migrate_store(
+    storage_format,
+    verbose = False,
+):
+    """
+    Convert all the tables (raw, clean, mapping and merge) of the output directory to the given format.
+    The holdings tables missing in the output folders of the former versions are built.
+    Returns the number of converted files.
+    """
+    check_writable("the migration of the store")
+    global STORAGE_FORMAT
+    STORAGE_FORMAT = storage_format
+    n_files = 0
+    for cik_folder in get_cik_folders():
+        for layer in ['raw', 'clean', 'mapping', 'merge']:
+            for path in list_tables(f"{cik_folder}/{layer}"):
+                if path.endswith(f".{storage_format}"):
+                    continue
+                stem = table_stem(path)
+                if layer in ['raw', 'clean']:
+                    schema = RAW_SCHEMA
+                elif layer == 'mapping':
+                    schema = MAPPING_SCHEMA
+                elif stem == 'holdings':
+                    schema = HOLDINGS_SCHEMA
+                else:
+                    # e.g. 'cusip_to_value': the merge key is the first column
+                    schema = {stem.split('_to_')[0]: pl.Utf8}
+                write_table(
+                    df     = scan_table(path, schema_overrides=schema),
+                    stem   = f"{cik_folder}/{layer}/{stem}",
+                    schema = schema,
+                )
+                n_files += 1
+                if verbose:
+                    print(f"Converted {path}")
+        # Build the holdings table of the output folders of the former versions
+        cik = cik_folder.split('/')[1]
+        if find_table(f"{cik_folder}/merge/holdings") is None and list_tables(f"{cik_folder}/clean"):
+            build_holdings_table(
+                cik_set = {cik},
+                verbose = verbose,
+            )
+        # The holdings table was rewritten: render the snapshots again
+        write_figure_snapshots(
+            cik_set = {cik},
+            verbose = verbose,
+        )
+        # The raw files changed of extension: update their signatures
+        if os.path.exists(f"{cik_folder}/deps.json"):
+            deps = load_cik_dependencies(cik)
+            for quarter, signature in deps['clean'].items():
+                raw_files = [table_file(f"{cik_folder}/raw/{table_stem(raw_file)}") for raw_file in signature]
+                deps['clean'][quarter] = {
+                    os.path.basename(raw_file): _file_signature(raw_file) for raw_file in raw_files if os.path.exists(raw_file)
+                }
+            save_cik_dependencies(cik, deps)
+    # The default format of the next runs
+    with open_catalog() as db:
+        db.execute("INSERT OR REPLACE INTO settings VALUES ('storage_format', ?)", (storage_format,))
+    return n_files
+
+################################################################################
+################################################################################
+# Caches
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by a number of entries and a total size in bytes.
+    The size of each value is given when it is put. The hits and misses are counted.
+    """
+
+    def __init__(
+        self,
+        max_entries,
+        max_bytes,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes   = max_bytes
+        self.n_bytes     = 0
+        self.hits        = 0
+        self.misses      = 0
+        self._entries    = OrderedDict()
+        self._lock       = threading.Lock()
+
+    def get(
+        self,
+        key,
+        default = None,
+    ):
+        # Return the value of a key and mark it as the most recently used
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(
+        self,
+        key,
+        value,
+        size,
+    ):
+        # Add a value, then evict the least recently used ones beyond the bounds (a value larger than the bound is not kept)
+        with self._lock:
+            if key in self._entries:
+                self.n_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.n_bytes += size
+            while len(self._entries) > self.max_entries or self.n_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.n_bytes -= evicted_size
+
+    def pop(
+        self,
+        key,
+    ):
+        # Remove a key if present
+        with self._lock:
+            if key in self._entries:
+                self.n_bytes -= self._entries.pop(key)[1]
+
+    def remove_if(
+        self,
+        predicate,
+    ):
+        # Remove the keys for which predicate(key) is true
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self.n_bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.n_bytes = 0
+
+    def stats(self):
+        # Counters of the cache
+        with self._lock:
+            return {
+                'hits':        self.hits,
+                'misses':      self.misses,
+                'entries':     len(self._entries),
+                'bytes':       self.n_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes':   self.max_bytes,
+            }
+
+# Cache of the serialized figures of the app (see cached_figure)
+FIGURE_CACHE = LRUCache(
+    max_entries = FIGURE_CACHE_MAX_ENTRIES,
+    max_bytes   = FIGURE_CACHE_MAX_BYTES,
+)
+
+# Cache of the holdings tables of the cik, shared by all the figures (see load_holdings)
+DATA_CACHE = LRUCache(
+    max_entries = DATA_CACHE_MAX_ENTRIES,
+    max_bytes   = DATA_CACHE_MAX_BYTES,
+)
+
+def get_store_version(
+    cik,
+):
+    """
+    Version of the store of a cik: the signature of its holdings table, which
+    changes whenever the table is rewritten (by an ingest or a migration).
+    """
+    path = find_table(f"output/{cik}/merge/holdings")
+    return None if path is None else tuple(_file_signature(path))
+
+def figure_key(
+    function,
+    **kwargs,
+):
+    """
+    Key of the figure of a figure generator (e.g. generate_all_quarters_top_n_figure):
+    the generator and all its arguments (cik, quarters, merge key, top N, ...)
+    with the store version of the cik, so the key of the figures of a cik
+    changes as soon as its data changes.
+    """
+    arguments = inspect.signature(function).bind(**kwargs)
+    arguments.apply_defaults()
+    return (
+        function.__name__,
+        tuple(arguments.arguments.items()),
+        get_store_version(arguments.arguments.get('cik')),
+    )
+
+def render_key(
+    function,
+    **kwargs,
+):
+    # Key of a figure as kept by the store of its graph (JSON: the tuples become lists)
+    return json.loads(json.dumps(figure_key(function, **kwargs)))
+
+def cached_figure(
+    function,
+    **kwargs,
+):
+    """
+    Return the figure of a figure generator (e.g. generate_all_quarters_top_n_figure) as
+    a dict, from FIGURE_CACHE if possible (see figure_key for the key, so the
+    figures of a cik are invalidated as soon as its data changes).
+    The figures are kept serialized to JSON. A generator may also return the data
+    of figures rendered in the browser (e.g. generate_proportion_matrix).
+    """
+    key = figure_key(function, **kwargs)
+    figure_json = FIGURE_CACHE.get(key)
+    if figure_json is None:
+        # The default figures of a cik are read from its snapshots, if up to date
+        figure_json = read_figure_snapshot(function, **kwargs)
+        if figure_json is None:
+            figure_json = pio.to_json(function(**kwargs), validate=False)
+        FIGURE_CACHE.put(
+            key   = key,
+            value = figure_json,
+            size  = len(figure_json),
+        )
+    return json.loads(figure_json)
+
+################################################################################
+################################################################################
+# Snapshots of the default figures
+
+def snapshot_file(
+    cik,
+    function,
+):
+    # File of the snapshot of a figure generator for a cik
+    return f"output/{cik}/snapshots/{function.__name__}.json"
+
+def default_figures(
+    cik,
+):
+    """
+    The figures sent when a cik is selected, as a list of (generator, arguments):
+    the proportion matrix from which the browser renders the one quarter and two
+    quarters figures, and the total value over time (the default of its dropdown).
+    """
+    return [
+        (generate_proportion_matrix, {'cik': cik}),
+        (generate_all_quarters_total_value_figure, {'cik': cik}),
+    ]
+
+def read_figure_snapshot(
+    function,
+    **kwargs,
+):
+    """
+    Return the JSON of a figure from the snapshot of its generator, or None if there
+    is no snapshot for these arguments or if the store of the cik changed since.
+    A snapshot file holds the render key of the figure on its first line, then the figure.
+    """
+    cik = kwargs.get('cik')
+    if not cik:
+        return None
+    try:
+        with open(snapshot_file(cik, function), encoding="utf-8") as f:
+            key = json.loads(f.readline())
+            if key != render_key(function, **kwargs):
+                return None
+            return f.read()
+    except (OSError, ValueError):
+        return None
+
+def write_figure_snapshots(
+    cik_set  = None,
+    verbose  = False,
+    progress = None,
+):
+    """
+    For each cik, render the default figures (see default_figures) and save them as
+    compact JSON in 'output/<cik>/snapshots', so the first view of a cik is a file read.
+    The snapshots of the former default figures are removed.
+    Only the stale snapshots (other arguments or older store version) are rendered again.
+    Returns the number of snapshots written.
+    """
+    cik_folders = get_cik_folders(
+        cik_set = cik_set,
+    )
+    n_written = 0
+    for i_cik, cik_folder in enumerate(cik_folders):
+        # Report the progress
+        if progress is not None:
+            progress('snapshot', i_cik, len(cik_folders))
+        # Take the cik
+        cik = cik_folder.split('/')[1]
+        if find_table(f"{cik_folder}/merge/holdings") is None:
+            continue
+        os.makedirs(f"{cik_folder}/snapshots", exist_ok=True)
+        figures = default_figures(cik)
+        snapshot_files = {snapshot_file(cik, function) for function, _ in figures}
+        for path in glob.glob(f"{cik_folder}/snapshots/*.json"):
+            if path not in snapshot_files:
+                os.remove(path)
+        for function, kwargs in figures:
+            if read_figure_snapshot(function, **kwargs) is not None:
+                continue
+            # Write the key and the figure, then replace the former snapshot at once
+            output_file = snapshot_file(cik, function)
+            with open(f"{output_file}.tmp", "w", encoding="utf-8") as f:
+                f.write(json.dumps(render_key(function, **kwargs)) + "\n")
+                f.write(pio.to_json(function(**kwargs), validate=False))
+            os.replace(f"{output_file}.tmp", output_file)
+            n_written += 1
+            if verbose:
+                print(f"Saved snapshot {output_file}")
+    catalog_stage_done(cik_folders, 'snapshot')
+    if progress is not None:
+        progress('snapshot', len(cik_folders), len(cik_folders))
+    return n_written
+
+################################################################################
+################################################################################
+# Catalog of the output directory
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ciks (
+    cik                    TEXT PRIMARY KEY,
+    company_conformed_name TEXT
+);
+CREATE TABLE IF NOT EXISTS filings (
+    accession_number       TEXT UNIQUE,
+    cik                    TEXT NOT NULL,
+    sha256                 TEXT,
+    period                 TEXT,
+    quarter                TEXT,
+    filed                  TEXT,
+    company_conformed_name TEXT,
+    meta_file              TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS filings_by_cik ON filings (cik, meta_file);
+CREATE TABLE IF NOT EXISTS quarters (
+    cik     TEXT NOT NULL,
+    quarter TEXT NOT NULL,
+    PRIMARY KEY (cik, quarter)
+);
+CREATE TABLE IF NOT EXISTS stages (
+    cik     TEXT NOT NULL,
+    stage   TEXT NOT NULL,
+    status  TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (cik, stage)
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+@contextlib.contextmanager
+def open_catalog():
+    """
+    Open the catalog of the output directory, a SQLite database that indexes the
+    filings, the cik, their quarters and the status of their stages. A missing
+    catalog (or one of an older version) is built from the output directory (see
+    rebuild_catalog). The changes made in the with block are committed at its end
+    in a single transaction, or rolled back if it raises.
+    The connection of a thread is kept open for its next queries. In a read-only
+    process (see set_read_only), the catalog is opened read-only and must exist.
+    """
+    connections = _CATALOG_CONNECTIONS.__dict__.setdefault('connections', {})
+    key = (os.getpid(), os.path.abspath(CATALOG_FILE), READ_ONLY)
+    db  = connections.get(key)
+    # Open the catalog on the first use in the thread (or if its file was removed since)
+    if db is None or not os.path.exists(key[1]):
+        if db is not None:
+            db.close()
+        if READ_ONLY:
+            # The ingest process builds the catalog before the workers read it
+            if not os.path.exists(key[1]):
+                raise FileNotFoundError(f"missing catalog {CATALOG_FILE}: start the ingest process first (diff13f serve).")
+            db = sqlite3.connect(f"file:{key[1]}?mode=ro", uri=True, timeout=CATALOG_TIMEOUT)
+        else:
+            os.makedirs(os.path.dirname(CATALOG_FILE), exist_ok=True)
+            db = sqlite3.connect(CATALOG_FILE, timeout=CATALOG_TIMEOUT)
+            if db.execute("PRAGMA user_version").fetchone()[0] < CATALOG_VERSION:
+                # WAL: the readers (the app) are not blocked by the ingest
+                db.execute("PRAGMA journal_mode=WAL")
+                db.executescript(CATALOG_SCHEMA)
+                with db:
+                    rebuild_catalog(db)
+                # The former registry of the ingested filings is now in the catalog
+                if os.path.exists(INGEST_REGISTRY_FILE):
+                    os.remove(INGEST_REGISTRY_FILE)
+        connections[key] = db
+    with db:
+        yield db
+
+def rebuild_catalog(
+    db,
+):
+    """
+    Fill the catalog from the output directory: the meta files of the filings, the
+    clean tables of the quarters, and the status of the stages from their outputs.
+    The content hashes of the filings are kept (or imported from the former JSON
+    registry of the ingested filings). The storage format is kept, or taken from
+    the raw tables (the current one for a new output directory).
+    The truncated accession numbers of the meta files of the first versions are
+    unknown (see valid_accession_number): these filings are identified by their
+    meta file. Returns the number of filings.
+    """
+    # Content hashes of the filings already known
+    sha256s = {
+        accession_number: sha256
+        for accession_number, sha256 in db.execute("SELECT accession_number, sha256 FROM filings")
+        if valid_accession_number(accession_number)
+    }
+    if os.path.exists(INGEST_REGISTRY_FILE):
+        with open(INGEST_REGISTRY_FILE, "r", encoding="utf-8") as f:
+            sha256s.update({
+                accession_number: entry['sha256']
+                for accession_number, entry in json.load(f).items()
+                if valid_accession_number(accession_number)
+            })
+    for table in ['ciks', 'filings', 'quarters', 'stages']:
+        db.execute(f"DELETE FROM {table}")
+    n_filings = 0
+    n_tables  = {storage_format: 0 for storage_format in STORAGE_FORMATS}
+    for cik_folder in sorted(glob.glob("output/"+10*"[0-9]")):
+        cik = cik_folder.split('/')[-1]
+        # The filings of the cik (the folders without raw table are not outputs of an ingest)
+        raw_files = list_tables(f"{cik_folder}/raw")
+        if not raw_files:
+            continue
+        for raw_file in raw_files:
+            n_tables[raw_file.rsplit('.', 1)[-1]] += 1
+        for meta_file in sorted(glob.glob(f"{cik_folder}/meta/*.json")):
+            with open(meta_file, "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+            accession_number = valid_accession_number(metadata.get('accession_number'))
+            catalog_filing(
+                db       = db,
+                metadata = dict(metadata, central_index_key=cik, accession_number=accession_number),
+                sha256   = sha256s.get(accession_number),
+            )
+            n_filings += 1
+        # The quarters and the stages whose outputs exist
+        quarters = [table_stem(filename) for filename in list_tables(f"{cik_folder}/clean")]
+        db.executemany("INSERT INTO quarters VALUES (?, ?)", [(cik, quarter) for quarter in quarters])
+        outputs = {
+            'clean':    bool(quarters),
+            'map':      find_table(f"{cik_folder}/mapping/nameOfIssuer_titleOfClass_cusip") is not None,
+            'merge':    find_table(f"{cik_folder}/merge/holdings") is not None,
+            'snapshot': bool(glob.glob(f"{cik_folder}/snapshots/*.json")),
+        }
+        for stage, exists in outputs.items():
+            set_stage_status(db, [cik], stage, 'done' if exists else 'pending')
+    # Format of most of the raw tables (the output directory may be half migrated)
+    if any(n_tables.values()):
+        storage_format = max(STORAGE_FORMATS, key=lambda storage_format: n_tables[storage_format])
+    else:
+        storage_format = STORAGE_FORMAT
+    db.execute("INSERT OR IGNORE INTO settings VALUES ('storage_format', ?)", (storage_format,))
+    db.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+    return n_filings
+
+def valid_accession_number(
+    accession_number,
+):
+    # The accession number if it is complete, otherwise None (unknown)
+    if isinstance(accession_number, str) and _ACCESSION_NUMBER_FORMAT.fullmatch(accession_number):
+        return accession_number
+    return None
+
+def catalog_filing(
+    db,
+    metadata,
+    sha256   = None,
+    holdings = True,
+):
+    """
+    Add (or replace) a filing exported by export_raw_csv to the catalog. The name
+    of its cik becomes the name of its latest filing. A filing with holdings adds
+    its cik to the catalog, whose stages are pending until its outputs are updated.
+    """
+    cik              = metadata['central_index_key']
+    accession_number = metadata.get('accession_number')
+    meta_file        = f"output/{cik}/meta/{metadata['quarter']}_{metadata['filed_as_of_date']}.json"
+    # A meta file is the output of a single filing: it replaces the filing written there before
+    # (e.g. a filing of a former version, without accession number, ingested again)
+    db.execute("DELETE FROM filings WHERE meta_file = ?", (meta_file,))
+    db.execute(
+        "INSERT OR REPLACE INTO filings VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            accession_number,
+            cik,
+            sha256,
+            metadata.get('conformed_period_of_report'),
+            metadata['quarter'],
+            metadata['filed_as_of_date'],
+            metadata.get('company_conformed_name'),
+            meta_file,
+        ),
+    )
+    # Name of the latest filing (meta files sorted by quarter then date, like the former scan)
+    latest_name = "SELECT company_conformed_name FROM filings WHERE cik = ? ORDER BY meta_file DESC LIMIT 1"
+    if not holdings:
+        db.execute(f"UPDATE ciks SET company_conformed_name = ({latest_name}) WHERE cik = ?", (cik, cik))
+        return
+    db.execute(
+        f"""
+        INSERT INTO ciks VALUES (?, ({latest_name}))
+        ON CONFLICT (cik) DO UPDATE SET company_conformed_name = excluded.company_conformed_name
+        """,
+        (cik, cik),
+    )
+    set_stage_status(db, [cik], CATALOG_STAGES, 'pending')
+
+def set_stage_status(
+    db,
+    ciks,
+    stages,
+    status = 'done',
+):
+    # Status ('pending' or 'done') of one or several stages of the given cik
+    if isinstance(stages, str):
+        stages = [stages]
+    updated = time.time()
+    db.executemany(
+        "INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?)",
+        [(cik, stage, status, updated) for cik in ciks for stage in stages],
+    )
+
+def catalog_quarters(
+    cik,
+    quarters,
+):
+    # Quarters of the clean tables of a cik, once the 'clean' stage is done
+    with open_catalog() as db:
+        db.execute("DELETE FROM quarters WHERE cik = ?", (cik,))
+        db.executemany("INSERT INTO quarters VALUES (?, ?)", [(cik, quarter) for quarter in quarters])
+        set_stage_status(db, [cik], 'clean')
+
+def catalog_stage_done(
+    cik_folders,
+    stage,
+):
+    # Mark a stage as done for the cik of the given folders
+    with open_catalog() as db:
+        set_stage_status(db, [cik_folder.split('/')[-1] for cik_folder in cik_folders], stage)
+
+def remove_catalog_cik(
+    cik,
+):
+    # Remove a cik and its filings from the catalog
+    with open_catalog() as db:
+        for table in ['ciks', 'filings', 'quarters', 'stages']:
+            db.execute(f"DELETE FROM {table} WHERE cik = ?", (cik,))
+
+def get_cik_names():
+    # Dict that maps each cik of the catalog to its company conformed name (sorted by cik)
+    with open_catalog() as db:
+        return {cik: name or "" for cik, name in db.execute("SELECT cik, company_conformed_name FROM ciks ORDER BY cik")}
+
+def get_pending_stages():
+    # Dict that maps the cik whose outputs are not up to date to their pending stages
+    pending = {}
+    with open_catalog() as db:
+        for cik, stage in db.execute("SELECT cik, stage FROM stages WHERE status = 'pending' ORDER BY cik"):
+            pending.setdefault(cik, []).append(stage)
+    return {cik: sorted(stages, key=CATALOG_STAGES.index) for cik, stages in pending.items()}
+
 ################################################################################
 ################################################################################
 # Utility functions
@@ -57,8 +1112,9 @@ FIG_WIDTH = 960
 def get_cik_folders(
     cik_set = None,
 ):
-    # Look at the cik folders in the output directory
-    cik_folders = sorted(glob.glob("output/"+10*"[0-9]"))
+    # Look at the cik of the catalog
+    with open_catalog() as db:
+        cik_folders = [f"output/{cik}" for (cik,) in db.execute("SELECT cik FROM ciks ORDER BY cik")]
     # If a set of cik is provided, limit to this set
     if isinstance(cik_set, set):
         cik_folders = [cik_folder for cik_folder in cik_folders if cik_folder.split('/')[-1] in cik_set]
@@ -69,8 +1125,9 @@ def get_cik_quarters(
     cik,
     ascending = True
 ):
-    # Look at the cik folders in the output directory
-    quarters = sorted([filename.split('/')[-1].split('.')[0] for filename in glob.glob(f"output/{cik}/clean/*.csv")])
+    # Look at the quarters of the cik in the catalog
+    with open_catalog() as db:
+        quarters = [quarter for (quarter,) in db.execute("SELECT quarter FROM quarters WHERE cik = ? ORDER BY quarter", (cik,))]
     # Reverse if needed
     if not ascending:
         quarters = quarters[::-1]
@@ -97,12 +1154,15 @@ def date_to_quarter(
         raise ValueError(f"Invalid month: {month}")
     return f"{year}-{quarter}"
 
-def parse_13f_fwf(
-    text: str,
-    verbose = False,
+def detect_13f_fwf_layout(
+    rows,
 ):
-    # Split the text in rows
-    rows = text.splitlines()
+    """
+    Detect the layout of a FWF table from its rows.
+    Returns the pair (i_S_C, col_starts) where i_S_C is the index of the row that
+    defines the columns (a row with <S> and <C>, or a ruler of underscores) and
+    col_starts are the positions of the start of the columns, or None if not found.
+    """
     # Find the first row with a <S> and multiple <C>
     i_S_C = None
     kind = None
@@ -129,54 +1189,19 @@ def parse_13f_fwf(
         col_starts = [m.start() for m in re.finditer('<', row_S_C)]
     elif kind=='_':
         col_starts = [0] + [m.start() for m in re.finditer(r' _', row_S_C)]
-
     if len(col_starts)<6:
         return None
-    # Create a dict d to convert to a DataFrame
-    d = {
-        'nameOfIssuer'           : [],
-        'titleOfClass'           : [],
-        'cusip'                  : [],
-        'value'                  : [],
-        'shrsOrPrnAmt_sshPrnamt' : [],
-    }
-    # Loop over the rows that contain relevant information
-    for row in rows[i_S_C+1:]:
-        # If the row is too short, skip it
-        if len(row)<col_starts[-1]:
-            continue
-        # Take the first five components
-        nameOfIssuer           = row[col_starts[0]:col_starts[1]].strip()
-        titleOfClass           = row[col_starts[1]:col_starts[2]].strip()
-        cusip                  = row[col_starts[2]:col_starts[3]].strip()
-        value                  = row[col_starts[3]:col_starts[4]].strip().replace(',','')
-        shrsOrPrnAmt_sshPrnamt = row[col_starts[4]:col_starts[5]].strip().replace(',','')
-        # If there are any problems, skip the row
-        if len(nameOfIssuer)==0:
-            continue
-        if len(titleOfClass)==0:
-            continue
-        if len(cusip)==0:
-            continue
-        if len(value)==0:
-            continue
-        if len(shrsOrPrnAmt_sshPrnamt)==0:
-            continue
-        try:
-            value = int(value)
-        except:
-            continue
-        try:
-            shrsOrPrnAmt_sshPrnamt = int(shrsOrPrnAmt_sshPrnamt)
-        except:
-            continue
-        # Keep the values
-        d['nameOfIssuer'].append(nameOfIssuer)
-        d['titleOfClass'].append(titleOfClass)
-        d['cusip'].append(cusip)
-        d['value'].append(value)
-        d['shrsOrPrnAmt_sshPrnamt'].append(shrsOrPrnAmt_sshPrnamt)
-    # Convert the dict to a DataFrame
+    return i_S_C, col_starts
+
+def _parse_13f_fwf_rows(
+    rows,
+    col_starts,
+):
+    # Put all the rows in a single Arrow-backed string column
+    df = pl.DataFrame({'row': rows}, schema={'row': pl.Utf8})
+    # If the row is too short, skip it
+    df = df.filter(pl.col('row').str.len_chars() >= col_starts[-1])
+    # Slice the first five components of all the rows at once
     columns = [
         'nameOfIssuer',
         'titleOfClass',
@@ -184,34 +1209,306 @@ def parse_13f_fwf(
         'value',
         'shrsOrPrnAmt_sshPrnamt',
     ]
-    df = pd.DataFrame(d,columns=columns)
-    # Group by name, title and cusip
-    df.groupby(["nameOfIssuer","titleOfClass","cusip"]).sum()
+    exprs = []
+    for column, start, end in zip(columns, col_starts[:5], col_starts[1:6]):
+        expr = pl.col('row').str.slice(start, end-start).str.strip_chars()
+        if column in ['value', 'shrsOrPrnAmt_sshPrnamt']:
+            expr = expr.str.replace_all(',', '', literal=True).cast(pl.Int64, strict=False)
+        exprs.append(expr.alias(column))
+    df = df.select(exprs)
+    # If there are any problems, skip the row
+    df = df.filter(
+        (pl.col('nameOfIssuer').str.len_chars()>0)
+        & (pl.col('titleOfClass').str.len_chars()>0)
+        & (pl.col('cusip').str.len_chars()>0)
+        & pl.col('value').is_not_null()
+        & pl.col('shrsOrPrnAmt_sshPrnamt').is_not_null()
+    )
     # Return the result
     if len(df)==0:
         return None
     else:
         return df
 
-def parse_txt_data_to_raw_csv(
+def parse_13f_fwf(
     text: str,
-    do_scrape_xml = True,
-    do_scrape_txt = True,
-    verbose       = False,
+    verbose = False,
+):
+    """
+    Parse a FWF table of a pre-2013 13F filing with vectorized string operations.
+    """
+    # Split the text in rows
+    rows = text.splitlines()
+    # Detect the layout
+    detected = detect_13f_fwf_layout(rows)
+    if detected is None:
+        return None
+    i_S_C, col_starts = detected
+    # Parse the rows after the row that defines the columns
+    return _parse_13f_fwf_rows(rows[i_S_C+1:], col_starts)
+
+def _pattern_for(
+    data,
+    patterns,
+):
+    # Take the str or the bytes version of a compiled pattern depending on the data
+    return patterns[0] if isinstance(data, str) else patterns[1]
+
+def _xml_local_name(
+    tag: str,
+)->str:
+    """
+    Remove the namespace ('{uri}tag') and the prefix ('ns1:tag') of an XML tag.
+    """
+    return tag.rsplit('}', 1)[-1].rsplit(':', 1)[-1]
+
+def _parse_int(
+    value,
+):
+    # Convert a field of the information table to an integer (None if impossible)
+    if value is None:
+        return None
+    value = value.replace(',', '')
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return int(float(value))
+        except ValueError:
+            return None
+
+def _append_info_table_row(
+    columns,
+    row,
+):
+    # Append a row (dict column -> text) of the information table to the typed columns
+    for column, values in columns.items():
+        value = row.get(column)
+        if value is not None:
+            value = value.strip()
+        if column in INFO_TABLE_INT_COLUMNS:
+            value = _parse_int(value)
+        elif value is None:
+            value = ''
+        values.append(value)
+
+def _parse_info_table_xml_events(
+    xml,
+    chunk_size = XML_CHUNK_SIZE,
+):
+    """
+    Fallback of parse_info_table_xml based on a real incremental XML parser.
+    It is used when the XML contains constructs (CDATA sections, comments) that
+    the tokenizer of parse_info_table_xml does not handle.
+    """
+    # Create the columns
+    columns = {column: [] for column in INFO_TABLE_COLUMNS}
+    # The XML declaration must be at the very start of the document
+    i_start = 0
+    while i_start < len(xml) and xml[i_start] in (' ', '\t', '\r', '\n', 32, 9, 13, 10):
+        i_start += 1
+    # Incremental parser that only reports the start and end of the elements
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    root   = None
+    for i in range(i_start, len(xml), chunk_size):
+        chunk = xml[i:i+chunk_size]
+        if isinstance(chunk, memoryview):
+            chunk = chunk.tobytes()
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == 'start':
+                if root is None:
+                    root = elem
+                continue
+            if _xml_local_name(elem.tag) != 'infoTable':
+                continue
+            # Extract the fields of the row
+            row = {}
+            for child in elem:
+                name = _xml_local_name(child.tag)
+                if name in ('shrsOrPrnAmt', 'votingAuthority'):
+                    for sub in child:
+                        row[f"{name}_{_xml_local_name(sub.tag)}"] = sub.text
+                elif name == 'otherManager' and name in row:
+                    row[name] = f"{row[name]},{child.text}"
+                else:
+                    row[name] = child.text
+            _append_info_table_row(columns, row)
+            # Release the parsed rows
+            root.clear()
+    parser.close()
+    return columns
+
+def parse_info_table_xml(
+    xml,
+):
+    """
+    Incremental (event-based) parser of the XML information table of a 13F filing.
+    The XML (str, bytes or memoryview) is tokenized in a single pass: each opening
+    and closing infoTable tag and each leaf element is an event, and the leaf values
+    are appended to typed columns as they are read, so no tree is ever built in memory.
+    Namespaced and prefixed tags ('ns1:infoTable') are supported.
+    Returns a dict mapping each column of INFO_TABLE_COLUMNS to the list of its values
+    (integers for the columns of INFO_TABLE_INT_COLUMNS), or None if no infoTable is found.
+    """
+    is_text = isinstance(xml, str)
+    # CDATA sections and comments need a real XML parser
+    if _pattern_for(xml, _XML_SPECIAL).search(xml):
+        columns = _parse_info_table_xml_events(xml)
+    else:
+        # Create the columns
+        columns = {column: [] for column in INFO_TABLE_COLUMNS}
+        row     = None
+        # Loop over the events
+        for match in _pattern_for(xml, _INFO_TABLE_TOKENS).finditer(xml):
+            is_closing, is_info_table, name, value = match.groups()
+            if is_info_table:
+                if not is_closing:
+                    # Start of a row
+                    row = {}
+                elif row is not None:
+                    # End of a row
+                    _append_info_table_row(columns, row)
+                    row = None
+                continue
+            if row is None:
+                continue
+            # Leaf element of the row
+            if not is_text:
+                name  = name.decode('ascii')
+                value = value.decode('utf-8', errors='replace')
+            column = INFO_TABLE_LEAF_TO_COLUMN.get(name)
+            if column is None:
+                continue
+            if '&' in value:
+                value = unescape(value)
+            if column in row:
+                # Repeated elements (e.g. otherManager)
+                value = f"{row[column]},{value}"
+            row[column] = value
+    # If no infoTable was found, return nothing
+    if len(columns['nameOfIssuer']) == 0:
+        return None
+    return columns
+
+def envelope_slice(
+    data,
+    span,
+):
+    """
+    Return the part of the data corresponding to a span (start, end) of scan_sgml_envelope.
+    For bytes-like data, a memoryview is returned so that nothing is copied.
+    """
+    if span is None:
+        return None
+    start, end = span
+    if isinstance(data, str):
+        return data[start:end]
+    return memoryview(data)[start:end]
+
+def scan_sgml_envelope(
+    data,
 ):
-    # Define some patterns to look for
-    patterns = {
-        'accession_number': r'ACCESSION NUMBER:\s*(\d+)',
-        'conformed_period_of_report': r'CONFORMED PERIOD OF REPORT:\s*(\d+)',
-        'filed_as_of_date': r'FILED AS OF DATE:\s*(\d+)',
-        'company_conformed_name': r'COMPANY CONFORMED NAME:\s*(.+)',
-        'central_index_key': r'CENTRAL INDEX KEY:\s*(\d+)',
+    """
+    Scan the SGML envelope of a complete submission text file (str, bytes or memoryview) in a single pass.
+    Returns a dict with the spans (start, end) of the different parts of the file:
+    - 'header': the SEC-HEADER block,
+    - 'documents': list of dicts with the 'type', 'start' and 'end' of each document
+      and the spans of their 'xml' payload and of their last 'table' (None if absent),
+    - 'xml': the XML payload of the information table (None if the file contains no XML),
+    - 'table': the last <TABLE>...</TABLE> block of the last document (None if absent).
+    """
+    header        = None
+    header_start  = None
+    documents     = []
+    document      = None
+    xml_start     = None
+    xml_spans     = []
+    table_start   = None
+    first_doc     = None
+    # Loop over the tags of the envelope
+    for match in _pattern_for(data, _ENVELOPE_TAGS).finditer(data):
+        is_closing, tag, doc_type = match.groups()
+        if tag is None:
+            # <TYPE> line of the current document
+            if document is not None and document['type'] is None:
+                document['type'] = doc_type.strip()
+                if not isinstance(doc_type, str):
+                    document['type'] = document['type'].decode('ascii', errors='replace')
+            continue
+        if not isinstance(tag, str):
+            tag = tag.decode('ascii')
+        if tag in ('SEC-HEADER', 'IMS-HEADER'):
+            if not is_closing:
+                header_start = match.end()
+            elif header_start is not None and header is None:
+                header = (header_start, match.start())
+        elif tag == 'DOCUMENT':
+            if not is_closing:
+                document = {
+                    'type':  None,
+                    'start': match.start(),
+                    'end':   None,
+                    'xml':   None,
+                    'table': None,
+                }
+                documents.append(document)
+                if first_doc is None:
+                    first_doc = match.start()
+            elif document is not None:
+                document['end'] = match.end()
+                document = None
+        elif tag == 'XML':
+            if not is_closing:
+                xml_start = match.end()
+            elif xml_start is not None:
+                xml_spans.append((xml_start, match.start(), document))
+                if document is not None:
+                    document['xml'] = (xml_start, match.start())
+                xml_start = None
+        elif tag == 'TABLE':
+            if not is_closing:
+                table_start = match.start()
+            elif table_start is not None:
+                if document is not None:
+                    document['table'] = (table_start, match.end())
+                table_start = None
+    # Without SEC-HEADER block, the header is everything before the first document
+    if header is None:
+        header = (0, first_doc if first_doc is not None else len(data))
+    # The information table is the XML of the INFORMATION TABLE document (else the last XML)
+    xml = None
+    for start, end, doc in xml_spans:
+        if doc is not None and doc['type'] and doc['type'].upper() == 'INFORMATION TABLE':
+            xml = (start, end)
+    if xml is None and xml_spans:
+        xml = xml_spans[-1][:2]
+    # The fixed-width table is the last table of the last document
+    table = documents[-1]['table'] if documents else None
+    return {
+        'header':    header,
+        'documents': documents,
+        'xml':       xml,
+        'table':     table,
     }
+
+def parse_sec_header(
+    header,
+):
+    """
+    Parse the fields of the SEC-HEADER block (str or bytes-like) of a complete submission text file.
+    Returns the metadata dict of the filing. Raises a ValueError if a required field is missing.
+    """
+    if not isinstance(header, str):
+        header = bytes(header).decode('utf-8', errors='replace')
     # Fine some informations about the file
     fields = {}
-    for key, pattern in patterns.items():
-        match = re.search(pattern, text)
-        fields[key] = match.group(1) if match else None
+    for key, pattern in _SEC_HEADER_PATTERNS.items():
+        match = pattern.search(header)
+        fields[key] = match.group(1).strip() if match else None
+    for key in ['central_index_key', 'conformed_period_of_report', 'filed_as_of_date']:
+        if not fields[key]:
+            raise ValueError(f"the SEC header has no field '{key}'")
     # Define some variables
     cik                        = fields['central_index_key']
     accession_number           = fields['accession_number']
@@ -225,14 +1522,8 @@ def parse_txt_data_to_raw_csv(
     quarter = date_to_quarter(
         date_str = conformed_period_of_report,
     )
-    # Print some infos
-    if verbose:
-        print(f"{cik} / {company_conformed_name} / filed {filed_as_of_date} / period {conformed_period_of_report} / quarter {quarter}")
-    # Create the output directory for the company metadata
-    output_dir_meta = f"output/{cik}/meta"
-    os.makedirs(output_dir_meta, exist_ok=True)
-    # Export the metadata
-    metadata = {
+    # Return the metadata
+    return {
         "central_index_key": cik,
         "accession_number": accession_number,
         "company_conformed_name": company_conformed_name,
@@ -240,421 +1531,1983 @@ def parse_txt_data_to_raw_csv(
         "conformed_period_of_report": conformed_period_of_report,
         "quarter": quarter
     }
-    output_file_meta = f"{output_dir_meta}/{quarter}_{filed_as_of_date}.json"
-    if verbose:
-        print("Exporting meta file :",output_file_meta)
-    with open(output_file_meta, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, ensure_ascii=False, indent=4)
 
-    # Create the output directory for the raw csv files
-    output_dir_raw = f"output/{cik}/raw"
-    os.makedirs(output_dir_raw, exist_ok=True)
-    # Keep only what we need
-    matches_start   = re.finditer('<XML>',text)
-    positions_start = [match.start() for match in matches_start]
-    matches_end     = re.finditer('</XML>',text)
-    positions_end   = [match.start() for match in matches_end]
-    if len(positions_start)>0:
+def parse_txt_data(
+    text,
+    do_scrape_xml = True,
+    do_scrape_txt = True,
+    verbose       = False,
+):
+    """
+    Parse a complete submission text file (str, bytes or memoryview).
+    Returns the pair (metadata, df) where df is the DataFrame of the raw holdings,
+    or None if the table could not be parsed (or if its type is not scraped).
+    """
+    # Locate the parts of the file in a single pass
+    envelope = scan_sgml_envelope(
+        data = text,
+    )
+    # Parse the header
+    metadata = parse_sec_header(
+        header = envelope_slice(text, envelope['header']),
+    )
+    # Print some infos
+    if verbose:
+        print(f"{metadata['central_index_key']} / {metadata['company_conformed_name']} / filed {metadata['filed_as_of_date']} / period {metadata['conformed_period_of_report']} / quarter {metadata['quarter']}")
+    if envelope['xml'] is not None:
         if verbose:
             print('XML found')
-        scraping_type = 'XML'
         if not do_scrape_xml:
-            return cik
-        start = positions_start[-1]
-        end   = positions_end[-1]
-        text = text[start+6:end]
-        # Convert remaining XML text to a dict
-        d       = xmltodict.parse(text)
-        d_info  = d['informationTable']['infoTable']
-        # Make d_info contains dicts
-        do_skip = False
-        for d_i in d_info:
-            if not isinstance(d_i, dict):
-                do_skip=True
-        if do_skip: # The must be a problem
-            return cik
-        # Conversion en DataFrame
-        df_out = pd.DataFrame({
-            'nameOfIssuer': [d_i['nameOfIssuer'] for d_i in d_info],
-            'titleOfClass': [d_i['titleOfClass'] for d_i in d_info],
-            'cusip': [d_i['cusip'] for d_i in d_info],
-            'value': [d_i['value'] for d_i in d_info],
-            'shrsOrPrnAmt_sshPrnamt': [d_i['shrsOrPrnAmt']['sshPrnamt'] for d_i in d_info],
-            'shrsOrPrnAmt_sshPrnamtType': [d_i['shrsOrPrnAmt']['sshPrnamtType'] for d_i in d_info],
-            'investmentDiscretion': [d_i['investmentDiscretion'] for d_i in d_info],
-            'otherManager': [d_i['otherManager'] if 'otherManager' in d_i else '' for d_i in d_info],
-            'votingAuthority_Sole': [d_i['votingAuthority']['Sole'] for d_i in d_info],
-            'votingAuthority_Shared': [d_i['votingAuthority']['Shared'] for d_i in d_info],
-            'votingAuthority_None': [d_i['votingAuthority']['None'] for d_i in d_info],
-        })
+            return metadata, None
+        # Stream the infoTable rows to typed columns
+        columns = parse_info_table_xml(
+            xml = envelope_slice(text, envelope['xml']),
+        )
+        if columns is None: # The must be a problem
+            return metadata, None
+        # Conversion en DataFrame (the missing texts are null)
+        df_out = pl.DataFrame(
+            columns,
+            schema = {column: pl.Int64 if column in INFO_TABLE_INT_COLUMNS else pl.Utf8 for column in columns},
+        ).with_columns(
+            pl.col(pl.Utf8).replace('', None)
+        )
         # Add the % of the portfolio
-        df_out['portfolio %'] = 100*df_out['value'].astype(int)/df_out['value'].astype(int).sum()
-        # Sort by the name
-        df_out.sort_values(by='nameOfIssuer',inplace=True)
-        # Export the file
-        output_file = f"{output_dir_raw}/{quarter}_{filed_as_of_date}.csv"
-        if verbose:
-            print("Exporting :",output_file)
-        df_out.to_csv(output_file,index=False)
-        if verbose:
-            print('CSV file exported.')
+        df_out = df_out.with_columns(
+            (100*pl.col('value').fill_null(0)/pl.col('value').fill_null(0).sum()).alias('portfolio %')
+        )
     else:
         if verbose:
             print('No XML found')
-        scraping_type = 'TXT'
         if not do_scrape_txt:
-            return cik
-        # Keep only what we need
-        matches_start   = re.finditer('<DOCUMENT>',text)
-        positions_start = [match.start() for match in matches_start]
-        matches_end     = re.finditer('</DOCUMENT>',text)
-        positions_end   = [match.start() for match in matches_end]
-        if len(positions_start)==0:
-            if verbose:
-                print("WARNING: positions_start is of length zero. Skip.")
-            return cik
-        if len(positions_end)==0:
-            if verbose:
-                print("WARNING: positions_end is of length zero. Skip.")
-            return cik
-        start = positions_start[-1]
-        end   = positions_end[-1]
-        text  = text[start:end+11]
+            return metadata, None
         # Find the main table
-        matches_start   = re.finditer('<TABLE>',text)
-        positions_start = [match.start() for match in matches_start]
-        matches_end     = re.finditer('</TABLE>',text)
-        positions_end   = [match.start() for match in matches_end]
-        if len(positions_start)==0:
+        if envelope['table'] is None:
             if verbose:
-                print("WARNING: positions_start is of length zero. Skip.")
-            return cik
-        if len(positions_end)==0:
-            if verbose:
-                print("WARNING: positions_end is of length zero. Skip.")
-            return cik
-        start = positions_start[-1]
-        end   = positions_end[-1]
-        text = text[start:end+8]
+                print("WARNING: no <TABLE> found in the last document. Skip.")
+            return metadata, None
+        table = envelope_slice(text, envelope['table'])
+        if not isinstance(table, str):
+            table = str(table, 'utf-8', errors='replace')
         # Parse the FWF text to a DataFrame
-        df_text = parse_13f_fwf(
-            text    = text,
+        df_out = parse_13f_fwf(
+            text    = table,
             verbose = verbose,
         )
-        if not isinstance(df_text, pd.DataFrame):
-            return cik
-        output_file = f"{output_dir_raw}/{quarter}_{filed_as_of_date}.csv"
-        df_text['value'] = df_text['value'].fillna(0)
-        df_text['portfolio %'] = 100*df_text['value'].astype(int)/df_text['value'].astype(int).sum()
-        df_text.sort_values(by='nameOfIssuer',inplace=True)
-        if verbose:
-            print("Exporting :",output_file)
-        df_text.to_csv(output_file,index=False)
+        if df_out is None:
+            return metadata, None
+        df_out = df_out.with_columns(
+            (100*pl.col('value')/pl.col('value').sum()).alias('portfolio %')
+        )
+    # Sort by the name
+    df_out = df_out.sort('nameOfIssuer', maintain_order=True)
+    return metadata, df_out
+
+def export_raw_csv(
+    metadata,
+    df,
+    verbose = False,
+    sha256  = None,
+):
+    """
+    Export the metadata (json) and the raw holdings (csv) of a filing parsed by parse_txt_data,
+    then add the filing (with the sha256 of its content, if known) to the catalog.
+    Returns the cik of the filing.
+    """
+    check_writable("the export of the filings")
+    # Take the cik, quarter and date of the filing
+    cik              = metadata['central_index_key']
+    quarter          = metadata['quarter']
+    filed_as_of_date = metadata['filed_as_of_date']
+    # Create the output directory for the company metadata
+    output_dir_meta = f"output/{cik}/meta"
+    os.makedirs(output_dir_meta, exist_ok=True)
+    # Export the metadata
+    output_file_meta = f"{output_dir_meta}/{quarter}_{filed_as_of_date}.json"
+    if verbose:
+        print("Exporting meta file :",output_file_meta)
+    with open(output_file_meta, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=4)
+    # Create the output directory for the raw csv files
+    output_dir_raw = f"output/{cik}/raw"
+    os.makedirs(output_dir_raw, exist_ok=True)
+    # Export the file (if the table could be parsed)
+    if df is not None:
+        output_file = write_table(
+            df     = df,
+            stem   = f"{output_dir_raw}/{quarter}_{filed_as_of_date}",
+            schema = RAW_SCHEMA,
+        )
         if verbose:
-            print('CSV file exported.')
+            print("Exported :",output_file)
+    # Add the filing to the catalog once its files are written
+    with open_catalog() as db:
+        catalog_filing(
+            db       = db,
+            metadata = metadata,
+            sha256   = sha256,
+            holdings = df is not None,
+        )
     return cik
 
+def parse_txt_data_to_raw_csv(
+    text: str,
+    do_scrape_xml = True,
+    do_scrape_txt = True,
+    verbose       = False,
+):
+    # Parse the text
+    metadata, df = parse_txt_data(
+        text          = text,
+        do_scrape_xml = do_scrape_xml,
+        do_scrape_txt = do_scrape_txt,
+        verbose       = verbose,
+    )
+    # Export the metadata and the raw csv file
+    cik = export_raw_csv(
+        metadata = metadata,
+        df       = df,
+        verbose  = verbose,
+    )
+    return cik
+
+def decode_base64_content(
+    content: str,
+)->bytearray:
+    """
+    Decode a base64 data URL ('data:<type>;base64,<data>') to bytes.
+    The data is decoded by chunks directly into the output buffer, so neither
+    a copy of the base64 string nor a decoded str of the file is ever created.
+    """
+    # Skip the 'data:<type>;base64,' prefix
+    i_start = content.index(",") + 1
+    # Decode the chunks into a buffer (3 bytes per 4 base64 characters)
+    data = bytearray(3*((len(content) - i_start + 3)//4))
+    size = 0
+    for i in range(i_start, len(content), BASE64_CHUNK_SIZE):
+        chunk = binascii.a2b_base64(content[i:i+BASE64_CHUNK_SIZE])
+        data[size:size+len(chunk)] = chunk
+        size += len(chunk)
+    # Remove the bytes corresponding to the padding
+    del data[size:]
+    return data
+
+def load_filing_job(
+    job,
+):
+    """
+    Load the bytes of a filing job. A job is a dict with a 'filename' and either
+    a 'content' (base64 data URL of an uploaded file), a 'path' (file on disk,
+    compressed if 'compression' is set, see COMPRESSED_OPENERS), 'data' (bytes of
+    a downloaded file) or the location of a member of an archive (see expand_archive_jobs).
+    The text is never decoded as a whole: the parsers work on the bytes.
+    """
+    if 'data' in job:
+        data = job['data']
+    elif 'archive' in job and 'offset' in job:
+        # Read a member of a tar file from its offset
+        with open(job['archive'], "rb") as f:
+            f.seek(job['offset'])
+            data = f.read(job['size'])
+    elif 'archive' in job:
+        # Read a member of a zip file (opened once in this process, see close_zip_archives)
+        archive = _ZIP_ARCHIVES.get(job['archive'])
+        if archive is None:
+            archive = _ZIP_ARCHIVES[job['archive']] = zipfile.ZipFile(job['archive'])
+        data = archive.read(job['member'])
+    elif 'path' in job and 'compression' in job:
+        # Decompress the file from the disk
+        with COMPRESSED_OPENERS[job['compression']](job['path'], "rb") as f:
+            data = f.read()
+    elif 'path' in job:
+        # Read the file from the disk
+        with open(job['path'], "rb") as f:
+            data = f.read()
+    else:
+        # Decode the base64 file to bytes
+        data = decode_base64_content(
+            content = job['content'],
+        )
+    return data
+
+def peek_accession_number(
+    data,
+):
+    """
+    Return the accession number of a filing by looking only at the start of its header.
+    """
+    match = _pattern_for(data, _ACCESSION_NUMBER).search(data[:ACCESSION_NUMBER_PEEK_SIZE])
+    if match is None:
+        return None
+    accession_number = match.group(1)
+    if not isinstance(accession_number, str):
+        accession_number = accession_number.decode('ascii')
+    return accession_number
+
+def load_ingest_registry():
+    """
+    Load the registry of the ingested filings from the catalog: a dict that maps the
+    accession numbers to the sha256 of the content, the cik and the meta file of the filings.
+    """
+    with open_catalog() as db:
+        return {
+            accession_number: {
+                'sha256':            sha256,
+                'central_index_key': cik,
+                'meta_file':         meta_file,
+            }
+            for accession_number, sha256, cik, meta_file in db.execute(
+                "SELECT accession_number, sha256, cik, meta_file FROM filings WHERE accession_number IS NOT NULL"
+            )
+        }
+
+def is_filing_ingested(
+    registry,
+    accession_number,
+    sha256,
+):
+    # A filing is skipped if the same content was already ingested and its output still exists
+    entry = registry.get(accession_number) if accession_number else None
+    return (
+        entry is not None
+        and entry['sha256'] == sha256
+        and os.path.exists(entry['meta_file'])
+    )
+
+def archive_type(
+    filename,
+):
+    # Type of the archive of a file name (see ARCHIVE_SUFFIXES), None if it is not an archive
+    name = filename.lower()
+    for suffix, kind in sorted(ARCHIVE_SUFFIXES.items(), key=lambda item: -len(item[0])):
+        if name.endswith(suffix):
+            return kind
+    return None
+
+def _is_filing_member(
+    name,
+):
+    # The filings of an archive are its .txt members
+    return name.lower().endswith('.txt')
+
+def _expand_archive_data(
+    filename,
+    data,
+    kind,
+):
+    # Jobs of the filings of an archive loaded in memory (e.g. uploaded)
+    if kind in COMPRESSED_OPENERS:
+        with COMPRESSED_OPENERS[kind](io.BytesIO(data), "rb") as f:
+            return [{'filename': filename.rsplit('.', 1)[0], 'data': f.read()}]
+    if kind == 'zip':
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            return [
+                {'filename': f"{filename}/{info.filename}", 'data': archive.read(info)}
+                for info in archive.infolist()
+                if not info.is_dir() and _is_filing_member(info.filename)
+            ]
+    with tarfile.open(fileobj=io.BytesIO(data), mode='r:*') as archive:
+        return [
+            {'filename': f"{filename}/{member.name}", 'data': archive.extractfile(member).read()}
+            for member in archive
+            if member.isfile() and _is_filing_member(member.name)
+        ]
+
+def expand_archive_jobs(
+    jobs,
+    failures = None,
+):
+    """
+    Replace the jobs of the archives (zip, tar, compressed tar or gz files, see
+    ARCHIVE_SUFFIXES) by one job per .txt member. Nothing is extracted to the disk:
+    the members of the zip and tar files are read by the workers themselves, from
+    the archive, so they are decompressed in parallel. The members of a compressed
+    tar file can only be read in order: the archive stays a single job, replaced
+    by its members in a single pass over the archive when the jobs are dispatched
+    (see _load_archive_members). The archives loaded in memory (uploaded) are
+    expanded in memory.
+    The archives that cannot be read are skipped: if provided, the pairs
+    (filename, error) are appended to the list failures.
+    """
+    expanded = []
+    for job in jobs:
+        kind = archive_type(job['filename'])
+        if kind is None:
+            expanded.append(job)
+            continue
+        try:
+            expanded += _expand_archive_job(
+                job  = job,
+                kind = kind,
+            )
+        except (zipfile.BadZipFile, tarfile.TarError, OSError, EOFError) as e:
+            print(f"WARNING: failed to read the archive {job['filename']} ({type(e).__name__}: {e}). Skip.")
+            if failures is not None:
+                failures.append((job['filename'], f"{type(e).__name__}: {e}"))
+    return expanded
+
+def _expand_archive_job(
+    job,
+    kind,
+):
+    # Jobs of the filings of an archive (see expand_archive_jobs)
+    if 'path' not in job:
+        return _expand_archive_data(
+            filename = job['filename'],
+            data     = load_filing_job(job),
+            kind     = kind,
+        )
+    if kind in COMPRESSED_OPENERS:
+        return [{'filename': job['filename'].rsplit('.', 1)[0], 'path': job['path'], 'compression': kind}]
+    if kind == 'zip':
+        with zipfile.ZipFile(job['path']) as archive:
+            return [
+                {
+                    'filename': f"{job['filename']}/{info.filename}",
+                    'archive':  job['path'],
+                    'member':   info.filename,
+                    'size':     info.file_size,
+                }
+                for info in archive.infolist()
+                if not info.is_dir() and _is_filing_member(info.filename)
+            ]
+    if kind == 'tar':
+        with tarfile.open(job['path'], mode='r:') as archive:
+            return [
+                {
+                    'filename': f"{job['filename']}/{member.name}",
+                    'archive':  job['path'],
+                    'offset':   member.offset_data,
+                    'size':     member.size,
+                }
+                for member in archive
+                if member.isfile() and _is_filing_member(member.name)
+            ]
+    return [{'filename': job['filename'], 'stream_archive': job['path']}]
+
+def _load_archive_members(
+    jobs,
+    report,
+):
+    # Replace the compressed tar files by their members, read in order by a single pass
+    # over each archive (lazily). The members are counted in report['n_files'], and an
+    # archive that cannot be read is a failure (after the members read before the error).
+    for job in jobs:
+        if 'stream_archive' not in job:
+            yield job
+            continue
+        try:
+            with tarfile.open(job['stream_archive'], mode='r|*') as archive:
+                for member in archive:
+                    if not (member.isfile() and _is_filing_member(member.name)):
+                        continue
+                    with archive.extractfile(member) as f:
+                        data = f.read()
+                    report['n_files'] += 1
+                    yield {'filename': f"{job['filename']}/{member.name}", 'data': data}
+        except (tarfile.TarError, OSError, EOFError) as e:
+            print(f"WARNING: failed to read the archive {job['filename']} ({type(e).__name__}: {e}). Skip.")
+            report['failures'].append((job['filename'], f"{type(e).__name__}: {e}"))
+
+def close_zip_archives():
+    # Close the zip files opened by load_filing_job in this process
+    for archive in _ZIP_ARCHIVES.values():
+        archive.close()
+    _ZIP_ARCHIVES.clear()
+
+def _filing_job_size(
+    job,
+):
+    # Size in bytes of the filing of a job
+    if 'data' in job:
+        return len(job['data'])
+    if 'size' in job:
+        return job['size']
+    if 'path' in job:
+        return os.path.getsize(job['path'])
+    return len(job['content'])*3//4
+
+def _batch_filing_jobs(
+    jobs,
+):
+    # Split the jobs in batches of filings whose parsing fits in the memory limit (lazily)
+    if MEMORY_LIMIT is None:
+        jobs = list(jobs)
+        if jobs:
+            yield jobs
+        return
+    batch, batch_size = [], 0
+    for job in jobs:
+        job_size = _filing_job_size(job)*FILING_MEMORY_FACTOR
+        if batch and batch_size + job_size > MEMORY_LIMIT:
+            yield batch
+            batch, batch_size = [], 0
+        batch.append(job)
+        batch_size += job_size
+    if batch:
+        yield batch
+
+def _init_ingest_worker(
+    registry,
+):
+    # Give a snapshot of the registry to a worker process
+    global _INGEST_REGISTRY
+    _INGEST_REGISTRY = registry
+
+def parse_filing_job(
+    job,
+):
+    """
+    Load and parse a filing job. Meant to be run in a worker process: nothing is
+    written to disk and the exceptions are returned instead of being raised.
+    The filings already ingested with an identical content are not parsed.
+    """
+    result = {
+        'filename':         job['filename'],
+        'accession_number': None,
+        'sha256':           None,
+        'skipped':          False,
+        'metadata':         None,
+        'df':               None,
+        'error':            None,
+    }
+    try:
+        data = load_filing_job(
+            job = job,
+        )
+        # Peek at the accession number and hash the content
+        result['accession_number'] = peek_accession_number(data)
+        result['sha256']           = hashlib.sha256(data).hexdigest()
+        if is_filing_ingested(_INGEST_REGISTRY, result['accession_number'], result['sha256']):
+            result['skipped'] = True
+            return result
+        # Parse the filing
+        result['metadata'], result['df'] = parse_txt_data(
+            text          = data,
+            do_scrape_xml = job.get('do_scrape_xml', True),
+            do_scrape_txt = job.get('do_scrape_txt', True),
+        )
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    return result
+
+def parse_filings_to_raw_csv(
+    jobs,
+    n_workers     = None,
+    skip_ingested = True,
+    verbose       = False,
+    progress      = None,
+):
+    """
+    Parse a list of filing jobs to raw csv files, in parallel if n_workers>1.
+    The archives are replaced by their filings (see expand_archive_jobs).
+    The files are exported in the order of the jobs whatever the order in which
+    the workers finish, so the output is deterministic. The failures of single
+    files are collected and do not stop the batch.
+    If skip_ingested, the filings whose accession number was already ingested with
+    an identical content (see load_ingest_registry) are skipped.
+    With a memory limit (see set_memory_limit), the jobs are parsed by batches so
+    that the parsed filings waiting to be exported fit in the limit.
+    If provided, progress('parse', n_done, n_total) is called after each file.
+    Returns a report dict with the keys 'cik_set', 'n_files', 'n_processed',
+    'n_skipped', 'n_rows' and 'failures'.
+    """
+    if n_workers is None:
+        n_workers = INGEST_WORKERS
+    # Replace the archives by one job per filing (the archives that cannot be read are failures)
+    failures = []
+    jobs = expand_archive_jobs(
+        jobs     = jobs,
+        failures = failures,
+    )
+    # Create the report (the members of the compressed tar files are counted when they are read)
+    stream_archives = [job for job in jobs if 'stream_archive' in job]
+    report = {
+        'cik_set':     set(),
+        'n_files':     len(jobs) - len(stream_archives),
+        'n_processed': 0,
+        'n_skipped':   0,
+        'n_rows':      0,
+        'failures':    failures,
+    }
+    # Load the registry of the ingested filings
+    registry = load_ingest_registry()
+    registry_snapshot = registry if skip_ingested else {}
+    # Parse the jobs (the results come back in the order of the jobs)
+    n_jobs = math.inf if stream_archives else len(jobs)
+    if n_workers>1 and n_jobs>1:
+        # The workers are spawned: forking a process whose Polars thread pool is running can deadlock
+        executor = ProcessPoolExecutor(
+            max_workers = min(n_workers, n_jobs),
+            mp_context  = multiprocessing.get_context("spawn"),
+            initializer = _init_ingest_worker,
+            initargs    = (registry_snapshot,),
+        )
+        results  = (
+            result
+            for batch in _batch_filing_jobs(_load_archive_members(jobs, report))
+            for result in executor.map(parse_filing_job, batch)
+        )
+    else:
+        _init_ingest_worker(registry_snapshot)
+        executor = None
+        results  = map(parse_filing_job, _load_archive_members(jobs, report))
+    try:
+        for i_result, result in enumerate(results):
+            # Report the progress (the total grows while the compressed tar files are read)
+            if progress is not None:
+                progress('parse', i_result, report['n_files'])
+            if verbose:
+                print(f"Parsing file {result['filename']}")
+            if result['error'] is not None:
+                print(f"WARNING: failed to parse the file {result['filename']} ({result['error']}). Skip.")
+                report['failures'].append((result['filename'], result['error']))
+                continue
+            # Skip the filings already ingested (possibly earlier in this batch)
+            if result['skipped'] or (skip_ingested and is_filing_ingested(registry, result['accession_number'], result['sha256'])):
+                if verbose:
+                    print(f"File {result['filename']} already ingested. Skip.")
+                report['n_skipped'] += 1
+                continue
+            # Export the metadata and the raw csv file
+            metadata = result['metadata']
+            cik = export_raw_csv(
+                metadata = metadata,
+                df       = result['df'],
+                verbose  = verbose,
+                sha256   = result['sha256'],
+            )
+            # Remember the filing for the rest of the batch (it is in the catalog)
+            if result['accession_number']:
+                registry[result['accession_number']] = {
+                    'sha256':            result['sha256'],
+                    'central_index_key': cik,
+                    'meta_file':         f"output/{cik}/meta/{metadata['quarter']}_{metadata['filed_as_of_date']}.json",
+                }
+            # Add the cik to the set
+            report['cik_set'].add(cik)
+            report['n_processed'] += 1
+            if result['df'] is not None:
+                report['n_rows'] += len(result['df'])
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        close_zip_archives()
+    if progress is not None:
+        progress('parse', report['n_files'], report['n_files'])
+    # Loop over the cik of the exported filings
+    for cik in sorted(report['cik_set']):
+        # Look at the csv files in the raw folder
+        input_files_raw = list_tables(f"output/{cik}/raw")
+        # If the raw folder is empty, delete the cik from the output folder
+        if len(input_files_raw)==0:
+            shutil.rmtree(f"output/{cik}")
+            remove_catalog_cik(cik)
+            print(f"WARNING: the so-called 'raw' folder is empty. Deleting the imported data for cik={cik}.")
+            report['cik_set'].remove(cik)
+        else:
+            if verbose:
+                print(f"Number of raw files found for cik={cik}: {len(input_files_raw)}.")
+    # Return the report
+    return report
+
 def parse_contents_to_raw_csv(
     contents,
     filenames,
     do_scrape_xml = True,
     do_scrape_txt = True,
     verbose       = False,
+    n_workers     = None,
+    progress      = None,
 ):
-    # Create a set of cik
-    cik_set = set()
-    # Loop over the input files
-    for content, filename in zip(contents, filenames):
+    """
+    Parse uploaded contents (base64 data URLs, as posted by dcc.Upload) to raw csv files.
+    Kept as public API for the scripts; the app parses the uploads while they are received.
+    Returns the set of cik for which something was imported.
+    """
+    # Create one job per input file
+    jobs = [
+        {
+            'filename':      filename,
+            'content':       content,
+            'do_scrape_xml': do_scrape_xml,
+            'do_scrape_txt': do_scrape_txt,
+        }
+        for content, filename in zip(contents, filenames)
+    ]
+    # Parse the files to raw csv files
+    report = parse_filings_to_raw_csv(
+        jobs      = jobs,
+        n_workers = n_workers,
+        verbose   = verbose,
+        progress  = progress,
+    )
+    # Return the cik for which something was imported
+    return report['cik_set']
+
+
+def find_filing_paths(
+    paths,
+):
+    """
+    Expand a list of files, glob patterns and directories to the sorted list of .txt
+    files and archives of filings (see ARCHIVE_SUFFIXES).
+    The directories are searched recursively.
+    """
+    filing_paths = set()
+    for path in paths:
+        if os.path.isdir(path):
+            filing_paths.update(
+                p for p in glob.glob(os.path.join(path, "**", "*"), recursive=True)
+                if os.path.isfile(p) and (_is_filing_member(p) or archive_type(p) is not None)
+            )
+        elif os.path.isfile(path):
+            filing_paths.add(path)
+        else:
+            filing_paths.update(p for p in glob.glob(path, recursive=True) if os.path.isfile(p))
+    return sorted(filing_paths)
+
+def cik_to_company_conformed_name(
+    cik,
+    verbose = False,
+):
+    """
+    Most recent company conformed name of a cik in the catalog, or "" if it is unknown.
+    Kept as public API for the scripts; the app reads all the names at once with get_cik_names.
+    """
+    # If no cik is provided, return an empty string
+    if not cik:
+        return ""
+    # Look for the name of the cik in the catalog (name of its most recent filing)
+    with open_catalog() as db:
+        row = db.execute("SELECT company_conformed_name FROM ciks WHERE cik = ?", (cik,)).fetchone()
+    # If the cik is not in the catalog, return an empty string
+    if row is None:
+        return ""
+    # Return the result
+    return row[0] or ""
+
+def load_cik_dependencies(
+    cik,
+):
+    """
+    Load the dependencies of the outputs of a cik: for each quarter, the signature
+    (size, mtime) of the raw csv files from which its clean csv file was built.
+    """
+    deps_file = f"output/{cik}/deps.json"
+    if not os.path.exists(deps_file):
+        return {'clean': {}}
+    with open(deps_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_cik_dependencies(
+    cik,
+    deps,
+):
+    deps_file = f"output/{cik}/deps.json"
+    with open(f"{deps_file}.tmp", "w", encoding="utf-8") as f:
+        json.dump(deps, f, indent=4)
+    os.replace(f"{deps_file}.tmp", deps_file)
+
+def _file_signature(
+    path,
+):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def convert_raw_csv_to_clean_csv(
+    verbose     = False,
+    cik_set     = None,
+    incremental = True,
+    progress    = None,
+):
+    """
+    Convert the raw csv files of each cik to one clean csv file per quarter.
+    If incremental, only the quarters whose raw files changed since the last
+    conversion are rebuilt (see load_cik_dependencies).
+    Returns a dict that maps each cik to the dict of its touched quarters:
+    {'added': quarters that are new, 'changed': quarters rebuilt or removed}.
+    """
+    touched = {}
+    # Get the list of cik folders
+    cik_folders = get_cik_folders(
+        cik_set = cik_set,
+    )
+    # Loop over the folders
+    for i_cik, cik_folder in enumerate(cik_folders):
+        # Report the progress
+        if progress is not None:
+            progress('clean', i_cik, len(cik_folders))
+        # Take the central_index_key (cik)
+        cik = cik_folder.split('/')[1]
+        if verbose:
+            print(cik)
+        # Create the output folder
+        clean_dir = f"output/{cik}/clean"
+        os.makedirs(clean_dir, exist_ok=True)
+        # Look at the csv files in the raw folder
+        input_dir = f'output/{cik}/raw'
+        input_files = list_tables(input_dir)
+        if not input_files:
+            raise Exception(f"ERROR: missing so-called 'raw' csv files for cik={cik}.")
+        # Create a dict that maps a quarter to the list of files of that quarter
+        d_quarter_to_files = dict()
+        for input_file in input_files:
+            # Extract the quarter part before the first underscore
+            quarter = os.path.basename(input_file).split('_')[0]
+            if quarter not in d_quarter_to_files:
+                d_quarter_to_files[quarter] = []
+            d_quarter_to_files[quarter].append(input_file)
+        # Load the dependencies of the previous conversion
+        deps = load_cik_dependencies(cik) if incremental else {'clean': {}}
+        deps_clean = {}
+        touched[cik] = {'added': set(), 'changed': set()}
+        # Remove the clean files of the quarters that have no raw file anymore
+        for dst_file in list_tables(clean_dir):
+            quarter = table_stem(dst_file)
+            if quarter not in d_quarter_to_files:
+                os.remove(dst_file)
+                touched[cik]['changed'].add(quarter)
+        # Loop over each quarter
+        for quarter, input_files in d_quarter_to_files.items():
+            dst_stem = os.path.join(clean_dir, quarter)
+            dst_file = find_table(dst_stem)
+            # Skip the quarters whose raw files did not change
+            signature = {os.path.basename(input_file): _file_signature(input_file) for input_file in input_files}
+            deps_clean[quarter] = signature
+            if deps['clean'].get(quarter) == signature and dst_file == table_file(dst_stem):
+                continue
+            if dst_file is not None:
+                touched[cik]['changed'].add(quarter)
+            else:
+                touched[cik]['added'].add(quarter)
+            if len(input_files) == 1:
+                src_file = input_files[0]
+                # Destination file: keep only the quarter part as name
+                dst_file = table_file(dst_stem)
+                if os.path.splitext(src_file)[1] == os.path.splitext(dst_file)[1]:
+                    shutil.copy2(src_file, dst_file)
+                    remove_other_tables(dst_stem)
+                else:
+                    write_table(scan_table(src_file, schema_overrides=RAW_SCHEMA), dst_stem, schema=RAW_SCHEMA)
+                if verbose:
+                    print(f"Copied {src_file} -> {dst_file}")
+            else:
+                # Multiple files, concatenate and remove duplicates by keeping the most recent
+                df_lazy = pl.concat([
+                    scan_table(input_file, schema_overrides=RAW_SCHEMA) for input_file in input_files
+                ], how='diagonal_relaxed')
+                # Keep only the latest row per nameOfIssuer
+                df_lazy = df_lazy.unique(subset='nameOfIssuer', keep='last', maintain_order=True)
+                # Update the % of the portfolio
+                df_lazy = df_lazy.with_columns(
+                    (100*pl.col('value')/pl.col('value').sum()).alias('portfolio %')
+                )
+                # Sort by the name
+                df_lazy = df_lazy.sort('nameOfIssuer', maintain_order=True)
+                # Stream the cleaned table to its file
+                dst_file = write_table(df_lazy, dst_stem, schema=RAW_SCHEMA)
+                if verbose:
+                    print(f"Concatenated {len(input_files)} files for {cik} {quarter} -> {dst_file}")
+        # Save the dependencies
+        save_cik_dependencies(cik, {'clean': deps_clean})
+        # Save the quarters of the cik in the catalog
+        catalog_quarters(cik, sorted(d_quarter_to_files))
+    if progress is not None:
+        progress('clean', len(cik_folders), len(cik_folders))
+    return touched
+
+def _read_nameOfIssuer_triples(
+    input_files,
+):
+    # Lazy loading
+    l_df_lazy = []
+    for input_file in input_files:
+        df_lazy = scan_table(
+            input_file,
+            schema_overrides = {
+                "nameOfIssuer": pl.Utf8,
+                "titleOfClass": pl.Utf8,
+                "cusip":        pl.Utf8,
+            }
+        ).select(["nameOfIssuer", "titleOfClass", "cusip"])
+        l_df_lazy.append(df_lazy)
+    # Lazy vertical concat
+    df_all_lazy = pl.concat(l_df_lazy)
+    # Lazy remove the duplicates on the three columns
+    df_all_lazy = df_all_lazy.unique(subset=["nameOfIssuer", "titleOfClass", "cusip"])
+    # Collect the files in memory
+    return df_all_lazy.collect(engine=POLARS_ENGINE)
+
+def map_nameOfIssuer_variants(
+    verbose  = False,
+    cik_set  = None,
+    touched  = None,
+    progress = None,
+):
+    """
+    For each cik, this function generates a csv of the unique triples (nameOfIssuer, titleOfClass, cusip).
+    It also creates a column 'name' which is the first nameOfIssuer found for a given cusip.
+    The column 'name' is useful to handle all the variants of names of a same company.
+    This file will be used down the road to identify the unique name of issuers.
+    If touched (the output of convert_raw_csv_to_clean_csv) only contains added quarters,
+    the triples of these quarters are added to the existing mapping instead of rebuilding it.
+    Returns a dict that maps each cik to True if the 'name' of an existing nameOfIssuer changed
+    (or if the mapping was rebuilt), False otherwise.
+    """
+    names_changed = {}
+    # Get the list of cik folders
+    cik_folders = get_cik_folders(
+        cik_set = cik_set
+    )
+    # Loop over the folders
+    for i_cik, cik_folder in enumerate(cik_folders):
+        # Report the progress
+        if progress is not None:
+            progress('map', i_cik, len(cik_folders))
+        # Take the central_index_key (cik)
+        cik = cik_folder.split('/')[1]
         if verbose:
-            print(f"Parsing file {filename}")
-        # Decode the base64 file to a string
-        content_type, content_string = content.split(",")
-        text = base64.b64decode(content_string).decode("utf-8")
-        # Parse the text data to a raw csv file
-        cik = parse_txt_data_to_raw_csv(
-            text          = text,
-            verbose       = verbose,
-            do_scrape_xml = do_scrape_xml,
-            do_scrape_txt = do_scrape_txt,
+            print(cik)
+        # Input directory
+        input_dir = f"output/{cik}/clean"
+        # Define the output file name
+        output_stem = f"output/{cik}/mapping/nameOfIssuer_titleOfClass_cusip"
+        output_file = find_table(output_stem)
+        # Look at what changed since the last mapping
+        cik_touched = touched.get(cik) if touched is not None else None
+        is_incremental = (
+            cik_touched is not None
+            and not cik_touched['changed']
+            and output_file is not None
         )
-        # Add the cik to the set
-        cik_set.add(cik)
+        if is_incremental and not cik_touched['added']:
+            # Nothing changed
+            names_changed[cik] = False
+            continue
+        if is_incremental:
+            # Only the clean files of the added quarters are read
+            input_files = sorted(find_table(os.path.join(input_dir, quarter)) for quarter in cik_touched['added'])
+        else:
+            # List the files
+            input_files = list_tables(input_dir)
+        if not input_files:
+            raise Exception(f"ERROR: The so-called 'clean' files are missing for cik={cik}.")
+        df_all = _read_nameOfIssuer_triples(input_files)
+        if is_incremental:
+            # Add the new triples to the existing ones
+            df_old = read_table(
+                output_file,
+                schema_overrides = MAPPING_SCHEMA,
+            )
+            df_all = pl.concat([
+                df_old.select(["nameOfIssuer", "titleOfClass", "cusip"]),
+                df_all,
+            ]).unique(subset=["nameOfIssuer", "titleOfClass", "cusip"])
+        # Remove rows with at least one missing value
+        df_all = df_all.drop_nulls()
+        # Alphabetic sorting on nameOfIssuer
+        df_all = df_all.sort("nameOfIssuer")
+        # Create a column 'name' which is the first nameOfIssuer for a given cusip
+        df_all = df_all.with_columns([
+            # Create the column 'name' which is the first nameOfIssuer for that cusip
+            pl.col("nameOfIssuer").first().over("cusip").alias("name")
+        ])
+        # Check if the name of an existing nameOfIssuer changed
+        if is_incremental:
+            old_pairs = set(df_old.select(["nameOfIssuer", "name"]).iter_rows())
+            old_names = {nameOfIssuer for nameOfIssuer, _ in old_pairs}
+            new_pairs = {
+                (nameOfIssuer, name)
+                for nameOfIssuer, name in df_all.select(["nameOfIssuer", "name"]).iter_rows()
+                if nameOfIssuer in old_names
+            }
+            names_changed[cik] = new_pairs != old_pairs
+        else:
+            names_changed[cik] = True
+        # Define the output directory
+        output_dir = f"output/{cik}/mapping"
+        # Make sure the output directory exists
+        os.makedirs(output_dir, exist_ok=True)
+        # Export the dataframe
+        write_table(df_all, output_stem, schema=MAPPING_SCHEMA)
+    catalog_stage_done(cik_folders, 'map')
+    if progress is not None:
+        progress('map', len(cik_folders), len(cik_folders))
+    return names_changed
+
+def _scan_clean_holdings(
+    input_files,
+):
+    """
+    Lazily scan the clean files as the rows of their quarters in the holdings table.
+    The scans are gathered in a single query, so the files are read in parallel.
+    """
+    schema_overrides = {column: RAW_SCHEMA[column] for column in HOLDINGS_CLEAN_COLUMNS}
+    return pl.concat([
+        scan_table(
+            input_file,
+            schema_overrides = schema_overrides,
+        ).select(
+            list(HOLDINGS_CLEAN_COLUMNS)
+        ).rename(
+            HOLDINGS_CLEAN_COLUMNS
+        ).with_columns(
+            pl.lit(table_stem(input_file)).alias('quarter')  # '1999-q3'
+        )
+        for input_file in input_files
+    ], how='vertical_relaxed')
+
+def build_holdings_table(
+    verbose       = False,
+    cik_set       = None,
+    touched       = None,
+    names_changed = None,
+    progress      = None,
+):
+    """
+    For each cik, gather the clean files in a single long table 'output/<cik>/merge/holdings'
+    with the columns (quarter, cusip, nameOfIssuer, name, value, shares, proportion),
+    sorted by quarter, cusip and nameOfIssuer.
+    If touched (the output of convert_raw_csv_to_clean_csv) is provided, only the rows
+    of the touched quarters are added, replaced or removed in the existing table.
+    The names of the existing rows are mapped again if names_changed (the output of
+    map_nameOfIssuer_variants) says that the mapping of existing names changed.
+    The wide views (one column per quarter) are produced by export_wide_views.
+    """
     # Get the list of cik folders
     cik_folders = get_cik_folders(
         cik_set = cik_set,
     )
     # Loop over the cik folders
-    for cik_folder in cik_folders:
-        # Take the cik corresponding to the folder
+    for i_cik, cik_folder in enumerate(cik_folders):
+        # Report the progress
+        if progress is not None:
+            progress('merge', i_cik, len(cik_folders))
+        # Take the cik
         cik = cik_folder.split('/')[1]
-        # Look at the csv files in the raw folder
-        input_files_raw = sorted(glob.glob(f"output/{cik}/raw/*.csv"))
-        # If the raw folder is empty, delete the cik from the output folder
-        if len(input_files_raw)==0:
-            shutil.rmtree(f"output/{cik}")
-            print(f"WARNING: the so-called 'raw' folder is empty. Deleting the imported data for cik={cik}.")
-            cik_set.remove(cik)
+        # Define the output directory
+        output_dir = f'output/{cik}/merge'
+        os.makedirs(output_dir, exist_ok=True)
+        # Remove the wide files of the former versions
+        for path in list_tables(output_dir):
+            if table_stem(path) != 'holdings':
+                os.remove(path)
+        # Define the output file name
+        output_stem = f'{output_dir}/holdings'
+        output_file = find_table(output_stem)
+        # Look at the touched quarters
+        cik_touched = touched.get(cik) if touched is not None else None
+        is_incremental = cik_touched is not None and output_file is not None
+        if is_incremental:
+            quarters_touched = cik_touched['added'] | cik_touched['changed']
+            remap_names = names_changed is None or names_changed.get(cik, True)
+            if not quarters_touched and not remap_names:
+                continue
+        # Read the csv containing the pairs ('nameOfIssuer', 'name')
+        input_file_map = find_table(f"output/{cik}/mapping/nameOfIssuer_titleOfClass_cusip")
+        df_map = read_table(input_file_map, columns=['nameOfIssuer', 'name'], schema_overrides=MAPPING_SCHEMA)
+        df_map = df_map.unique(subset=['nameOfIssuer'], keep='first', maintain_order=True) # Keep only a single row per nameOfIssuer
+        # Take the list of input files
+        input_path = f'output/{cik}/clean'
+        if is_incremental:
+            input_files = [
+                find_table(os.path.join(input_path, quarter))
+                for quarter in sorted(quarters_touched)
+                if find_table(os.path.join(input_path, quarter)) is not None
+            ]
         else:
+            input_files = list_tables(input_path)
+        # No quarter left
+        if not list_tables(input_path):
+            if output_file is not None:
+                os.remove(output_file)
+            continue
+        # Read each clean file once and map the names
+        l_df_lazy = []
+        if input_files:
+            l_df_lazy.append(_scan_clean_holdings(input_files).join(
+                df_map.lazy(),
+                on  = 'nameOfIssuer',
+                how = 'left',
+            ))
+        if is_incremental:
+            # Keep the rows of the quarters that are not touched
+            df_old_lazy = scan_table(
+                output_file,
+                schema_overrides = HOLDINGS_SCHEMA,
+            ).filter(
+                ~pl.col('quarter').is_in(list(quarters_touched))
+            )
+            if remap_names:
+                df_old_lazy = df_old_lazy.drop('name').join(
+                    df_map.lazy(),
+                    on  = 'nameOfIssuer',
+                    how = 'left',
+                )
+            l_df_lazy = [df_old_lazy] + l_df_lazy
+        # Vertical concat and sort for the range scans by quarter and issuer
+        df_out_lazy = pl.concat(
+            [df_lazy.select(list(HOLDINGS_SCHEMA)) for df_lazy in l_df_lazy],
+            how = 'vertical_relaxed',
+        ).sort(['quarter', 'cusip', 'nameOfIssuer'], maintain_order=True)
+        # Stream the output file
+        output_file = write_table(df_out_lazy, output_stem, schema=HOLDINGS_SCHEMA)
+        if verbose:
+            print(f"Saved holdings file {output_file}")
+    catalog_stage_done(cik_folders, 'merge')
+    if progress is not None:
+        progress('merge', len(cik_folders), len(cik_folders))
+
+def scan_holdings(
+    cik,
+):
+    # Lazily scan the holdings table of a cik
+    input_file = find_table(f"output/{cik}/merge/holdings")
+    if input_file is None:
+        raise FileNotFoundError(f"ERROR: missing holdings table for cik={cik}.")
+    return scan_table(input_file, schema_overrides=HOLDINGS_SCHEMA)
+
+def load_holdings(
+    cik,
+):
+    """
+    Return the holdings table of a cik loaded in memory. The tables are kept in
+    DATA_CACHE with the store version of their cik (see get_store_version): a table
+    is read again from the disk only if it was rewritten since it was loaded.
+    """
+    version = get_store_version(cik)
+    if version is None:
+        raise FileNotFoundError(f"ERROR: missing holdings table for cik={cik}.")
+    df = DATA_CACHE.get((cik, version))
+    if df is None:
+        df = scan_holdings(cik).collect(engine=POLARS_ENGINE)
+        # Drop the former versions of the table
+        DATA_CACHE.remove_if(lambda key: key[0] == cik)
+        DATA_CACHE.put(
+            key   = (cik, version),
+            value = df,
+            size  = df.estimated_size(),
+        )
+    return df
+
+def _holdings_to_wide(
+    df,
+    merge_key,
+    target_variables,
+    quarters = None,
+):
+    """
+    Turn the sums of the targets by (merge key, quarter) into wide views: one row per
+    merge key (sorted) and one column per quarter (most recent to the left).
+    Returns a dict that maps each target variable to its wide view.
+    The values of each quarter are scattered in place, which is much faster than a
+    pivot per target for the tables with many quarters.
+    """
+    df = df.with_columns(pl.col(merge_key).cast(pl.Utf8))
+    # Rows of the wide views
+    keys = df.get_column(merge_key).unique().sort()
+    df = df.join(
+        keys.to_frame().with_row_index('row'),
+        on          = merge_key,
+        how         = 'left',
+        nulls_equal = True,
+    )
+    # Columns of the wide views
+    columns = sorted(set(df.get_column('quarter').unique()) | set(quarters or []), reverse=True)
+    d_quarter_to_df = {quarter: df_quarter for (quarter,), df_quarter in df.partition_by('quarter', as_dict=True).items()}
+    d_target_to_wide = {}
+    for target_variable in target_variables:
+        dtype = df.schema[target_variable]
+        l_series = [keys]
+        for quarter in columns:
+            series = pl.Series(quarter, dtype=dtype).extend_constant(None, len(keys))
+            if quarter in d_quarter_to_df:
+                df_quarter = d_quarter_to_df[quarter]
+                series = series.scatter(df_quarter.get_column('row'), df_quarter.get_column(target_variable))
+            l_series.append(series)
+        d_target_to_wide[target_variable] = pl.DataFrame(l_series)
+    return d_target_to_wide
+
+def query_holdings(
+    cik,
+    merge_key       = 'name',
+    target_variable = 'proportion',
+    quarters        = None,
+):
+    """
+    Query the holdings table of a cik and return a wide view: one row per merge key
+    (sorted) and one column per quarter (most recent to the left), with the sum of
+    the target variable. If quarters is provided, only these quarters are used.
+    The table is taken from the cache of the holdings tables (see load_holdings).
+    """
+    df_lazy = load_holdings(cik).lazy()
+    if quarters is not None:
+        df_lazy = df_lazy.filter(pl.col('quarter').is_in(list(quarters)))
+    df = df_lazy.group_by([merge_key, 'quarter']).agg(
+        pl.sum(target_variable).alias(target_variable)
+    ).collect()
+    return _holdings_to_wide(df, merge_key, [target_variable], quarters=quarters)[target_variable]
+
+def export_wide_views(
+    cik,
+    output_dir       = None,
+    merge_keys       = MERGE_KEYS,
+    target_variables = TARGET_VARIABLES,
+    verbose          = False,
+):
+    """
+    Export the wide views of the holdings table of a cik as csv files '<merge_key>_to_<target>.csv'
+    (by default in 'output/<cik>/export'). The table is read once, and a single group by per
+    merge key computes all the targets. Returns the list of exported files.
+    """
+    if output_dir is None:
+        output_dir = f"output/{cik}/export"
+    os.makedirs(output_dir, exist_ok=True)
+    # Read the table once
+    df_all = scan_holdings(cik).select(
+        ['quarter'] + list(dict.fromkeys(merge_keys)) + list(dict.fromkeys(target_variables))
+    ).collect(engine=POLARS_ENGINE)
+    output_files = []
+    for merge_key in merge_keys:
+        # Sum all the targets by (merge key, quarter) and build their wide views together
+        df_sum = df_all.lazy().group_by([merge_key, 'quarter']).agg([
+            pl.sum(target_variable).alias(target_variable) for target_variable in target_variables
+        ]).collect(engine=POLARS_ENGINE)
+        d_target_to_wide = _holdings_to_wide(
+            df               = df_sum,
+            merge_key        = merge_key,
+            target_variables = target_variables,
+        )
+        for target_variable, df in d_target_to_wide.items():
+            output_file = os.path.join(output_dir, f"{merge_key}_to_{target_variable}.csv")
+            df.write_csv(output_file)
+            output_files.append(output_file)
             if verbose:
-                print(f"Number of raw files found for cik={cik}: {len(input_files_raw)}.")
-    # Return the cik for which something was imported
+                print(f"Exported {output_file}")
+    return output_files
+
+def update_cik_outputs(
+    cik_set,
+    verbose  = False,
+    progress = None,
+):
+    """
+    Run the chain clean -> mapping -> holdings -> snapshots once for the given set of cik.
+    Only the quarters whose raw files changed are recomputed.
+    If provided, progress(stage, n_done, n_total) is called for each cik of each
+    stage ('clean', 'map', 'merge' and 'snapshot').
+    """
+    check_writable("the update of the outputs")
+    # Convert the raw csv data to clean csv data
+    touched = convert_raw_csv_to_clean_csv(
+        cik_set  = cik_set,
+        verbose  = verbose,
+        progress = progress,
+    )
+    # Map the variants of nameOfIssuer
+    names_changed = map_nameOfIssuer_variants(
+        cik_set  = cik_set,
+        verbose  = verbose,
+        touched  = touched,
+        progress = progress,
+    )
+    # Gather the holdings of all the quarters
+    build_holdings_table(
+        cik_set       = cik_set,
+        verbose       = verbose,
+        touched       = touched,
+        names_changed = names_changed,
+        progress      = progress,
+    )
+    # Render the snapshots of the default figures
+    write_figure_snapshots(
+        cik_set  = cik_set,
+        verbose  = verbose,
+        progress = progress,
+    )
+
+def ingest_paths(
+    paths,
+    n_workers     = None,
+    skip_ingested = True,
+    verbose       = False,
+    progress      = None,
+):
+    """
+    Import the 13F txt files found in the given files, glob patterns and directories.
+    All the files are parsed first, then the outputs of each affected cik are updated once.
+    Returns the report of parse_filings_to_raw_csv completed with timings and throughputs.
+    """
+    t_start = time.perf_counter()
+    # Create one job per file
+    jobs = [
+        {
+            'filename': os.path.basename(path),
+            'path':     path,
+        }
+        for path in find_filing_paths(paths)
+    ]
+    # Parse the files to raw csv files
+    report = parse_filings_to_raw_csv(
+        jobs          = jobs,
+        n_workers     = n_workers,
+        skip_ingested = skip_ingested,
+        verbose       = verbose,
+        progress      = progress,
+    )
+    t_parse = time.perf_counter()
+    # Update the outputs of the affected cik
+    if report['cik_set']:
+        update_cik_outputs(
+            cik_set  = report['cik_set'],
+            verbose  = verbose,
+            progress = progress,
+        )
+    t_end = time.perf_counter()
+    # Complete the report
+    elapsed = max(t_end - t_start, 1e-9)
+    report['seconds_parse']  = t_parse - t_start
+    report['seconds_update'] = t_end - t_parse
+    report['seconds']        = elapsed
+    report['files_per_s']    = report['n_processed'] / elapsed
+    report['rows_per_s']     = report['n_rows'] / elapsed
+    return report
+
+def upload_spool_paths(
+    upload_id,
+):
+    # Files of an upload in the spool directory: chunks received so far, complete file, ingest report
+    # and request of its ingest to the ingest process (see queue_upload_ingest)
+    base = os.path.join(UPLOAD_SPOOL_DIR, upload_id)
+    return {
+        'part':   f"{base}.part",
+        'file':   f"{base}.txt",
+        'report': f"{base}.json",
+        'queued': f"{base}.queued",
+    }
+
+def write_spool_json(
+    path,
+    data,
+):
+    # Write to a temporary file first so that a file of the spool is never read half written
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_file, path)
+
+def get_upload_status(
+    upload_id,
+):
+    """
+    Return the status of an upload: the number of bytes received (the offset from
+    which an interrupted upload resumes), whether the file is complete, and whether
+    it was ingested.
+    """
+    paths = upload_spool_paths(upload_id)
+    status = {
+        'received':   0,
+        'complete':   False,
+        'ingested':   os.path.exists(paths['report']),
+        'chunk_size': UPLOAD_CHUNK_SIZE,
+    }
+    if status['ingested']:
+        status['complete'] = True
+    elif os.path.exists(paths['file']):
+        status['received'] = os.path.getsize(paths['file'])
+        status['complete'] = True
+    elif os.path.exists(paths['part']):
+        status['received'] = os.path.getsize(paths['part'])
+    return status
+
+def write_upload_chunk(
+    upload_id,
+    offset,
+    total_size,
+    stream,
+):
+    """
+    Append a chunk read from a stream to the spool file of an upload, by blocks.
+    The offset must be the number of bytes already received, otherwise a ValueError
+    is raised (the client then resumes from the offset of get_upload_status).
+    Once total_size bytes are received, the file is renamed as complete.
+    Returns the status of the upload.
+    """
+    paths = upload_spool_paths(upload_id)
+    received = get_upload_status(upload_id)['received']
+    if os.path.exists(paths['file']) or os.path.exists(paths['report']) or offset != received:
+        raise ValueError(f"expected the offset {received} for the upload {upload_id}, got {offset}")
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    with open(paths['part'], "ab") as f:
+        while True:
+            block = stream.read(UPLOAD_COPY_SIZE)
+            if not block:
+                break
+            received += len(block)
+            if received > total_size:
+                raise ValueError(f"the upload {upload_id} exceeds its size of {total_size} bytes")
+            f.write(block)
+    # The file is complete
+    if received == total_size:
+        os.replace(paths['part'], paths['file'])
+    return get_upload_status(upload_id)
+
+def ingest_uploaded_file(
+    upload_id,
+    filename,
+):
+    """
+    Parse a complete uploaded file to raw csv files and write its ingest report
+    (filename, cik set and failures) in the spool directory. The file is removed
+    once parsed. The outputs of the cik are updated later, once for all the files
+    of the import (see collect_upload_reports).
+    """
+    paths = upload_spool_paths(upload_id)
+    try:
+        report = parse_filings_to_raw_csv(
+            jobs      = [{'filename': filename, 'path': paths['file']}],
+            n_workers = 1,
+        )
+        result = {
+            'filename': filename,
+            'cik_set':  sorted(report['cik_set']),
+            'failures': report['failures'],
+        }
+    except Exception as e:
+        print(f"WARNING: failed to ingest the file {filename} ({type(e).__name__}: {e}). Skip.")
+        result = {
+            'filename': filename,
+            'cik_set':  [],
+            'failures': [(filename, f"{type(e).__name__}: {e}")],
+        }
+    write_spool_json(paths['report'], result)
+    os.remove(paths['file'])
+
+def collect_upload_reports(
+    upload_ids,
+    progress = None,
+    timeout  = UPLOAD_INGEST_TIMEOUT,
+):
+    """
+    Wait for the ingest of the uploaded files, then remove their reports.
+    If provided, progress('parse', n_done, n_total) is called while waiting.
+    If no file is ingested for timeout seconds, the files still waiting are skipped.
+    Returns the set of cik for which something was imported.
+    """
+    reports  = {}
+    deadline = time.monotonic() + timeout
+    while len(reports) < len(upload_ids):
+        for upload_id in upload_ids:
+            report_file = upload_spool_paths(upload_id)['report']
+            if upload_id not in reports and os.path.exists(report_file):
+                with open(report_file, "r", encoding="utf-8") as f:
+                    reports[upload_id] = json.load(f)
+                deadline = time.monotonic() + timeout
+        if progress is not None:
+            progress('parse', len(reports), len(upload_ids))
+        if len(reports) < len(upload_ids):
+            if time.monotonic() > deadline:
+                missing = [upload_id for upload_id in upload_ids if upload_id not in reports]
+                print(f"WARNING: {len(missing)} uploaded files were not ingested after {timeout} s ({', '.join(missing)}). Skip.")
+                break
+            time.sleep(UPLOAD_POLL_INTERVAL)
+    cik_set = set()
+    for upload_id, report in reports.items():
+        cik_set.update(report['cik_set'])
+        os.remove(upload_spool_paths(upload_id)['report'])
     return cik_set
 
-def cik_to_company_conformed_name(
+def queue_upload_ingest(
+    upload_id,
+    filename,
+):
+    # Ask the ingest process to ingest a complete uploaded file (once, until its report is written)
+    paths = upload_spool_paths(upload_id)
+    if not os.path.exists(paths['queued']) and not os.path.exists(paths['report']):
+        write_spool_json(paths['queued'], {'filename': filename})
+
+def update_spool_paths(
+    update_id,
+):
+    # Files of a request of an update of the outputs in the spool directory: request and progress
+    base = os.path.join(UPLOAD_SPOOL_DIR, update_id)
+    return {
+        'request':  f"{base}.update",
+        'progress': f"{base}.progress",
+    }
+
+def check_ingest_process():
+    # Raise if the ingest process of `diff13f serve` is not running (no recent heartbeat)
+    try:
+        age = time.time() - os.path.getmtime(INGEST_HEARTBEAT_FILE)
+    except FileNotFoundError:
+        age = math.inf
+    if age > INGEST_HEARTBEAT_TIMEOUT:
+        raise RuntimeError("no ingest process is running: start `diff13f serve` (or `diff13f serve --ingest-only` next to another WSGI server).")
+
+def request_outputs_update(
+    cik_set,
+    progress = None,
+):
+    """
+    Ask the ingest process to update the outputs of a set of cik (see update_cik_outputs)
+    and wait for it, from a process whose store is read-only.
+    If provided, progress(stage, n_done, n_total) is called with the progress of the update.
+    Raises a RuntimeError if the ingest process is not running (see check_ingest_process).
+    """
+    check_ingest_process()
+    paths = update_spool_paths(os.urandom(8).hex())
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    write_spool_json(paths['request'], {'cik_set': sorted(cik_set)})
+    while True:
+        # The ingest process stopped before the end of the update
+        try:
+            check_ingest_process()
+        except RuntimeError:
+            if os.path.exists(paths['request']):
+                os.remove(paths['request'])
+            raise
+        try:
+            with open(paths['progress'], "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = {}
+        if state.get('done'):
+            break
+        if progress is not None and state:
+            progress(state['stage'], state['n_done'], state['n_total'])
+        time.sleep(UPLOAD_POLL_INTERVAL)
+    os.remove(paths['progress'])
+    if state['error'] is not None:
+        raise RuntimeError(f"the update of the outputs failed in the ingest process ({state['error']}).")
+
+def process_update_request(
+    request_file,
+):
+    # Update the outputs of a request of request_outputs_update, and report its progress
+    paths = update_spool_paths(os.path.basename(request_file).split('.')[0])
+    with open(request_file, "r", encoding="utf-8") as f:
+        cik_set = set(json.load(f)['cik_set'])
+    def report_progress(stage, n_done, n_total):
+        write_spool_json(paths['progress'], {'stage': stage, 'n_done': n_done, 'n_total': n_total})
+    error = None
+    try:
+        update_cik_outputs(
+            cik_set  = cik_set,
+            progress = report_progress,
+        )
+    except Exception as e:
+        print(f"WARNING: failed to update the outputs of {len(cik_set)} cik ({type(e).__name__}: {e}).")
+        error = f"{type(e).__name__}: {e}"
+    write_spool_json(paths['progress'], {'done': True, 'error': error})
+    os.remove(request_file)
+
+def run_ingest_process(
+    store_settings = None,
+    stop           = None,
+):
+    """
+    Loop of the ingest process of `diff13f serve`, the single writer of the store:
+    the workers of the app are read-only, they only write the uploaded files and
+    their requests in the spool directory. The queued uploads are ingested in the
+    order of their requests (see queue_upload_ingest), then the requested updates
+    of the outputs are made (see request_outputs_update), until the stop event is
+    set or the process is interrupted (the task in progress is finished first).
+    """
+    if store_settings is not None:
+        apply_store_settings(store_settings)
+    set_read_only(False)
+    # Ctrl+C (or a SIGTERM) stops the loop once the task in progress is done
+    if stop is None:
+        stop = threading.Event()
+    for signum in [signal.SIGINT, signal.SIGTERM]:
+        signal.signal(signum, lambda *_: stop.set())
+    # Heartbeat of the process, also during a long task (see check_ingest_process)
+    def heartbeat():
+        while not stop.is_set():
+            os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+            with open(INGEST_HEARTBEAT_FILE, "w", encoding="utf-8") as f:
+                f.write(str(os.getpid()))
+            stop.wait(INGEST_HEARTBEAT_INTERVAL)
+    heartbeat_thread = threading.Thread(target=heartbeat, name="diff13f-heartbeat", daemon=True)
+    heartbeat_thread.start()
+    try:
+        while not stop.is_set():
+            # Ingest the complete uploaded files queued by the workers
+            for queued_file in sorted(glob.glob(os.path.join(UPLOAD_SPOOL_DIR, "*.queued")), key=os.path.getmtime):
+                upload_id = os.path.basename(queued_file).split('.')[0]
+                with open(queued_file, "r", encoding="utf-8") as f:
+                    filename = json.load(f)['filename']
+                if os.path.exists(upload_spool_paths(upload_id)['file']):
+                    ingest_uploaded_file(upload_id, filename)
+                os.remove(queued_file)
+            # Update the outputs of the imports
+            for request_file in sorted(glob.glob(os.path.join(UPLOAD_SPOOL_DIR, "*.update")), key=os.path.getmtime):
+                process_update_request(request_file)
+            time.sleep(UPLOAD_POLL_INTERVAL)
+    finally:
+        # The workers see at once that the ingest process is stopped
+        stop.set()
+        heartbeat_thread.join()
+        if os.path.exists(INGEST_HEARTBEAT_FILE):
+            os.remove(INGEST_HEARTBEAT_FILE)
+
+################################################################################
+################################################################################
+# Fetch the filings from EDGAR
+
+def _http_get(
+    url,
+    user_agent,
+):
+    # Blocking GET request (run in a thread by _fetch_url)
+    request_ = urllib.request.Request(
+        url,
+        headers = {
+            'User-Agent':      user_agent,
+            'Accept-Encoding': 'gzip',
+        },
+    )
+    with urllib.request.urlopen(request_, timeout=FETCH_TIMEOUT) as response:
+        data = response.read()
+        if response.headers.get('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+    return data
+
+def _rate_limiter(
+    rate,
+):
+    # Return a coroutine function that spaces its calls by 1/rate seconds
+    lock      = asyncio.Lock()
+    next_time = [0.0]
+    async def wait():
+        async with lock:
+            now          = time.monotonic()
+            delay        = next_time[0] - now
+            next_time[0] = max(now, next_time[0]) + 1/rate
+        if delay > 0:
+            await asyncio.sleep(delay)
+    return wait
+
+async def _fetch_url(
+    url,
+    wait,
+    user_agent,
+    retries,
+):
+    # GET a url within the rate limit, with retries on the transient errors
+    for attempt in range(retries + 1):
+        await wait()
+        try:
+            return await asyncio.to_thread(_http_get, url, user_agent)
+        except urllib.error.HTTPError as e:
+            if e.code not in FETCH_RETRY_STATUS or attempt == retries:
+                raise
+        except (urllib.error.URLError, TimeoutError, ConnectionError):
+            if attempt == retries:
+                raise
+        await asyncio.sleep(FETCH_RETRY_BACKOFF * 2**attempt)
+
+def get_ingested_accession_numbers(
+    cik,
+):
+    # Accession numbers of the filings of a cik in the catalog
+    with open_catalog() as db:
+        return {
+            accession_number
+            for (accession_number,) in db.execute("SELECT accession_number FROM filings WHERE cik = ? AND accession_number IS NOT NULL", (cik,))
+        }
+
+def get_ingested_filing_dates(
     cik,
-    verbose = False,
 ):
-    # If no cik is provided, return an empty string
-    if not cik:
-        return ""
-    # Look for all metal files for this CIK
-    meta_path = f"output/{cik}/meta/*.json"
-    meta_files = sorted(glob.glob(meta_path), reverse=True)  # trier du plus récent au plus ancien
-    # If no metal files were found, return an empty string
-    if not meta_files:
-        return ""
-    # Open the most recent file
-    latest_file = meta_files[0]
-    with open(latest_file, "r", encoding="utf-8") as f:
-        metadata = json.load(f)
-    # Take the conformed company name
-    company_conformed_name = metadata.get("company_conformed_name", "")
-    # Return the result
-    return company_conformed_name
+    # Quarters and filing dates of the filings of a cik whose accession number is unknown (see rebuild_catalog)
+    with open_catalog() as db:
+        return set(db.execute("SELECT quarter, filed FROM filings WHERE cik = ? AND accession_number IS NULL", (cik,)))
 
-def convert_raw_csv_to_clean_csv(
-    verbose = False,
-    cik_set = None,
+def _submissions_to_filings(
+    submissions,
 ):
-    # Get the list of cik folders
-    cik_folders = get_cik_folders(
-        cik_set = cik_set,
-    )
-    # Loop over the folders
-    for cik_folder in cik_folders:
-        # Take the central_index_key (cik)
-        cik = cik_folder.split('/')[1]
-        if verbose:
-            print(cik)
-        # Create the output folder
-        clean_dir = f"output/{cik}/clean"
-        os.makedirs(clean_dir, exist_ok=True)
-        # Look at the csv files in the raw folder
-        input_dir = f'output/{cik}/raw'
-        input_files = sorted(glob.glob(f"{input_dir}/*.csv"))
-        if not input_files:
-            raise Exception(f"ERROR: missing so-called 'raw' csv files for cik={cik}.")
-        # Create a dict that maps a quarter to the list of files of that quarter
-        d_quarter_to_files = dict()
-        for input_file in input_files:
-            # Extract the quarter part before the first underscore
-            quarter = os.path.basename(input_file).split('_')[0]
-            if quarter not in d_quarter_to_files:
-                d_quarter_to_files[quarter] = []
-            d_quarter_to_files[quarter].append(input_file)
-        # Loop over each quarter
-        for quarter, input_files in d_quarter_to_files.items():
-            dst_file = os.path.join(clean_dir, f"{quarter}.csv")
-            if len(input_files) == 1:
-                src_file = input_files[0]
-                # Destination file: keep only the quarter part as name
-                shutil.copy2(src_file, dst_file)
-                if verbose:
-                    print(f"Copied {src_file} -> {dst_file}")
-            else:
-                # Multiple files, concatenate and remove duplicates by keeping the most recent
-                df_list = []
-                for input_file in input_files:
-                    df = pd.read_csv(input_file)
-                    df_list.append(df)
-                df_concat = pd.concat(df_list, ignore_index=True)
-                # Keep only the latest row per nameOfIssuer
-                df_out = df_concat.drop_duplicates(subset='nameOfIssuer', keep='last').copy()
-                # Uodate the % of the portfolio
-                df_out['portfolio %'] = 100*df_out['value'].astype(int)/df_out['value'].astype(int).sum()
-                # Sort by the name
-                df_out.sort_values(by='nameOfIssuer',inplace=True)
-                # Save the cleaned CSV
-                df_out.to_csv(dst_file, index=False)
-                if verbose:
-                    print(f"Concatenated {len(input_files)} files for {cik} {quarter} -> {dst_file}")
+    # Accession numbers, quarters and filing dates of the 13F filings of a table of the submissions JSON
+    n_filings    = len(submissions['accessionNumber'])
+    report_dates = submissions.get('reportDate') or [''] * n_filings
+    filing_dates = submissions.get('filingDate') or [''] * n_filings
+    return [
+        (accession_number, date_to_quarter(report_date) if report_date else None, filing_date or None)
+        for accession_number, form, report_date, filing_date in zip(submissions['accessionNumber'], submissions['form'], report_dates, filing_dates)
+        if form in FETCH_FORMS
+    ]
 
-def map_nameOfIssuer_variants(
-    verbose = False,
-    cik_set = None,
+async def list_13f_filings(
+    cik,
+    wait,
+    user_agent,
+    retries,
 ):
     """
-    For each cik, this function generates a csv of the unique triples (nameOfIssuer, titleOfClass, cusip).
-    It also creates a column 'name' which is the first nameOfIssuer found for a given cusip.
-    The column 'name' is useful to handle all the variants of names of a same company.
-    This file will be used down the road to identify the unique name of issuers.
+    List the 13F filings of a cik from its submissions JSON (the recent filings
+    and the older pages): triplets (accession number, quarter, filing date).
     """
-    # Get the list of cik folders
-    cik_folders = get_cik_folders(
-        cik_set = cik_set
+    url = f"{FETCH_SUBMISSIONS_URL}/CIK{cik}.json"
+    submissions = json.loads(await _fetch_url(url, wait, user_agent, retries))
+    filings = _submissions_to_filings(submissions['filings']['recent'])
+    for page in submissions['filings'].get('files', []):
+        url = f"{FETCH_SUBMISSIONS_URL}/{page['name']}"
+        filings += _submissions_to_filings(json.loads(await _fetch_url(url, wait, user_agent, retries)))
+    return filings
+
+async def _fetch_filings_async(
+    cik_list,
+    rate_limit,
+    n_concurrent,
+    retries,
+    user_agent,
+    ingest,
+    verbose,
+):
+    """
+    Download the 13F filings of the cik that are not ingested yet, and give them
+    to ingest(jobs) by batches of FETCH_BATCH_SIZE, called in a thread while the
+    next filings are downloaded. The downloads wait while the queue of the next
+    batch is full, so about two batches are held in memory.
+    Returns the number of filings listed and fetched, the failures, and the
+    duration of the downloads.
+    """
+    t_start   = time.perf_counter()
+    wait      = _rate_limiter(rate_limit)
+    semaphore = asyncio.Semaphore(n_concurrent)
+    queue     = asyncio.Queue(maxsize=FETCH_BATCH_SIZE)
+    failures  = []
+    # List the filings of each cik
+    missing = []
+    n_listed = 0
+    for cik in cik_list:
+        try:
+            filings = await list_13f_filings(cik, wait, user_agent, retries)
+        except Exception as e:
+            print(f"WARNING: failed to list the filings of cik={cik} ({type(e).__name__}: {e}). Skip.")
+            failures.append((cik, f"{type(e).__name__}: {e}"))
+            continue
+        n_listed += len(filings)
+        # The filings ingested by the first versions are known by their quarter and filing date only
+        ingested       = get_ingested_accession_numbers(cik)
+        ingested_dates = get_ingested_filing_dates(cik)
+        missing += [
+            (cik, accession_number)
+            for accession_number, quarter, filed in filings
+            if accession_number not in ingested and (quarter, filed) not in ingested_dates
+        ]
+    if verbose:
+        print(f"Found {n_listed} 13F filings, {len(missing)} not ingested yet.")
+    # Download the missing filings concurrently
+    async def fetch(cik, accession_number):
+        url = f"{FETCH_ARCHIVES_URL}/{int(cik)}/{accession_number.replace('-', '')}/{accession_number}.txt"
+        # The slot is kept until the filing is queued, so the downloads wait for the ingest
+        async with semaphore:
+            try:
+                data = await _fetch_url(url, wait, user_agent, retries)
+            except Exception as e:
+                print(f"WARNING: failed to fetch the filing {accession_number} ({type(e).__name__}: {e}). Skip.")
+                failures.append((f"{accession_number}.txt", f"{type(e).__name__}: {e}"))
+                return 0
+            if verbose:
+                print(f"Fetched {url}")
+            await queue.put({
+                'filename': f"{accession_number}.txt",
+                'data':     data,
+            })
+        return 1
+    async def fetch_all():
+        n_fetched = sum(await asyncio.gather(*(fetch(cik, a) for cik, a in missing)))
+        await queue.put(None)
+        return n_fetched, time.perf_counter() - t_start
+    # Ingest the downloaded filings by batches (None marks the end of the downloads)
+    async def ingest_all():
+        done = False
+        while not done:
+            batch = [await queue.get()]
+            while batch[-1] is not None and len(batch) < FETCH_BATCH_SIZE:
+                batch.append(await queue.get())
+            done = batch[-1] is None
+            jobs = [job for job in batch if job is not None]
+            if jobs:
+                await asyncio.to_thread(ingest, jobs)
+    (n_fetched, seconds_fetch), _ = await asyncio.gather(fetch_all(), ingest_all())
+    return n_listed, n_fetched, failures, seconds_fetch
+
+def fetch_filings(
+    cik_list,
+    rate_limit   = None,
+    n_concurrent = None,
+    retries      = None,
+    user_agent   = None,
+    n_workers    = None,
+    verbose      = False,
+):
+    """
+    Download the 13F-HR and 13F-HR/A filings of the given cik from EDGAR and
+    import them: the filings whose accession number is already in output/<cik>/meta
+    are not downloaded. The downloads run concurrently with asyncio, within
+    rate_limit requests per second, and the failed requests are retried.
+    The downloaded files are parsed from memory by batches of FETCH_BATCH_SIZE
+    while the next ones are downloaded, then the outputs of each affected cik are
+    updated once (like ingest_paths).
+    Returns the report of parse_filings_to_raw_csv (summed over the batches)
+    completed with 'n_listed', 'n_fetched' and the timings.
+    """
+    t_start = time.perf_counter()
+    # Pad the cik to 10 digits
+    cik_list = [str(cik).zfill(10) for cik in cik_list]
+    # Parse each batch of downloaded files to raw csv files
+    report = {
+        'cik_set':     set(),
+        'n_files':     0,
+        'n_processed': 0,
+        'n_skipped':   0,
+        'n_rows':      0,
+        'failures':    [],
+    }
+    def ingest(jobs):
+        batch_report = parse_filings_to_raw_csv(
+            jobs      = jobs,
+            n_workers = n_workers,
+            verbose   = verbose,
+        )
+        report['cik_set'] |= batch_report['cik_set']
+        for key in ['n_files', 'n_processed', 'n_skipped', 'n_rows']:
+            report[key] += batch_report[key]
+        report['failures'] += batch_report['failures']
+    # Download the missing filings
+    n_listed, n_fetched, failures, seconds_fetch = asyncio.run(_fetch_filings_async(
+        cik_list     = cik_list,
+        rate_limit   = FETCH_RATE_LIMIT if rate_limit is None else rate_limit,
+        n_concurrent = FETCH_CONCURRENCY if n_concurrent is None else n_concurrent,
+        retries      = FETCH_RETRIES if retries is None else retries,
+        user_agent   = user_agent or FETCH_USER_AGENT,
+        ingest       = ingest,
+        verbose      = verbose,
+    ))
+    # Update the outputs of the affected cik
+    if report['cik_set']:
+        update_cik_outputs(
+            cik_set = report['cik_set'],
+            verbose = verbose,
+        )
+    t_end = time.perf_counter()
+    # Complete the report
+    report['n_listed']       = n_listed
+    report['n_fetched']      = n_fetched
+    report['failures']       = failures + report['failures']
+    report['seconds_fetch']  = seconds_fetch
+    report['seconds']        = t_end - t_start
+    return report
+
+################################################################################
+################################################################################
+# Import the SEC Form 13F data sets
+
+def read_bulk_filings(
+    archive,
+):
+    """
+    Read the 13F-HR and 13F-HR/A filings of a Form 13F data set (opened ZipFile)
+    from its SUBMISSION and COVERPAGE tables. Returns a DataFrame with one row per
+    filing and the fields of the meta files (see parse_sec_header).
+    """
+    df_submission = pl.read_csv(
+        archive.read(BULK_SUBMISSION_FILE),
+        separator    = '\t',
+        quote_char   = None,
+        infer_schema = False,
+        columns      = ['ACCESSION_NUMBER', 'FILING_DATE', 'SUBMISSIONTYPE', 'CIK', 'PERIODOFREPORT'],
     )
-    # Loop over the folders
-    for cik_folder in cik_folders:
-        # Take the central_index_key (cik)
-        cik = cik_folder.split('/')[1]
-        if verbose:
-            print(cik)
-        # Input directory
-        input_dir = f"output/{cik}/clean"
-        # List the files
-        input_files = sorted(glob.glob(f"{input_dir}/*.csv"))
-        if not input_files:
-            raise Exception(f"ERROR: The so-called 'clean' files are missing for cik={cik}.")
-        # Lazy loading
-        l_df_lazy = []
-        for input_file in input_files:
-            df_lazy = pl.scan_csv(
-                input_file,
-                schema_overrides = {
-                    "nameOfIssuer": pl.Utf8,
-                    "titleOfClass": pl.Utf8,
-                    "cusip":        pl.Utf8,
-                }
-            ).select(["nameOfIssuer", "titleOfClass", "cusip"])
-            l_df_lazy.append(df_lazy)
-        # Lazy vertical concat
-        df_all_lazy = pl.concat(l_df_lazy)
-        # Lazy remove the duplicates on the three columns
-        df_all_lazy = df_all_lazy.unique(subset=["nameOfIssuer", "titleOfClass", "cusip"])
-        # Collect the files in memory
-        df_all = df_all_lazy.collect()
-        # Remove rows with at least one missing value
-        df_all = df_all.drop_nulls()
-        # Alphabetic sorting on nameOfIssuer
-        df_all = df_all.sort("nameOfIssuer")
-        # Create a column 'name' which is the first nameOfIssuer for a given cusip
-        df_all = df_all.with_columns([
-            # Create the column 'name' which is the first nameOfIssuer for that cusip
-            pl.col("nameOfIssuer").first().over("cusip").alias("name")
-        ])
-        # Define the output directory
-        output_dir = f"output/{cik}/mapping"
-        # Make sure the output directory exists
-        os.makedirs(output_dir, exist_ok=True)
-        # Define the output file name
-        output_file = f"output/{cik}/mapping/nameOfIssuer_titleOfClass_cusip.csv"
-        # Export the dataframe
-        df_all.write_csv(output_file)
+    df_coverpage = pl.read_csv(
+        archive.read(BULK_COVERPAGE_FILE),
+        separator    = '\t',
+        quote_char   = None,
+        infer_schema = False,
+        columns      = ['ACCESSION_NUMBER', 'FILINGMANAGER_NAME'],
+    )
+    period = pl.col('PERIODOFREPORT').str.to_date('%d-%b-%Y')
+    return df_submission.filter(
+        pl.col('SUBMISSIONTYPE').is_in(FETCH_FORMS)
+    ).join(
+        df_coverpage, on='ACCESSION_NUMBER', how='left', maintain_order='left',
+    ).select(
+        pl.col('CIK').str.zfill(10).alias('central_index_key'),
+        pl.col('ACCESSION_NUMBER').alias('accession_number'),
+        pl.col('FILINGMANAGER_NAME').alias('company_conformed_name'),
+        pl.col('FILING_DATE').str.to_date('%d-%b-%Y').dt.strftime('%Y-%m-%d').alias('filed_as_of_date'),
+        period.dt.strftime('%Y-%m-%d').alias('conformed_period_of_report'),
+        (period.dt.year().cast(pl.Utf8) + '-q' + period.dt.quarter().cast(pl.Utf8)).alias('quarter'),
+    )
+
+def _read_bulk_infotable(
+    archive,
+    block_size,
+):
+    # Stream the rows of INFOTABLE.tsv out of the ZIP by blocks of whole lines, as raw columns
+    with archive.open(BULK_INFOTABLE_FILE) as f:
+        header = f.readline()
+        rest   = b''
+        while True:
+            block = f.read(block_size)
+            if not block and not rest:
+                break
+            # Cut the block after its last line (the rest goes with the next block)
+            data = rest + block
+            if block:
+                cut        = data.rfind(b'\n') + 1
+                data, rest = data[:cut], data[cut:]
+            else:
+                rest = b''
+            if not data:
+                continue
+            yield pl.read_csv(
+                header + data,
+                separator             = '\t',
+                quote_char            = None,
+                infer_schema          = False,
+                encoding              = 'utf8-lossy',
+                truncate_ragged_lines = True,
+                columns               = ['ACCESSION_NUMBER', *BULK_INFOTABLE_COLUMNS],
+            ).select(
+                pl.col('ACCESSION_NUMBER').alias('accession_number'),
+                *[
+                    pl.col(column).str.strip_chars().cast(RAW_SCHEMA[raw_column], strict=False).alias(raw_column)
+                    if RAW_SCHEMA[raw_column] == pl.Int64 else
+                    pl.col(column).replace('', None).alias(raw_column)
+                    for column, raw_column in BULK_INFOTABLE_COLUMNS.items()
+                ],
+            )
 
-def merge_portfolio_proportions(
+def export_bulk_filing(
+    metadata,
+    df,
     verbose = False,
-    cik_set = None,
 ):
-    # Mapping to the columns names
-    target_variable_to_target_column = {
-        'proportion': 'portfolio %',
-        'shares':     'shrsOrPrnAmt_sshPrnamt',
-        'value':      'value',
-    }
-    # Define the merge keys
-    merge_keys = [
-        'nameOfIssuer',
-        'cusip',
-        'name',
-    ]
-    # Define the target variables
-    target_variables  = [
-        'proportion',
-        'shares',
-        'value',
-    ]
-    # Get the list of cik folders
-    cik_folders = get_cik_folders(
-        cik_set = cik_set,
+    # Export the meta file and the raw table of a filing of a data set, like parse_txt_data_to_raw_csv
+    df = df.drop('accession_number').with_columns(
+        (100*pl.col('value').fill_null(0)/pl.col('value').fill_null(0).sum()).alias('portfolio %')
+    ).sort('nameOfIssuer', maintain_order=True)
+    return export_raw_csv(
+        metadata = metadata,
+        df       = df,
+        verbose  = verbose,
     )
-    # Loop over the cik folders
-    for cik_folder in cik_folders:
-        # Take the cik
-        cik = cik_folder.split('/')[1]
-        # Read the csv containing the pairs ('nameOfIssuer', 'name')
-        input_file_map = f"output/{cik}/mapping/nameOfIssuer_titleOfClass_cusip.csv"
-        df_map = pl.read_csv(input_file_map, columns=['nameOfIssuer', 'name'])
-        df_map = df_map.unique(subset=['nameOfIssuer']) # Keep only a single row per nameOfIssuer
-        # Define the input path containing the clean csv files
-        input_path = f'output/{cik}/clean/'
-        # Loop over the merge keys
-        for merge_key in merge_keys:
-            # Loop over target variables
-            for target_variable in target_variables:
-                # Take the target column name corresponding to the target variable
-                target_column = target_variable_to_target_column[target_variable]
-                # Take the list of input files
-                input_files = sorted(glob.glob(os.path.join(input_path, '*.csv')))
-                # Create a list of dataframes
-                l_df = []
-                # Loop over the input files
-                for input_file in input_files:
-                    # Take the quarter
-                    quarter = os.path.basename(input_file).split('.')[0]  # '1999-q3'
-                    if merge_key!='name':
-                        # Read the csv and keep only the columns (merge_key, target_column)
-                        df = pl.read_csv(
-                            input_file,
-                            columns = [
-                                merge_key,
-                                target_column,
-                            ],
-                            schema_overrides = {
-                                merge_key: pl.Utf8,
-                            }
-                        )
-                    else:
-                        # Read the dataframe
-                        df = pl.read_csv(
-                            input_file,
-                            columns = [
-                                'nameOfIssuer',
-                                target_column,
-                            ],
-                            schema_overrides = {
-                                'nameOfIssuer': pl.Utf8,
-                            }
-                        )
-                        # Map the 'nameOfIssuer' to 'name' using the dataframe with columns ('nameOfIssuer', 'name')
-                        df = df.join(
-                            df_map,
-                            on = 'nameOfIssuer',
-                            how = 'left',
-                        )
-                        # Keep only the columns ('name', target_column)
-                        df = df.select(['name', target_column])
-                    # Groupby sum over the column name
-                    df = df.group_by(merge_key).agg(
-                        pl.sum(target_column).alias(target_column)
-                    )
-                    # Add a column 'quarter' to the dataframe whose value is equal to the quarter 
-                    df = df.with_columns(pl.lit(quarter).alias("quarter"))
-                    l_df.append(df)
-                # Vertical concat
-                df_all = pl.concat(l_df, rechunk=True)
-                # Pivot for wide format
-                df_out = df_all.pivot(
-                    values             = target_column,
-                    index              = merge_key,
-                    on                 = "quarter",
-                    aggregate_function = "first"
-                )
-                # Sort the columns to have the most recent quarter to the left
-                cols = df_out.columns
-                cols = [merge_key] + sorted([c for c in cols if c != merge_key], reverse=True)
-                df_out = df_out.select(cols)
-                # Sort the rows alphabetically by the merge key ('nameOfIssuer' or 'cusip')
-                df_out = df_out.sort(merge_key)
-                # Define the output directory
-                output_dir = f'output/{cik}/merge'
-                # Make sure the output directory exists
-                os.makedirs(output_dir, exist_ok=True)
-                # Define the output file name
-                output_file = f'{output_dir}/{merge_key}_to_{target_variable}.csv'
-                # Export the output file
-                df_out.write_csv(output_file)
-                if verbose:
-                    print(f"Saved merged file {output_file}")
+
+def ingest_bulk_dataset(
+    path,
+    skip_ingested = True,
+    verbose       = False,
+    progress      = None,
+):
+    """
+    Import a quarterly Form 13F data set of the SEC (ZIP file with the SUBMISSION,
+    COVERPAGE and INFOTABLE tables). INFOTABLE.tsv is streamed out of the ZIP by
+    blocks of BULK_BLOCK_SIZE bytes (capped by the memory limit), and its rows are
+    joined to the cik and period of their filing by accession number. Each filing
+    is exported to the same meta and raw files as a complete submission text file,
+    as soon as its rows are complete, then the outputs of each affected cik are
+    updated once. The filings already ingested are skipped (see load_ingest_registry).
+    If provided, progress('parse', n_done, n_total) is called after each filing.
+    Returns a report like ingest_paths (the files are the filings of the data set).
+    """
+    t_start = time.perf_counter()
+    block_size = BULK_BLOCK_SIZE if MEMORY_LIMIT is None else max(1 << 20, min(BULK_BLOCK_SIZE, MEMORY_LIMIT//FILING_MEMORY_FACTOR))
+    registry = load_ingest_registry()
+    with zipfile.ZipFile(path) as archive:
+        # Read the filings and drop the ones already ingested
+        df_filings = read_bulk_filings(archive)
+        report = {
+            'cik_set':     set(),
+            'n_files':     len(df_filings),
+            'n_processed': 0,
+            'n_skipped':   0,
+            'n_rows':      0,
+            'failures':    [],
+        }
+        if skip_ingested:
+            ingested = [
+                accession_number
+                for accession_number in df_filings['accession_number']
+                if accession_number in registry and os.path.exists(registry[accession_number]['meta_file'])
+            ]
+            df_filings = df_filings.filter(~pl.col('accession_number').is_in(ingested))
+            report['n_skipped'] = len(ingested)
+        filings = {row['accession_number']: row for row in df_filings.iter_rows(named=True)}
+        df_filings = df_filings.select('accession_number', 'central_index_key')
+
+        # Export the rows of a filing (merged with its previous rows if they were not contiguous)
+        exported = set()
+        def export(accession_number, df):
+            metadata = filings[accession_number]
+            report['n_rows'] += len(df)
+            if accession_number in exported:
+                stem = f"output/{metadata['central_index_key']}/raw/{metadata['quarter']}_{metadata['filed_as_of_date']}"
+                df = pl.concat([
+                    read_table(find_table(stem), schema_overrides=RAW_SCHEMA).drop('portfolio %').with_columns(pl.lit(accession_number).alias('accession_number')),
+                    df,
+                ], how='diagonal_relaxed').select(df.columns)
+            else:
+                report['n_processed'] += 1
+            cik = export_bulk_filing(
+                metadata = metadata,
+                df       = df,
+                verbose  = verbose,
+            )
+            exported.add(accession_number)
+            report['cik_set'].add(cik)
+            if progress is not None:
+                progress('parse', len(exported), len(filings))
+
+        # Stream the infotable: the rows of a filing are contiguous, so a filing is
+        # complete as soon as the rows of the next filing start
+        pending = None
+        for df in _read_bulk_infotable(archive, block_size):
+            df = df.join(df_filings, on='accession_number', how='semi', maintain_order='left')
+            if pending is not None:
+                df = pl.concat([pending, df])
+            if len(df) == 0:
+                continue
+            last = df['accession_number'][-1]
+            pending = df.filter(pl.col('accession_number') == last)
+            df_complete = df.filter(pl.col('accession_number') != last)
+            for (accession_number,), df_filing in df_complete.partition_by('accession_number', as_dict=True, maintain_order=True).items():
+                export(accession_number, df_filing)
+        if pending is not None and len(pending) > 0:
+            export(pending['accession_number'][0], pending)
+    # The filings without any holding only have a meta file
+    for accession_number, metadata in filings.items():
+        if accession_number not in exported:
+            cik = export_raw_csv(
+                metadata = metadata,
+                df       = None,
+                verbose  = verbose,
+            )
+            exported.add(accession_number)
+            report['cik_set'].add(cik)
+            report['n_processed'] += 1
+            if progress is not None:
+                progress('parse', len(exported), len(filings))
+    t_parse = time.perf_counter()
+    # Update the outputs of the affected cik
+    if report['cik_set']:
+        update_cik_outputs(
+            cik_set  = report['cik_set'],
+            verbose  = verbose,
+            progress = progress,
+        )
+    t_end = time.perf_counter()
+    # Complete the report
+    elapsed = max(t_end - t_start, 1e-9)
+    report['seconds_parse']  = t_parse - t_start
+    report['seconds_update'] = t_end - t_parse
+    report['seconds']        = elapsed
+    report['files_per_s']    = report['n_processed'] / elapsed
+    report['rows_per_s']     = report['n_rows'] / elapsed
+    return report
 
 ################################################################################
 ################################################################################
@@ -702,9 +3555,22 @@ def create_header():
         },
     )
 
+def import_progress_style(
+    visible,
+):
+    # Style of the progress bar of the imports
+    return {
+        "display": "flex" if visible else "none",
+        "alignItems": "center",
+        "width": "300px",
+        "height": "40px",
+        'marginRight': '20px',
+    }
+
 def create_import_bar():
-    # Take the list of cik numbers available
-    cik_numbers = get_cik_numbers()
+    # Take the list of cik numbers available, and their names
+    cik_names   = get_cik_names()
+    cik_numbers = list(cik_names)
 
     if len(cik_numbers)==0:
         # CIK dropdown
@@ -715,7 +3581,7 @@ def create_import_bar():
         # CIK dropdown
         dropdown_options     = [
             {
-                "label": f"{cik_number} - {cik_to_company_conformed_name(cik=cik_number)}",
+                "label": f"{cik_number} - {cik_names[cik_number]}",
                 "value": cik_number,
             }
             for cik_number in cik_numbers
@@ -727,15 +3593,13 @@ def create_import_bar():
     # Return the layout
     return html.Div(
         children = [
-            # Sélecteur de fichiers
-            dcc.Upload(
+            # Sélecteur de fichiers (envoyés par morceaux par assets/upload.js)
+            html.Div(
                 id="file-upload-selector",
-                children = html.Div(
-                    id = "Select 13F txt files to import.",
-                    children = [
-                        "Import 13F txt files"
-                    ],
-                ),
+                title = "Select 13F txt files to import.",
+                children = [
+                    "Import 13F txt files"
+                ],
                 style = {
                     "width": "250px",
                     "height": "40px",
@@ -754,7 +3618,49 @@ def create_import_bar():
                     "boxShadow": "0 0 10px #00ffcc",
                     'marginRight': '20px',
                 },
-                multiple = True,
+            ),
+            # Fichiers envoyés, dont l'import est lancé en arrière-plan
+            dcc.Store(
+                id = "upload-store",
+            ),
+            # Progression de l'import en cours (visible seulement pendant l'import)
+            html.Div(
+                id       = "import-progress-div",
+                children = [
+                    dbc.Progress(
+                        id       = "import-progress",
+                        value    = 0,
+                        label    = "",
+                        striped  = True,
+                        animated = True,
+                        color    = "info",
+                        style    = {
+                            "flex": "1",
+                            "height": "20px",
+                            "backgroundColor": "black",
+                            "fontFamily": "monospace",
+                        },
+                    ),
+                    # Bouton pour annuler l'import
+                    html.Div(
+                        title    = "Cancel the import.",
+                        id       = "import-cancel-button",
+                        children = html.I(
+                            className = "bi bi-x-circle",
+                            style     = {
+                                "color": "white",
+                            },
+                        ),
+                        n_clicks = 0,
+                        style    = {
+                            "cursor": "pointer",
+                            "marginLeft": "10px",
+                        },
+                    ),
+                ],
+                style = import_progress_style(
+                    visible = False,
+                ),
             ),
             # Conteneur qui contiendra soit le spinner soit le dropdown
             html.Div(
@@ -889,7 +3795,7 @@ def create_tabs():
 
     return dcc.Tabs(
         id        = "tabs",
-        value     = "one-quarter",
+        value     = DEFAULT_TAB,
         style     = tabs_style,
         children  = [
             # This tab shows the top holdings of the portfolio at a given quarter
@@ -934,94 +3840,61 @@ def generate_default_figure(
     )
     return fig
 
-def generate_one_quarter_figure(
+def generate_proportion_matrix(
     cik,
-    quarter,
     merge_key = 'name',
-    top_n     = 20,
 ):
-    if (not cik) or (not quarter):
-        if not cik:
-            title = "Select a CIK"
-        elif not quarter:
-            title = "Select a quarter"
-        return generate_default_figure(
-            title = title,
-        )
-
-    # Take the data corresponding to that quarter
-    input_file = f"output/{cik}/merge/{merge_key}_to_proportion.csv"
-    df = pl.read_csv(input_file, columns=[merge_key, quarter])
-    # Sort and top N and convert to Pandas for Plotly
-    df = df.filter(
-        pl.col(quarter).is_not_null()
-    ).sort(
-        quarter,
-        descending = True,
-    ).head(
-        top_n
-    ).to_pandas()
-    # Rename the column
-    df.rename(columns={quarter: "proportion"}, inplace=True)
-    # Créer une colonne pour les noms complets
-    df["full_name"] = df[merge_key]
-    # Tronquer les noms trop longs
-    max_chars = 30
-    df[merge_key] = df[merge_key].apply(
-        lambda x: x if len(x) <= max_chars else x[:max_chars-1] + "\u2026"
-    )
-    # Création du barplot cyberpunk
-    fig = px.bar(
-        data_frame  = df,
-        x           = 'proportion',
-        y           = merge_key,
-        orientation = 'h',
-        hover_data  = {
-            'full_name': True,
-            'proportion': ':.2f',
-        },
-    )
-    fig.update_layout(
-        title={
-            "text": f"Top {top_n} Holdings for {quarter}",
-            "x": 0.5,
-            "y": 0.95,
-            "xanchor": "center",
-            "yanchor": "top",
-            "font": {
-                "family": "monospace",
-                "size": 20,
-                "color": "white",
-            },
-        },
-        font = dict(
-            family = 'monospace',
-            color = 'white',
-            size = 12,
-        ),
-        autosize      = True,
-        height        = FIG_HEIGHT,
-        width         = FIG_WIDTH,
-        plot_bgcolor  = "black",
-        paper_bgcolor = "black",
-        xaxis_title   = "Percentage",
-        yaxis_title   = "Name",
-        margin        = dict(l=40, r=40, t=60, b=40),
-    )
-    fig.update_traces(
-        marker_color  = "#00ffcc",
-        textposition  = "outside",
-        hovertemplate = "<b>%{customdata[0]}</b><br>%{x:.2f}%",
-        customdata    = df[["full_name"]].values,
-    )
-    fig.update_yaxes(
-        autorange = "reversed",
+    """
+    Proportions of the holdings of a cik in all its quarters, sent once to the
+    browser which ranks the top N of any quarter or pair of quarters and renders
+    the one quarter and two quarters figures (see assets/quarters.js).
+    The matrix is sparse: for each quarter (most recent first), the rows
+    offsets[i]:offsets[i+1] hold the codes of its names and their proportions.
+    The codes index the sorted list of the names, and the arrays are base64
+    little-endian typed arrays: int32 offsets, uint16 codes (uint32 beyond 65536
+    names) and float32 proportions (far more precise than the 2 decimals shown).
+    """
+    quarters = get_cik_quarters(
+        cik       = cik,
+        ascending = False,
     )
-    return fig
+    df = load_holdings(cik).lazy().group_by([merge_key, 'quarter']).agg(
+        pl.sum('proportion')
+    ).collect()
+    # Dictionary of the names
+    names = df.get_column(merge_key).cast(pl.Utf8).unique().sort()
+    df = df.with_columns(
+        pl.col(merge_key).cast(pl.Utf8).replace_strict(names, pl.int_range(len(names), eager=True), return_dtype=pl.Int32).alias('code'),
+        pl.col('quarter').replace_strict(quarters, pl.int_range(len(quarters), eager=True), default=None, return_dtype=pl.Int32).alias('i_quarter'),
+    ).drop_nulls('i_quarter').sort(['i_quarter', 'code'])
+    # Start of the rows of each quarter
+    counts = df.get_column('i_quarter').value_counts().to_dict(as_series=False)
+    counts = dict(zip(counts['i_quarter'], counts['count']))
+    offsets = [0]
+    for i_quarter in range(len(quarters)):
+        offsets.append(offsets[-1] + counts.get(i_quarter, 0))
+
+    def encode(series, dtype):
+        return base64.b64encode(series.to_numpy().astype(dtype).tobytes()).decode('ascii')
+
+    codes_dtype = 'uint16' if len(names) <= 1<<16 else 'uint32'
+    version = get_store_version(cik)
+    return {
+        'cik':         cik,
+        'version':     None if version is None else list(version),
+        'merge_key':   merge_key,
+        'quarters':    quarters,
+        'names':       names.to_list(),
+        'offsets':     encode(pl.Series(offsets), '<i4'),
+        'codes_dtype': codes_dtype,
+        'codes':       encode(df.get_column('code'), '<u2' if codes_dtype=='uint16' else '<u4'),
+        'proportions': encode(df.get_column('proportion'), '<f4'),
+    }
 
 def create_one_quarter(
     cik,
-    top_n = 20,
+    top_n  = 20,
+    render = True,
 ):
     # Take the list of quarters
     quarters = get_cik_quarters(
@@ -1035,13 +3908,16 @@ def create_one_quarter(
     dropdown_value       = quarter
     dropdown_placeholder = "Select quarter" if dropdown_options else "No quarters found"
 
-    # Generate the figure
-    fig = generate_one_quarter_figure(
-        cik     = cik,
-        quarter = quarter,
-    )
+    # The figure is rendered in the browser from the proportion matrix of the cik (see assets/quarters.js)
+    fig      = generate_default_figure(title="")
+    rendered = None
     return html.Div(
         children = [
+            # Key of the figure of the graph (None: stale, rendered on the next view of the tab)
+            dcc.Store(
+                id   = "one-quarter-rendered",
+                data = rendered,
+            ),
             # Dropdown pour les quarters disponibles
             dcc.Dropdown(
                 id          = "one-quarter-dropdown",
@@ -1068,125 +3944,36 @@ def create_one_quarter(
             # Diagramme à bandes des top quarters
             html.Div(
                 dcc.Graph(
-                    id     = 'one-quarter-graph',
-                    figure = fig,
-                    config = {"displayModeBar": False},
-                    style  = {
-                        "width": "100%",
-                        "height": f"{FIG_HEIGHT}px",
-                        "backgroundColor": "yellow",
-                    },
-                ),
-                style = {
-                    "width": "100%",
-                    "display": "flex",
-                    "overflow": "hidden",
-                    "justifyContent": "center",
-                    "alignItems": "center",
-                    "borderRadius": "5px",
-                },
-            ),
-        ],
-        id = 'one-quarter-div',
-        style = {
-            'width': '100%',
-            'display': 'block',
-        },
-    )
-
-def generate_two_quarters_figure(
-    cik,
-    quarter0,
-    quarter1,
-    merge_key = 'name',
-    top_n     = 20,
-):
-    # Fichier de proportions
-    input_file_pr = f"output/{cik}/merge/{merge_key}_to_proportion.csv"
-
-    if quarter0 == quarter1:
-        title = f"Both dropdown have the value {quarter0}. Select two different quarters to compare"
-        return generate_default_figure(
-            title = title,
-        )
-
-    df = pl.read_csv(input_file_pr, columns = [merge_key, quarter0, quarter1])
-    # Filtrer les lignes où les deux colonnes ne sont pas null
-    df = df.drop_nulls(subset=[quarter0, quarter1])
-    # Calculer la différence
-    df = df.with_columns([
-        (pl.col(quarter1) / pl.col(quarter0)).alias("ratio")
-    ])
-    # Prendre les top N en valeur absolue
-    df = df.sort("ratio", descending=True).head(top_n).to_pandas()
-
-    # Conserver les noms complets pour le hover
-    df["full_name"] = df[merge_key]
-
-    # Tronquer les noms trop longs pour l'affichage
-    max_chars = 30
-    df[merge_key] = df[merge_key].apply(
-        lambda x: x if len(x) <= max_chars else x[:max_chars-1] + "\u2026"
-    )
-
-    # Créer le barplot horizontal
-    fig = px.bar(
-        data_frame  = df,
-        x           = "ratio",
-        y           = merge_key,
-        orientation = "h",
-        labels      = {
-            "ratio": f"Variation {quarter0}→{quarter1}",
-            merge_key: "Name",
-        },
-        hover_data  = {
-            "full_name": True,
-            "ratio": ':.2f',
-        },
-    )
-    fig.update_layout(
-        title = {
-            "text": f"Top {top_n} proportion ratios from {quarter0} to {quarter1}",
-            "x": 0.5,
-            "y": 0.95,
-            "xanchor": "center",
-            "yanchor": "top",
-            "font": {
-                "family": "monospace",
-                "size": 20,
-                "color": "white",
-            },
+                    id     = 'one-quarter-graph',
+                    figure = fig,
+                    config = {"displayModeBar": False},
+                    style  = {
+                        "width": "100%",
+                        "height": f"{FIG_HEIGHT}px",
+                        "backgroundColor": "yellow",
+                    },
+                ),
+                style = {
+                    "width": "100%",
+                    "display": "flex",
+                    "overflow": "hidden",
+                    "justifyContent": "center",
+                    "alignItems": "center",
+                    "borderRadius": "5px",
+                },
+            ),
+        ],
+        id = 'one-quarter-div',
+        style = {
+            'width': '100%',
+            'display': 'block' if render else 'none',
         },
-        font = dict(
-            family="monospace",
-            color="white",
-            size = 12,
-        ),
-        autosize      = True,
-        height        = FIG_HEIGHT,
-        width         = FIG_WIDTH,
-        plot_bgcolor  = "black",
-        paper_bgcolor = "black",
-        margin        = dict(l=40, r=40, t=60, b=40),
-    )
-    fig.update_traces(
-        marker_color = "#00ffcc",
-        textfont     = dict(
-            color  = "white",
-            family = "monospace",
-        ),
-        hovertemplate = "<b>%{customdata[0]}</b><br>Ratio : %{x:.2f}",
-        customdata    = df[["full_name"]].values,
-    )
-    # mettre les plus grandes valeurs en haut
-    fig.update_yaxes(
-        autorange = "reversed",
     )
-    return fig
 
 def create_two_quarters(
     cik,
-    top_n = 20,
+    top_n  = 20,
+    render = True,
 ):
     # Récupère les trimestres disponibles
     quarters = get_cik_quarters(
@@ -1204,15 +3991,17 @@ def create_two_quarters(
     dropdown_options = [{"label": q, "value": q} for q in quarters]
     dropdown_placeholder = "Select quarter" if dropdown_options else "No quarters found"
 
-    fig = generate_two_quarters_figure(
-        cik      = cik,
-        quarter0 = quarter0,
-        quarter1 = quarter1,
-        top_n    = top_n,
-    )
+    # La figure est rendue dans le navigateur à partir de la matrice des proportions du cik (voir assets/quarters.js)
+    fig      = generate_default_figure(title="")
+    rendered = None
 
     return html.Div(
         children=[
+            # Key of the figure of the graph (None: stale, rendered on the next view of the tab)
+            dcc.Store(
+                id   = "two-quarters-rendered",
+                data = rendered,
+            ),
             # Div pour les dropdown
             html.Div(
                 children = [
@@ -1301,7 +4090,7 @@ def create_two_quarters(
         id = 'two-quarters-div',
         style={
             "width": "100%",
-            "display": "none",
+            "display": "block" if render else "none",
         },
     )
 
@@ -1338,9 +4127,10 @@ def generate_quarters(
 
 def generate_all_quarters_top_n_figure(
     cik,
-    merge_key ='name',
-    top_n     = 18,
-    alpha     = 0.5,  # smoothing factor
+    merge_key     ='name',
+    top_n         = 18,
+    alpha         = 0.5,  # smoothing factor
+    high_capacity = None, # WebGL and a single glow trace (by default if top_n > ALL_QUARTERS_WEBGL_TOP_N)
 ):
     if not cik:
         title = "Import at least one CIK"
@@ -1348,10 +4138,9 @@ def generate_all_quarters_top_n_figure(
             title = title,
         )
 
-    # Lire le CSV
-    input_file_pr = f'output/{cik}/merge/{merge_key}_to_proportion.csv'
+    # Lire les proportions de tous les trimestres
     try:
-        df_pr = pd.read_csv(input_file_pr, index_col=merge_key)
+        df_pr = query_holdings(cik, merge_key, 'proportion').to_pandas().set_index(merge_key)
     except:
         title = "Merge file unavailable"
         return generate_default_figure(
@@ -1434,14 +4223,37 @@ def generate_all_quarters_top_n_figure(
             n = top_n,
         )
 
-    # Création de la figure Plotly
-    fig = go.Figure()
+    # Mode haute capacité : WebGL, un seul tracé de halo et pas de légende
+    if high_capacity is None:
+        high_capacity = top_n > ALL_QUARTERS_WEBGL_TOP_N
+    scatter = go.Scattergl if high_capacity else go.Scatter
+
+    # Séries des titres sur tous les trimestres, avec leur couleur
+    l_series = []
     for i, full_name in enumerate(top_titles):
         s = df_top[full_name].dropna()
         if len(s) > 0:
-            s = s.reindex(quarters)
-            color = cyber_colors[i % len(cyber_colors)]
-            # Glow : ligne épaisse semi-transparente
+            l_series.append((full_name, s.reindex(quarters), cyber_colors[i % len(cyber_colors)]))
+
+    # Création de la figure Plotly
+    fig = go.Figure()
+    if high_capacity and l_series:
+        # Glow : toutes les séries dans un seul tracé, séparées par des trous.
+        # WebGL n'a qu'une couleur de ligne par tracé, le halo est donc blanc
+        fig.add_trace(
+            go.Scattergl(
+                x          = [quarter for _, s, _ in l_series for quarter in quarters + [quarters[-1]]],
+                y          = pd.concat([pd.concat([s, pd.Series([None])]) for _, s, _ in l_series]).to_numpy(dtype='float32'),
+                mode       = 'lines',
+                line       = dict(color="white", width=12),
+                opacity    = 0.15,
+                hoverinfo  = 'skip',
+                showlegend = False,
+            )
+        )
+    for full_name, s, color in l_series:
+        # Glow : ligne épaisse semi-transparente (un tracé par titre en mode SVG)
+        if not high_capacity:
             fig.add_trace(
                 go.Scatter(
                     x    = s.index,
@@ -1454,30 +4266,32 @@ def generate_all_quarters_top_n_figure(
                 )
             )
 
-            hovertemplate = (
-                f"<b>{full_name}</b><br>"
-                + "Quarter: %{x}<br>"
-                + "Proportion: %{y:.2f}%<extra></extra>"
-            )
+        hovertemplate = (
+            f"<b>{full_name}</b><br>"
+            + "Quarter: %{x}<br>"
+            + "Proportion: %{y:.2f}%<extra></extra>"
+        )
 
-            # Ligne principale fine + hover complet
-            fig.add_trace(
-                go.Scatter(
-                    x            = s.index,
-                    y            = s.values,
-                    mode         = 'lines+markers',
-                    name         = title_map[full_name],  # nom tronqué dans la légende
-                    line         = dict(
-                        color = color,
-                        width = 3,
-                    ),
-                    marker       = dict(
-                        size  = 6,
-                        color = color,
-                    ),
-                    hovertemplate=hovertemplate,
-                )
+        # Ligne principale fine + hover complet
+        fig.add_trace(
+            scatter(
+                x            = s.index,
+                # float32 en mode haute capacité : la moitié des octets envoyés au navigateur
+                y            = s.values.astype('float32') if high_capacity else s.values,
+                mode         = 'lines+markers',
+                name         = title_map[full_name],  # nom tronqué dans la légende
+                line         = dict(
+                    color = color,
+                    width = 3,
+                ),
+                marker       = dict(
+                    size  = 6,
+                    color = color,
+                ),
+                hovertemplate=hovertemplate,
+                showlegend   = not high_capacity,  # une légende de centaines de titres gèle le navigateur
             )
+        )
 
     fig.update_layout(
         title={
@@ -1578,10 +4392,9 @@ def generate_all_quarters_total_value_figure(
         title = "Import at least one CIK"
         return generate_default_figure(title=title)
 
-    # Lecture du CSV avec les valeurs
-    input_file_val = f'output/{cik}/merge/{merge_key}_to_value.csv'
+    # Lecture des valeurs de tous les trimestres
     try:
-        df_val = pd.read_csv(input_file_val, index_col=merge_key)
+        df_val = query_holdings(cik, merge_key, 'value').to_pandas().set_index(merge_key)
     except:
         title = "Merge file unavailable"
         return generate_default_figure(title=title)
@@ -1706,29 +4519,40 @@ def generate_all_quarters_total_value_figure(
 
 def create_all_quarters(
     cik,
+    render = True,
 ):
 
     dropdown_options     = [
         {'label': 'Top N', 'value': 'top_n'},
+        {'label': 'Top 100', 'value': 'top_100'},
+        {'label': 'Top 500', 'value': 'top_500'},
         {'label': 'Total Value', 'value': 'total_value'},
     ]
     #dropdown_value       = "top_n"
     dropdown_value       = "total_value"
     dropdown_placeholder = "Choose a figure"
 
-    if dropdown_value=="top_n":
-        # Génère la figure des top N proportions récentes
-        fig = generate_all_quarters_top_n_figure(
-            cik = cik,
-        )
+    # Génère la figure si le tab est affiché, sinon elle est rendue à sa première vue
+    if render:
+        if dropdown_value=="top_n":
+            # Figure des top N proportions récentes
+            function = generate_all_quarters_top_n_figure
+        else:
+            # Figure de la valeur totale dans le temps
+            function = generate_all_quarters_total_value_figure
+        fig      = cached_figure(function, cik=cik)
+        rendered = render_key(function, cik=cik)
     else:
-        # Génère la figure de la valeur totale dans le temps
-        fig = generate_all_quarters_total_value_figure(
-            cik = cik,
-        )
+        fig      = generate_default_figure(title="")
+        rendered = None
 
     return html.Div(
         children=[
+            # Key of the figure of the graph (None: stale, rendered on the next view of the tab)
+            dcc.Store(
+                id   = "all-quarters-rendered",
+                data = rendered,
+            ),
             # Dropdown pour le choix de la visualisation
             dcc.Dropdown(
                 id          = "all-quarters-dropdown",
@@ -1776,7 +4600,7 @@ def create_all_quarters(
         id = 'all-quarters-div',
         style={
             "width": "100%",
-            "display": "none",
+            "display": "block" if render else "none",
         },
     )
 
@@ -1785,15 +4609,23 @@ def create_figures(
 ):
     return html.Div(
         children = [
+            # Proportions of the holdings of the cik, for the figures rendered in the browser
+            dcc.Store(
+                id   = "cik-data-store",
+                data = cached_figure(generate_proportion_matrix, cik=cik) if cik else None,
+            ),
             # View 
             create_one_quarter(
-                cik = cik,
+                cik    = cik,
+                render = DEFAULT_TAB=="one-quarter",
             ),
             create_two_quarters(
-                cik = cik,
+                cik    = cik,
+                render = DEFAULT_TAB=="two-quarters",
             ),
             create_all_quarters(
-                cik = cik,
+                cik    = cik,
+                render = DEFAULT_TAB=="all-quarters",
             ),
         ],
         style = {
@@ -1829,10 +4661,8 @@ def create_body(
     )
 
 def get_cik_numbers():
-    # Take the list of cik folders
-    cik_folders = get_cik_folders()
-    # Take the list of cik numbers
-    cik_numbers = [cik_folder.split('/')[-1] for cik_folder in cik_folders]
+    # Take the list of cik numbers of the catalog
+    cik_numbers = list(get_cik_names())
     return cik_numbers
 
 def create_layout():
@@ -1887,46 +4717,72 @@ def create_layout():
 def register_callbacks(
     app,
 ):
-    # Un callback pour l'import de fichiers
+    # Settings of the store, given to the background jobs
+    store_settings = get_store_settings()
+
+    # Un callback pour l'import de fichiers, exécuté en arrière-plan
     @app.callback(
         Output("cik-dropdown", "options"),
         Output("cik-dropdown", "value"),
         Output("cik-dropdown", "placeholder"),
-        Input("file-upload-selector", "contents"),
-        State("file-upload-selector", "filename"),
+        Input("upload-store", "data"),
+        background = True,
+        running    = [
+            (Output("file-upload-selector", "className"), "import-running", ""),
+            (Output("import-progress-div", "style"), import_progress_style(visible=True), import_progress_style(visible=False)),
+        ],
+        progress   = [
+            Output("import-progress", "value"),
+            Output("import-progress", "label"),
+        ],
+        cancel     = [
+            Input("import-cancel-button", "n_clicks"),
+        ],
         prevent_initial_call=True
     )
     def handle_upload(
-        contents,
-        filenames,
+        set_progress,
+        upload_data,
     ):
-        if not contents:
+        if not upload_data:
             raise dash.exceptions.PreventUpdate
-
-        # Parse the txt files to raw csv data
-        cik_set = parse_contents_to_raw_csv(
-            contents  = contents,
-            filenames = filenames,
-            verbose   = False,
-        )
-        # Convert the raw csv data to clean csv data
-        convert_raw_csv_to_clean_csv(
-            cik_set = cik_set,
-        )
-        # Map the variants of nameOfIssuer
-        map_nameOfIssuer_variants(
-            cik_set = cik_set,
-        )
-        # Merge the portfolio proportions
-        merge_portfolio_proportions(
-            cik_set = cik_set,
+        # The job runs in a spawned process: apply the settings of the command line
+        apply_store_settings(store_settings)
+        # In the workers of `diff13f serve`, the files are ingested by the ingest process
+        if READ_ONLY:
+            check_ingest_process()
+
+        # Report the progress of each stage to the progress bar
+        def report_progress(stage, n_done, n_total):
+            start, end, label = INGEST_PROGRESS_STAGES[stage]
+            set_progress((
+                start + (end-start)*n_done/max(n_total, 1),
+                f"{label} {min(n_done+1, n_total)}/{n_total}",
+            ))
+
+        # Wait for the files parsed to raw csv data by the server while they were uploaded
+        cik_set = collect_upload_reports(
+            upload_ids = upload_data['upload_ids'],
+            progress   = report_progress,
         )
+        # Update the clean, mapping and merge outputs (by the ingest process if the store is read-only)
+        if READ_ONLY:
+            request_outputs_update(
+                cik_set  = cik_set,
+                progress = report_progress,
+            )
+        else:
+            update_cik_outputs(
+                cik_set  = cik_set,
+                progress = report_progress,
+            )
         # Take the list of cik numbers available
-        cik_numbers = get_cik_numbers()
+        cik_names   = get_cik_names()
+        cik_numbers = list(cik_names)
         # Update the list of CIK after the import
         dropdown_options     = [
             {
-                "label": f"{cik_number} - {cik_to_company_conformed_name(cik=cik_number)}",
+                "label": f"{cik_number} - {cik_names[cik_number]}",
                 "value": cik_number,
             }
             for cik_number in cik_numbers
@@ -1940,157 +4796,151 @@ def register_callbacks(
             dropdown_placeholder,
         )
 
-    # Mise à jour de l'interface par divers dropdown
+    # Mise à jour des dropdown des trimestres au changement de CIK
     @app.callback(
         Output("one-quarter-dropdown", "options"),
         Output("one-quarter-dropdown", "value"),
         Output("one-quarter-dropdown", "placeholder"),
-        Output("one-quarter-graph", "figure"),
         Output("two-quarters-dropdown-0", "options"),
         Output("two-quarters-dropdown-0", "value"),
         Output("two-quarters-dropdown-0", "placeholder"),
         Output("two-quarters-dropdown-1", "options"),
         Output("two-quarters-dropdown-1", "value"),
         Output("two-quarters-dropdown-1", "placeholder"),
-        Output("two-quarters-graph", "figure"),
-        Output("all-quarters-graph", "figure"),
         Input("cik-dropdown", "options"),
         Input("cik-dropdown", "value"),
-        Input("one-quarter-dropdown", "value"),
-        Input("two-quarters-dropdown-0", "value"),
-        Input("two-quarters-dropdown-1", "value"),
-        Input("all-quarters-dropdown", "value"),
         prevent_initial_call=True
     )
-    def update_latest_company_name(
+    def update_quarter_dropdowns(
         cik_dropdown_options,
         cik_dropdown_value,
-        one_quarter_dropdown_value,
-        two_quarters_dropdown_0_value,
-        two_quarters_dropdown_1_value,
-        all_quarters_dropdown_value,
     ):
-        ctx = callback_context
-        trigger_type = ctx.triggered[0]["prop_id"]
-
-        one_quarter_dropdown_options        = no_update
-        one_quarter_dropdown_placeholder    = no_update
-        one_quarter_graph_figure            = no_update
-        two_quarters_dropdown_0_options     = no_update
-        two_quarters_dropdown_0_placeholder = no_update
-        two_quarters_dropdown_1_options     = no_update
-        two_quarters_dropdown_1_placeholder = no_update
-        two_quarters_graph_figure           = no_update
-        all_quarters_graph_figure           = no_update
-
-        if trigger_type in ['cik-dropdown.value', 'cik-dropdown.options']:
-
-            # Update the one quarter dropdown
-            quarters = get_cik_quarters(
-                cik       = cik_dropdown_value,
-                ascending = False,
-            )
-            dropdown_options = [{"label": q, "value": q} for q in quarters]
-            dropdown_placeholder = "Select quarter" if dropdown_options else "No quarters found"
-            one_quarter_dropdown_options     = dropdown_options
-            one_quarter_dropdown_value       = quarters[0] if quarters else None
-            one_quarter_dropdown_placeholder = dropdown_placeholder
-            # Update the one quarter figure
-            one_quarter_graph_figure = generate_one_quarter_figure(
-                cik     = cik_dropdown_value,
-                quarter = one_quarter_dropdown_value,
-            )
-            # Update the two quarters dropdown
-            if len(quarters)>=2:
-                quarter0 = quarters[1]
-                quarter1 = quarters[0]
-            else:
-                quarter0 = None
-                quarter1 = None
-            dropdown_options = [{"label": q, "value": q} for q in quarters]
-            dropdown_placeholder = "Select quarter" if dropdown_options else "No quarters found"
-            two_quarters_dropdown_0_options     = dropdown_options
-            two_quarters_dropdown_0_value       = quarter0
-            two_quarters_dropdown_0_placeholder = dropdown_placeholder
-            two_quarters_dropdown_1_options     = dropdown_options
-            two_quarters_dropdown_1_value       = quarter1
-            two_quarters_dropdown_1_placeholder = dropdown_placeholder
-            # Update the two quarters figure
-            two_quarters_graph_figure = generate_two_quarters_figure(
-                cik      = cik_dropdown_value,
-                quarter0 = two_quarters_dropdown_0_value,
-                quarter1 = two_quarters_dropdown_1_value,
-            )
-            # Update the all quarters figure
-            all_quarters_graph_figure = generate_all_quarters_top_n_figure(
-                cik      = cik_dropdown_value,
-            )
-
-            if all_quarters_dropdown_value=="top_n":
-                # Génère la figure des top N proportions récentes
-                all_quarters_graph_figure = generate_all_quarters_top_n_figure(
-                    cik = cik_dropdown_value,
-                )
-            else:
-                # Génère la figure de la valeur totale dans le temps
-                all_quarters_graph_figure = generate_all_quarters_total_value_figure(
-                    cik = cik_dropdown_value,
-                )
-
-        elif trigger_type=='one-quarter-dropdown.value':
-
-            # Update the one quarter figure
-            one_quarter_graph_figure = generate_one_quarter_figure(
-                cik     = cik_dropdown_value,
-                quarter = one_quarter_dropdown_value,
-            )
-
-        elif trigger_type=='two-quarters-dropdown-0.value':
-
-            # Update the two quarters figure
-            two_quarters_graph_figure = generate_two_quarters_figure(
-                cik      = cik_dropdown_value,
-                quarter0 = two_quarters_dropdown_0_value,
-                quarter1 = two_quarters_dropdown_1_value,
-            )
-
-        elif trigger_type=='two-quarters-dropdown-1.value':
+        # Take the quarters of the cik, the most recent first
+        quarters = get_cik_quarters(
+            cik       = cik_dropdown_value,
+            ascending = False,
+        )
+        dropdown_options     = [{"label": q, "value": q} for q in quarters]
+        dropdown_placeholder = "Select quarter" if dropdown_options else "No quarters found"
+        # One quarter: the most recent one
+        one_quarter_value = quarters[0] if quarters else None
+        # Two quarters: the two most recent ones
+        if len(quarters)>=2:
+            quarter0 = quarters[1]
+            quarter1 = quarters[0]
+        else:
+            quarter0 = None
+            quarter1 = None
+        # On rend le résultat
+        return (
+            dropdown_options,
+            one_quarter_value,
+            dropdown_placeholder,
+            dropdown_options,
+            quarter0,
+            dropdown_placeholder,
+            dropdown_options,
+            quarter1,
+            dropdown_placeholder,
+        )
 
-            # Update the all quarters figure
-            two_quarters_graph_figure = generate_two_quarters_figure(
-                cik      = cik_dropdown_value,
-                quarter0 = two_quarters_dropdown_0_value,
-                quarter1 = two_quarters_dropdown_1_value,
-                top_n    = 20,
-            )
+    def render_tab_figure(
+        tabs_value,
+        tab,
+        rendered,
+        function,
+        **kwargs,
+    ):
+        # Only the figure of the tab shown is computed: the graph of a hidden tab stays stale
+        if tabs_value!=tab:
+            raise dash.exceptions.PreventUpdate
+        # Nothing to do if the graph already shows this figure (same arguments and store version)
+        key = render_key(function, **kwargs)
+        if key==rendered:
+            raise dash.exceptions.PreventUpdate
+        return cached_figure(function, **kwargs), key
 
-        elif trigger_type=="all-quarters-dropdown.value":
+    # Envoi de la matrice des proportions du CIK au navigateur (une fois par CIK)
+    @app.callback(
+        Output("cik-data-store", "data"),
+        Input("cik-dropdown", "options"),
+        Input("cik-dropdown", "value"),
+        prevent_initial_call=True
+    )
+    def update_cik_data_store(
+        cik_dropdown_options,
+        cik_dropdown_value,
+    ):
+        if not cik_dropdown_value:
+            return None
+        return cached_figure(
+            generate_proportion_matrix,
+            cik = cik_dropdown_value,
+        )
 
-            if all_quarters_dropdown_value=="top_n":
-                # Génère la figure des top N proportions récentes
-                all_quarters_graph_figure = generate_all_quarters_top_n_figure(
-                    cik = cik_dropdown_value,
-                )
-            else:
-                # Génère la figure de la valeur totale dans le temps
-                all_quarters_graph_figure = generate_all_quarters_total_value_figure(
-                    cik = cik_dropdown_value,
-                )
+    # Figures des tabs d'un et de deux trimestres, rendues dans le navigateur (aucune requête au serveur)
+    app.clientside_callback(
+        ClientsideFunction(
+            namespace     = "diff13f",
+            function_name = "renderOneQuarter",
+        ),
+        Output("one-quarter-graph", "figure"),
+        Output("one-quarter-rendered", "data"),
+        Input("tabs", "value"),
+        Input("cik-data-store", "data"),
+        Input("one-quarter-dropdown", "value"),
+        State("one-quarter-rendered", "data"),
+        State("one-quarter-graph", "figure"),
+    )
+    app.clientside_callback(
+        ClientsideFunction(
+            namespace     = "diff13f",
+            function_name = "renderTwoQuarters",
+        ),
+        Output("two-quarters-graph", "figure"),
+        Output("two-quarters-rendered", "data"),
+        Input("tabs", "value"),
+        Input("cik-data-store", "data"),
+        Input("two-quarters-dropdown-0", "value"),
+        Input("two-quarters-dropdown-1", "value"),
+        State("two-quarters-rendered", "data"),
+        State("two-quarters-graph", "figure"),
+    )
 
-        # On rend le résultat
-        return (
-            one_quarter_dropdown_options,
-            one_quarter_dropdown_value,
-            one_quarter_dropdown_placeholder,
-            one_quarter_graph_figure,
-            two_quarters_dropdown_0_options,
-            two_quarters_dropdown_0_value,
-            two_quarters_dropdown_0_placeholder,
-            two_quarters_dropdown_1_options,
-            two_quarters_dropdown_1_value,
-            two_quarters_dropdown_1_placeholder,
-            two_quarters_graph_figure,
-            all_quarters_graph_figure,
+    # Figure du tab de tous les trimestres
+    @app.callback(
+        Output("all-quarters-graph", "figure"),
+        Output("all-quarters-rendered", "data"),
+        Input("tabs", "value"),
+        Input("cik-dropdown", "value"),
+        Input("all-quarters-dropdown", "value"),
+        State("all-quarters-rendered", "data"),
+        prevent_initial_call=True
+    )
+    def update_all_quarters_graph(
+        tabs_value,
+        cik_dropdown_value,
+        all_quarters_dropdown_value,
+        rendered,
+    ):
+        kwargs = {}
+        if all_quarters_dropdown_value=="top_n":
+            # Génère la figure des top N proportions récentes
+            function = generate_all_quarters_top_n_figure
+        elif all_quarters_dropdown_value in ["top_100", "top_500"]:
+            # Top 100 ou 500 : la figure est rendue en WebGL (voir ALL_QUARTERS_WEBGL_TOP_N)
+            function = generate_all_quarters_top_n_figure
+            kwargs   = {'top_n': int(all_quarters_dropdown_value.split('_')[1])}
+        else:
+            # Génère la figure de la valeur totale dans le temps
+            function = generate_all_quarters_total_value_figure
+        return render_tab_figure(
+            tabs_value,
+            "all-quarters",
+            rendered,
+            function,
+            cik = cik_dropdown_value,
+            **kwargs,
         )
 
     # Client-side JS callback (aucun délai)
@@ -2145,6 +4995,116 @@ def register_callbacks(
 ################################################################################
 # Create the app
 
+def register_upload_routes(
+    app,
+):
+    """
+    Add the routes of the chunked uploads to the server of the app:
+        GET {UPLOAD_ROUTE}/<upload_id>?name=<filename>
+            status of the upload (see get_upload_status)
+        PUT {UPLOAD_ROUTE}/<upload_id>?name=<filename>&offset=<offset>&size=<size>
+            append the body of the request at the offset (409 with the status if
+            the offset is not the number of bytes received)
+    Each complete file is ingested right away by a single thread of the server,
+    so the parsing of the files overlaps with the upload of the next ones. If the
+    store is read-only (workers of `diff13f serve`), the file is queued for the
+    ingest process instead (see run_ingest_process).
+    The chunks of different uploads are written concurrently.
+    """
+    # A single ingest thread: the outputs and the catalog of the ingested filings have one writer
+    executor     = ThreadPoolExecutor(max_workers=1)
+    queued       = set()
+    upload_locks = {}
+    lock         = threading.Lock()
+
+    def ingest(upload_id, filename):
+        # Ingest a queued file, then let the same file be uploaded and ingested again
+        try:
+            ingest_uploaded_file(upload_id, filename)
+        finally:
+            with lock:
+                queued.discard(upload_id)
+
+    def submit_ingest(upload_id, filename):
+        # Queue a complete file once (also after a restart of the server)
+        if READ_ONLY:
+            queue_upload_ingest(upload_id, filename)
+        elif upload_id not in queued:
+            queued.add(upload_id)
+            executor.submit(ingest, upload_id, filename)
+
+    @app.server.route(f"{UPLOAD_ROUTE}/<upload_id>", methods=["GET"])
+    def upload_status(upload_id):
+        if not _UPLOAD_ID.match(upload_id):
+            return jsonify(error="invalid upload id"), 400
+        with lock:
+            status = get_upload_status(upload_id)
+            if status['complete'] and not status['ingested']:
+                submit_ingest(upload_id, request.args.get('name', upload_id))
+        return jsonify(status)
+
+    @app.server.route(f"{UPLOAD_ROUTE}/<upload_id>", methods=["PUT"])
+    def upload_chunk(upload_id):
+        if not _UPLOAD_ID.match(upload_id):
+            return jsonify(error="invalid upload id"), 400
+        try:
+            offset     = int(request.args['offset'])
+            total_size = int(request.args['size'])
+        except (KeyError, ValueError):
+            return jsonify(error="missing offset or size"), 400
+        # Only the chunks of the same upload are written one at a time
+        with lock:
+            upload_lock = upload_locks.setdefault(upload_id, threading.Lock())
+        with upload_lock:
+            try:
+                status = write_upload_chunk(
+                    upload_id  = upload_id,
+                    offset     = offset,
+                    total_size = total_size,
+                    stream     = request.stream,
+                )
+            except ValueError as e:
+                return jsonify(error=str(e), **get_upload_status(upload_id)), 409
+        with lock:
+            if status['complete']:
+                upload_locks.pop(upload_id, None)
+                if not status['ingested']:
+                    submit_ingest(upload_id, request.args.get('name', upload_id))
+        return jsonify(status)
+
+def register_cache_routes(
+    app,
+):
+    # Add the route of the counters of the caches (hits, misses, entries and bytes) to the server of the app
+    @app.server.route(CACHE_STATS_ROUTE, methods=["GET"])
+    def cache_stats():
+        return jsonify(
+            figures  = FIGURE_CACHE.stats(),
+            holdings = DATA_CACHE.stats(),
+        )
+
+class SpawnDiskcacheManager(DiskcacheManager):
+    """
+    Manager of the background callbacks whose jobs are spawned processes, without
+    changing the start method of the host process (forking a process whose Polars
+    thread pool is running can deadlock).
+    """
+
+    def call_job_fn(
+        self,
+        key,
+        job_fn,
+        args,
+        context,
+    ):
+        # Same as DiskcacheManager.call_job_fn, with a spawn context of multiprocess
+        process = multiprocess.get_context("spawn").Process(
+            target = job_fn,
+            args   = (key, self._make_progress_key(key), args, context),
+        )
+        process.start()
+        return process.pid
+
 def create_dash_app(
     url = None,
 ):
@@ -2152,29 +5112,441 @@ def create_dash_app(
     # Absolute path to the assets folder inside the package
     assets_path = os.path.join(os.path.dirname(__file__), "assets")
 
+    # Manager of the background callbacks (imports), with a cache on the disk (spawned jobs)
+    background_callback_manager = SpawnDiskcacheManager(
+        diskcache.Cache(JOBS_CACHE_DIR),
+    )
+
     # Instantiate a Dash app
     app = Dash(
         __name__,
-        title                = "DIFF13F",
-        assets_folder        = assets_path,
-        external_stylesheets = [
+        title                       = "DIFF13F",
+        assets_folder               = assets_path,
+        background_callback_manager = background_callback_manager,
+        external_stylesheets        = [
             dbc.themes.BOOTSTRAP,
             "https://cdn.jsdelivr.net/npm/bootstrap-icons/font/bootstrap-icons.css",
             'https://fonts.googleapis.com/css2?family=JetBrains+Mono&display=swap',
         ]
     )
 
-    # Create the layout
-    app.layout = create_layout()
+    # Create the layout (at each page load: the imports made by other processes are shown)
+    app.layout = create_layout
 
     # Register the callbacks
     register_callbacks(
         app = app,
     )
 
+    # Register the routes of the chunked uploads
+    register_upload_routes(
+        app = app,
+    )
+
+    # Register the route of the counters of the caches
+    register_cache_routes(
+        app = app,
+    )
+
     # Return the app
     return app
 
+def create_wsgi_app(
+    store_settings = None,
+    read_only      = True,
+):
+    """
+    WSGI app factory for a pre-forking server, called in each worker, e.g.
+        gunicorn --workers 4 --bind 0.0.0.0:8050 "diff13f.app:create_wsgi_app()"
+    The store is read-only in the workers: the imports are written by a single
+    ingest process (see run_ingest_process, started by `diff13f serve`).
+    """
+    # Apply the settings of the command line (store settings of the master)
+    if store_settings is not None:
+        apply_store_settings(store_settings)
+    set_read_only(read_only)
+    # Without settings, the storage format is the one saved with the output directory
+    if store_settings is None:
+        set_storage_format()
+    # Return the Flask server of the Dash app
+    return create_dash_app().server
+
+################################################################################
+################################################################################
+# Command line interface
+
+def create_argument_parser():
+    parser = argparse.ArgumentParser(
+        prog        = "diff13f",
+        description = "Dash app to explore 13F filings. Without a command, the app is launched.",
+    )
+    parser.add_argument(
+        "--storage",
+        choices = STORAGE_FORMATS,
+        default = None,
+        help    = "Format of the tables written in a new output directory (default: the format saved with the output directory, csv for a new one).",
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type    = float,
+        default = None,
+        metavar = "MB",
+        help    = "Cap (in MB) of the data materialized at once when the tables are built.",
+    )
+    parser.add_argument(
+        "--data-cache",
+        type    = float,
+        default = DATA_CACHE_MAX_BYTES/(1 << 20),
+        metavar = "MB",
+        help    = "Cap (in MB) of the holdings tables kept in memory by the app.",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    # Command to import filings from the disk without the web interface
+    parser_ingest = subparsers.add_parser(
+        "ingest",
+        help = "Import 13F txt files from the disk.",
+    )
+    parser_ingest.add_argument(
+        "paths",
+        nargs = "+",
+        help  = "Files, archives (zip, tar, tar.gz, gz), glob patterns or directories (searched recursively for .txt files and archives).",
+    )
+    parser_ingest.add_argument(
+        "--workers",
+        type    = int,
+        default = os.cpu_count() or 1,
+        help    = "Number of worker processes used to parse the files.",
+    )
+    parser_ingest.add_argument(
+        "--force",
+        action = "store_true",
+        help   = "Re-import the filings already ingested with an identical content.",
+    )
+    parser_ingest.add_argument(
+        "--verbose",
+        action = "store_true",
+    )
+    # Command to download and import the filings of some cik from EDGAR
+    parser_fetch = subparsers.add_parser(
+        "fetch",
+        help = "Download the 13F filings of some cik from EDGAR and import them.",
+    )
+    parser_fetch.add_argument(
+        "--cik",
+        nargs    = "+",
+        required = True,
+        help     = "Central index keys of the filers.",
+    )
+    parser_fetch.add_argument(
+        "--user-agent",
+        default = FETCH_USER_AGENT,
+        help    = "User-Agent of the requests (the SEC asks for a name and a contact email).",
+    )
+    parser_fetch.add_argument(
+        "--rate-limit",
+        type    = float,
+        default = FETCH_RATE_LIMIT,
+        help    = "Maximum number of requests per second.",
+    )
+    parser_fetch.add_argument(
+        "--concurrency",
+        type    = int,
+        default = FETCH_CONCURRENCY,
+        help    = "Number of downloads in flight at once.",
+    )
+    parser_fetch.add_argument(
+        "--retries",
+        type    = int,
+        default = FETCH_RETRIES,
+        help    = "Number of retries of a failed request.",
+    )
+    parser_fetch.add_argument(
+        "--base-url",
+        default = None,
+        help    = "Base URL of a stand-in of EDGAR serving /submissions and /Archives/edgar/data (e.g. a local test server).",
+    )
+    parser_fetch.add_argument(
+        "--workers",
+        type    = int,
+        default = os.cpu_count() or 1,
+        help    = "Number of worker processes used to parse the files.",
+    )
+    parser_fetch.add_argument(
+        "--verbose",
+        action = "store_true",
+    )
+    # Command to import a Form 13F data set of the SEC
+    parser_bulk = subparsers.add_parser(
+        "ingest-bulk",
+        help = "Import quarterly Form 13F data sets of the SEC (ZIP files with the SUBMISSION, COVERPAGE and INFOTABLE tables).",
+    )
+    parser_bulk.add_argument(
+        "paths",
+        nargs = "+",
+        help  = "ZIP files of the data sets.",
+    )
+    parser_bulk.add_argument(
+        "--force",
+        action = "store_true",
+        help   = "Re-import the filings already ingested.",
+    )
+    parser_bulk.add_argument(
+        "--verbose",
+        action = "store_true",
+    )
+    # Command to convert the tables of the output directory to another format
+    parser_migrate = subparsers.add_parser(
+        "migrate",
+        help = "Convert the tables of the output directory to another storage format.",
+    )
+    parser_migrate.add_argument(
+        "--to",
+        choices  = STORAGE_FORMATS,
+        required = True,
+        help     = "Storage format of the converted tables.",
+    )
+    parser_migrate.add_argument(
+        "--verbose",
+        action = "store_true",
+    )
+    # Command to serve the app with several worker processes
+    parser_serve = subparsers.add_parser(
+        "serve",
+        help = "Serve the app with several read-only worker processes (gunicorn) and a single ingest process.",
+    )
+    parser_serve.add_argument(
+        "--host",
+        default = "127.0.0.1",
+        help    = "Address the server listens on (0.0.0.0 for all the interfaces).",
+    )
+    parser_serve.add_argument(
+        "--port",
+        type    = int,
+        default = 8050,
+        help    = "Port the server listens on.",
+    )
+    parser_serve.add_argument(
+        "--workers",
+        type    = int,
+        default = os.cpu_count() or 1,
+        help    = "Number of worker processes of the app (default: number of CPUs).",
+    )
+    parser_serve.add_argument(
+        "--ingest-only",
+        action = "store_true",
+        help   = "Run the ingest process only (the workers are run by another WSGI server, see create_wsgi_app).",
+    )
+    # Command to show or rebuild the catalog of the output directory
+    parser_catalog = subparsers.add_parser(
+        "catalog",
+        help = "Show the catalog of the output directory (or rebuild it from the files).",
+    )
+    parser_catalog.add_argument(
+        "--rebuild",
+        action = "store_true",
+        help   = "Rebuild the catalog from the files of the output directory (e.g. after a manual change).",
+    )
+    # Command to export the wide views of the holdings
+    parser_export = subparsers.add_parser(
+        "export",
+        help = "Export the holdings of a cik as wide csv files (one column per quarter).",
+    )
+    parser_export.add_argument(
+        "--cik",
+        nargs    = "+",
+        required = True,
+        help     = "Central index keys (10 digits) of the exported filers.",
+    )
+    parser_export.add_argument(
+        "--output",
+        default = None,
+        help    = "Output directory (default: output/<cik>/export).",
+    )
+    parser_export.add_argument(
+        "--merge-key",
+        nargs   = "+",
+        choices = MERGE_KEYS,
+        default = MERGE_KEYS,
+        help    = "Merge keys of the exported views.",
+    )
+    parser_export.add_argument(
+        "--target",
+        nargs   = "+",
+        choices = TARGET_VARIABLES,
+        default = TARGET_VARIABLES,
+        help    = "Target variables of the exported views.",
+    )
+    return parser
+
+def run_ingest_command(
+    args,
+):
+    # Import the files
+    report = ingest_paths(
+        paths         = args.paths,
+        n_workers     = args.workers,
+        skip_ingested = not args.force,
+        verbose       = args.verbose,
+    )
+    # Print the report
+    print(f"Processed {report['n_processed']} files, skipped {report['n_skipped']} already ingested, {len(report['failures'])} failed.")
+    print(f"Imported {report['n_processed']} files ({report['n_rows']:,} rows) for {len(report['cik_set'])} cik in {report['seconds']:.2f} s.")
+    print(f"Parse: {report['seconds_parse']:.2f} s / Clean, map and merge: {report['seconds_update']:.2f} s.")
+    print(f"Throughput: {report['files_per_s']:.1f} files/s, {report['rows_per_s']:,.0f} rows/s.")
+    for filename, error in report['failures']:
+        print(f"FAILED: {filename} ({error})")
+    return report
+
+def run_fetch_command(
+    args,
+):
+    # Point to a stand-in of EDGAR
+    global FETCH_SUBMISSIONS_URL, FETCH_ARCHIVES_URL
+    if args.base_url:
+        base_url = args.base_url.rstrip('/')
+        FETCH_SUBMISSIONS_URL = f"{base_url}/submissions"
+        FETCH_ARCHIVES_URL    = f"{base_url}/Archives/edgar/data"
+    # Download and import the filings
+    report = fetch_filings(
+        cik_list     = args.cik,
+        rate_limit   = args.rate_limit,
+        n_concurrent = args.concurrency,
+        retries      = args.retries,
+        user_agent   = args.user_agent,
+        n_workers    = args.workers,
+        verbose      = args.verbose,
+    )
+    # Print the report
+    print(f"Listed {report['n_listed']} 13F filings, fetched {report['n_fetched']} in {report['seconds_fetch']:.2f} s.")
+    print(f"Processed {report['n_processed']} files, skipped {report['n_skipped']} already ingested, {len(report['failures'])} failed.")
+    print(f"Imported {report['n_rows']:,} rows for {len(report['cik_set'])} cik in {report['seconds']:.2f} s.")
+    for filename, error in report['failures']:
+        print(f"FAILED: {filename} ({error})")
+    return report
+
+def run_bulk_command(
+    args,
+):
+    # Import the data sets one at a time
+    reports = []
+    for path in args.paths:
+        report = ingest_bulk_dataset(
+            path          = path,
+            skip_ingested = not args.force,
+            verbose       = args.verbose,
+        )
+        print(f"{path}: processed {report['n_processed']} filings, skipped {report['n_skipped']} already ingested.")
+        print(f"Imported {report['n_rows']:,} rows for {len(report['cik_set'])} cik in {report['seconds']:.2f} s.")
+        print(f"Parse: {report['seconds_parse']:.2f} s / Clean, map and merge: {report['seconds_update']:.2f} s.")
+        print(f"Throughput: {report['rows_per_s']:,.0f} rows/s.")
+        reports.append(report)
+    return reports
+
+def run_migrate_command(
+    args,
+):
+    # Convert the tables
+    t0      = time.perf_counter()
+    n_files = migrate_store(
+        storage_format = args.to,
+        verbose        = args.verbose,
+    )
+    print(f"Converted {n_files} files to {args.to} in {time.perf_counter()-t0:.2f} s.")
+    return n_files
+
+def run_threaded_server(
+    host,
+    port,
+    store_settings,
+):
+    # Serve the app with a single threaded process (without gunicorn), with a read-only store
+    from werkzeug.serving import run_simple
+    run_simple(
+        hostname    = host,
+        port        = port,
+        application = create_wsgi_app(store_settings=store_settings),
+        threaded    = True,
+    )
+
+def run_serve_command(
+    args,
+):
+    """
+    Serve the app: the read-only workers are forked by gunicorn (see create_wsgi_app),
+    and this process is the single ingest process, the writer of the store (see
+    run_ingest_process). Gunicorn is run as a separate command so that its master,
+    which forks the workers, does not import the app (and the thread pool of Polars).
+    Without gunicorn, the app is served by a single threaded process.
+    """
+    store_settings = dict(get_store_settings(), memory_limit_mb=args.memory_limit)
+    # Build the catalog before the workers open it read-only
+    with open_catalog():
+        pass
+    stop = threading.Event()
+    if args.ingest_only:
+        print("Ingest process started (Ctrl+C to stop).")
+    elif importlib.util.find_spec("gunicorn") is None:
+        print("WARNING: gunicorn is not installed (pip install diff13f[serve]). Serving with a single threaded process.")
+        server = multiprocessing.get_context("spawn").Process(
+            target = run_threaded_server,
+            args   = (args.host, args.port, store_settings),
+            name   = "diff13f-server",
+        )
+        server.start()
+        wait_server = server.join
+    else:
+        server = subprocess.Popen([
+            sys.executable, "-m", "gunicorn",
+            "--bind",    f"{args.host}:{args.port}",
+            "--workers", str(args.workers),
+            f"diff13f.app:create_wsgi_app(store_settings={store_settings!r})",
+        ])
+        wait_server = server.wait
+    # Stop the ingest when the server exits
+    if not args.ingest_only:
+        threading.Thread(target=lambda: (wait_server(), stop.set()), daemon=True).start()
+    # Ctrl+C stops the server (gunicorn shuts its workers down) and the ingest
+    run_ingest_process(
+        store_settings = store_settings,
+        stop           = stop,
+    )
+    # Stop the server if the ingest was stopped first (e.g. SIGTERM of this process only)
+    if not args.ingest_only:
+        server.terminate()
+        wait_server()
+
+def run_catalog_command(
+    args,
+):
+    # Rebuild the catalog if asked, then summarize it
+    with open_catalog() as db:
+        if args.rebuild:
+            rebuild_catalog(db)
+        n_ciks    = db.execute("SELECT COUNT(*) FROM ciks").fetchone()[0]
+        n_filings = db.execute("SELECT COUNT(*) FROM filings").fetchone()[0]
+    pending = get_pending_stages()
+    print(f"Catalog {CATALOG_FILE}: {n_ciks} cik, {n_filings} filings.")
+    for cik, stages in pending.items():
+        print(f"WARNING: the outputs of cik={cik} are not up to date (pending: {', '.join(stages)}).")
+    return pending
+
+def run_export_command(
+    args,
+):
+    # Export the wide views of each cik
+    output_files = []
+    for cik in args.cik:
+        output_dir = os.path.join(args.output, cik) if args.output and len(args.cik) > 1 else args.output
+        output_files += export_wide_views(
+            cik              = cik,
+            output_dir       = output_dir,
+            merge_keys       = args.merge_key,
+            target_variables = args.target,
+        )
+    for output_file in output_files:
+        print(f"Exported {output_file}")
+    return output_files
+
 ################################################################################
 ################################################################################
 # Execute the app
@@ -2184,11 +5556,60 @@ def main(
     open_browser  = True,
     debug         = False,
     use_reloader  = False,
+    argv          = None,
 ):
     """
     Entry point of the app.
     """
 
+    # Parse the command line
+    parser = create_argument_parser()
+    args   = parser.parse_args(argv)
+    # Storage format of the output directory
+    try:
+        set_storage_format(args.storage)
+    except ValueError as e:
+        parser.error(str(e))
+    DATA_CACHE.max_bytes = int(args.data_cache*(1 << 20))
+    if args.command == "serve":
+        # The memory limit is set in the forked workers and the ingest process (it starts Polars)
+        run_serve_command(
+            args = args,
+        )
+        return
+    if args.memory_limit is not None:
+        set_memory_limit(args.memory_limit)
+    if args.command == "migrate":
+        run_migrate_command(
+            args = args,
+        )
+        return
+    if args.command == "catalog":
+        run_catalog_command(
+            args = args,
+        )
+        return
+    if args.command == "export":
+        run_export_command(
+            args = args,
+        )
+        return
+    if args.command == "ingest-bulk":
+        run_bulk_command(
+            args = args,
+        )
+        return
+    if args.command == "fetch":
+        run_fetch_command(
+            args = args,
+        )
+        return
+    if args.command == "ingest":
+        run_ingest_command(
+            args = args,
+        )
+        return
+
     # Reduce the verbosity of Flask / Dash
     if turn_off_logs:
         import logging
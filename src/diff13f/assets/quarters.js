@@ -0,0 +1,212 @@
+/*
+Rendering of the one quarter and two quarters figures in the browser (see
+generate_proportion_matrix and the clientside callbacks in app.py).
+
+The store "cik-data-store" holds the proportions of the holdings of the selected
+cik in all its quarters: a sparse matrix with dictionary-encoded names and base64
+typed arrays, sent once per cik. The top N of any quarter or pair of quarters is
+ranked here, so changing a quarter makes no request to the server. The layout
+of the figures is set by the constants below (FIG_HEIGHT and FIG_WIDTH are the
+same as in app.py) and by generate_default_figure for the empty figures.
+*/
+
+(function () {
+    const TOP_N = 20;
+    // Length of the names on the axis (longer names are truncated)
+    const MAX_CHARS = 30;
+    // Size of the figures (same as FIG_HEIGHT and FIG_WIDTH in app.py)
+    const FIG_HEIGHT = 520;
+    const FIG_WIDTH = 960;
+    const BAR_COLOR = "#00ffcc";
+
+    // Typed arrays of each matrix, decoded on its first use
+    const decoded = new WeakMap();
+
+    function decodeArray(text, type) {
+        const binary = atob(text);
+        const bytes = new Uint8Array(binary.length);
+        for (let i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        return new type(bytes.buffer);
+    }
+
+    function decode(data) {
+        let matrix = decoded.get(data);
+        if (!matrix) {
+            matrix = {
+                offsets: decodeArray(data.offsets, Int32Array),
+                codes: decodeArray(data.codes, data.codes_dtype === "uint16" ? Uint16Array : Uint32Array),
+                proportions: decodeArray(data.proportions, Float32Array),
+            };
+            decoded.set(data, matrix);
+        }
+        return matrix;
+    }
+
+    // Proportions of a quarter by code of name, in the order of the names
+    function quarterColumn(data, quarter) {
+        const column = new Map();
+        const i = data.quarters.indexOf(quarter);
+        if (i < 0) {
+            return column;
+        }
+        const matrix = decode(data);
+        for (let j = matrix.offsets[i]; j < matrix.offsets[i + 1]; j++) {
+            column.set(matrix.codes[j], matrix.proportions[j]);
+        }
+        return column;
+    }
+
+    // Descending order with NaN first, like the sort of Polars (stable for the ties)
+    function descending(a, b) {
+        if (Number.isNaN(a)) {
+            return Number.isNaN(b) ? 0 : -1;
+        }
+        if (Number.isNaN(b)) {
+            return 1;
+        }
+        return a === b ? 0 : (a < b ? 1 : -1);
+    }
+
+    function topN(entries) {
+        return entries.sort((a, b) => descending(a[1], b[1])).slice(0, TOP_N);
+    }
+
+    function truncate(name) {
+        return name.length <= MAX_CHARS ? name : name.slice(0, MAX_CHARS - 1) + "…";
+    }
+
+    // Same as generate_default_figure
+    function defaultFigure(template, title) {
+        return {
+            data: [],
+            layout: {
+                template: template,
+                title: {text: title},
+                plot_bgcolor: "black",
+                paper_bgcolor: "black",
+                font: {color: "white", family: "monospace"},
+                autosize: true,
+                height: FIG_HEIGHT,
+                width: FIG_WIDTH,
+            },
+        };
+    }
+
+    // Horizontal bar chart of the top N names, as built by px.bar in app.py
+    function barFigure(template, data, entries, trace, xTitle, title) {
+        const names = entries.map(([code]) => data.names[code] || "");
+        return {
+            data: [Object.assign({
+                customdata: names.map(name => [name]),
+                legendgroup: "",
+                marker: {color: BAR_COLOR, pattern: {shape: ""}},
+                name: "",
+                orientation: "h",
+                showlegend: false,
+                x: entries.map(([, value]) => value),
+                xaxis: "x",
+                y: names.map(truncate),
+                yaxis: "y",
+                type: "bar",
+            }, trace)],
+            layout: {
+                template: template,
+                xaxis: {anchor: "y", domain: [0, 1], title: {text: xTitle}},
+                yaxis: {anchor: "x", domain: [0, 1], title: {text: "Name"}, autorange: "reversed"},
+                legend: {tracegroupgap: 0},
+                margin: {t: 60, l: 40, r: 40, b: 40},
+                barmode: "relative",
+                title: {
+                    font: {family: "monospace", size: 20, color: "white"},
+                    text: title,
+                    x: 0.5,
+                    y: 0.95,
+                    xanchor: "center",
+                    yanchor: "top",
+                },
+                font: {family: "monospace", color: "white", size: 12},
+                autosize: true,
+                height: FIG_HEIGHT,
+                width: FIG_WIDTH,
+                plot_bgcolor: "black",
+                paper_bgcolor: "black",
+            },
+        };
+    }
+
+    // Top TOP_N proportions of a quarter, in the bar chart of barFigure
+    function oneQuarterFigure(template, data, quarter) {
+        if (!data || !quarter) {
+            return defaultFigure(template, data ? "Select a quarter" : "Select a CIK");
+        }
+        const entries = topN(Array.from(quarterColumn(data, quarter)));
+        return barFigure(
+            template,
+            data,
+            entries,
+            {textposition: "outside", hovertemplate: "<b>%{customdata[0]}</b><br>%{x:.2f}%"},
+            "Percentage",
+            `Top ${TOP_N} Holdings for ${quarter}`,
+        );
+    }
+
+    // Top TOP_N ratios of the proportions from quarter0 to quarter1, in the bar chart of barFigure
+    function twoQuartersFigure(template, data, quarter0, quarter1) {
+        if (quarter0 === quarter1) {
+            const value = quarter0 === null || quarter0 === undefined ? "None" : quarter0;
+            return defaultFigure(template, `Both dropdown have the value ${value}. Select two different quarters to compare`);
+        }
+        if (!data) {
+            return defaultFigure(template, "Select a CIK");
+        }
+        // Ratios of the names held in both quarters
+        const column0 = quarterColumn(data, quarter0);
+        const entries = [];
+        for (const [code, proportion1] of quarterColumn(data, quarter1)) {
+            if (column0.has(code)) {
+                entries.push([code, proportion1 / column0.get(code)]);
+            }
+        }
+        return barFigure(
+            template,
+            data,
+            topN(entries),
+            {
+                textposition: "auto",
+                textfont: {color: "white", family: "monospace"},
+                hovertemplate: "<b>%{customdata[0]}</b><br>Ratio : %{x:.2f}",
+            },
+            `Variation ${quarter0}→${quarter1}`,
+            `Top ${TOP_N} proportion ratios from ${quarter0} to ${quarter1}`,
+        );
+    }
+
+    function render(tab, shownTab, data, quarters, rendered, figure, build) {
+        // Only the figure of the tab shown is rendered: the graph of a hidden tab stays stale
+        if (tab !== shownTab) {
+            throw window.dash_clientside.PreventUpdate;
+        }
+        // Nothing to do if the graph already shows this figure (same cik, store version and quarters)
+        const key = JSON.stringify([data ? data.cik : null, data ? data.version : null, ...quarters]);
+        if (key === rendered) {
+            throw window.dash_clientside.PreventUpdate;
+        }
+        // Keep the template of the figures rendered by the server
+        const template = figure && figure.layout ? figure.layout.template : undefined;
+        return [build(template), key];
+    }
+
+    window.dash_clientside = window.dash_clientside || {};
+    window.dash_clientside.diff13f = {
+        renderOneQuarter: function (tab, data, quarter, rendered, figure) {
+            return render(tab, "one-quarter", data, [quarter], rendered, figure,
+                template => oneQuarterFigure(template, data, quarter));
+        },
+        renderTwoQuarters: function (tab, data, quarter0, quarter1, rendered, figure) {
+            return render(tab, "two-quarters", data, [quarter0, quarter1], rendered, figure,
+                template => twoQuartersFigure(template, data, quarter0, quarter1));
+        },
+    };
+})();
@@ -0,0 +1,156 @@
+/*
+Chunked and resumable upload of the 13F txt files (see register_upload_routes in app.py).
+
+Each selected file is sent by chunks to the upload route of the server. An
+interrupted upload resumes from the number of bytes already received: the id
+of an upload only depends on the name, size and date of the file. The server
+parses each complete file right away, then the store "upload-store" is set to
+start the update of the outputs (background callback handle_upload).
+*/
+
+(function () {
+    const UPLOAD_ROUTE = "/_diff13f/upload";
+    // Number of attempts of a chunk before giving up
+    const MAX_ATTEMPTS = 5;
+    // Share of the progress bar covered by the upload (same as the 'parse' stage of INGEST_PROGRESS_STAGES)
+    const UPLOAD_PROGRESS_END = 70;
+
+    let controller = null;
+    let uploading = false;
+
+    // Style of the progress bar (same as import_progress_style in app.py)
+    function progressStyle(visible) {
+        return {
+            display: visible ? "flex" : "none",
+            alignItems: "center",
+            width: "300px",
+            height: "40px",
+            marginRight: "20px",
+        };
+    }
+
+    function setProgress(value, label) {
+        dash_clientside.set_props("import-progress", {value: value, label: label});
+    }
+
+    // Hash of a string (53 bits), used for the id of the uploads
+    function hashString(text) {
+        let h1 = 0xdeadbeef, h2 = 0x41c6ce57;
+        for (let i = 0; i < text.length; i++) {
+            const c = text.charCodeAt(i);
+            h1 = Math.imul(h1 ^ c, 2654435761);
+            h2 = Math.imul(h2 ^ c, 1597334677);
+        }
+        h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+        h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+        return (4294967296 * (2097151 & h2) + (h1 >>> 0)).toString(16);
+    }
+
+    function uploadId(file) {
+        return `${hashString(`${file.name}/${file.lastModified}`)}-${file.size}`;
+    }
+
+    function uploadUrl(file, params) {
+        const query = new URLSearchParams({name: file.name, ...params});
+        return `${UPLOAD_ROUTE}/${uploadId(file)}?${query}`;
+    }
+
+    async function getStatus(file) {
+        const response = await fetch(uploadUrl(file, {}), {signal: controller.signal});
+        if (!response.ok) {
+            throw new Error(`status of ${file.name}: HTTP ${response.status}`);
+        }
+        return response.json();
+    }
+
+    async function uploadFile(file, onBytes) {
+        // Resume from the bytes already received by the server
+        let status = await getStatus(file);
+        let attempts = 0;
+        while (!status.complete) {
+            const offset = status.received;
+            const chunk = file.slice(offset, offset + status.chunk_size);
+            try {
+                const response = await fetch(uploadUrl(file, {offset: offset, size: file.size}), {
+                    method: "PUT",
+                    body: chunk,
+                    signal: controller.signal,
+                });
+                // 409: the server has another offset, resume from it
+                if (!response.ok && response.status !== 409) {
+                    throw new Error(`upload of ${file.name}: HTTP ${response.status}`);
+                }
+                status = await response.json();
+                attempts = 0;
+            } catch (error) {
+                if (controller.signal.aborted || ++attempts >= MAX_ATTEMPTS) {
+                    throw error;
+                }
+                // Wait before the next attempt, then ask the server where to resume
+                await new Promise(resolve => setTimeout(resolve, 500 * 2 ** attempts));
+                status = await getStatus(file);
+            }
+            onBytes(status.received);
+        }
+    }
+
+    async function uploadFiles(files) {
+        controller = new AbortController();
+        const totalBytes = files.reduce((total, file) => total + file.size, 0);
+        let doneBytes = 0;
+        uploading = true;
+        dash_clientside.set_props("import-progress-div", {style: progressStyle(true)});
+        try {
+            for (const [i, file] of files.entries()) {
+                const report = received => setProgress(
+                    UPLOAD_PROGRESS_END * (doneBytes + received) / Math.max(totalBytes, 1),
+                    `Uploading file ${i + 1}/${files.length}`,
+                );
+                report(0);
+                await uploadFile(file, report);
+                doneBytes += file.size;
+            }
+        } catch (error) {
+            console.error(error);
+            dash_clientside.set_props("import-progress-div", {style: progressStyle(false)});
+            if (!controller.signal.aborted) {
+                window.alert(`The upload failed (${error.message}). Import the files again to resume it.`);
+            }
+            return;
+        } finally {
+            uploading = false;
+        }
+        // Start the update of the outputs once all the files are uploaded
+        dash_clientside.set_props("upload-store", {
+            data: {
+                upload_ids: files.map(uploadId),
+                filenames: files.map(file => file.name),
+                timestamp: Date.now(),
+            },
+        });
+    }
+
+    // Open a file selector from the import button (unless an import is running)
+    function selectFiles() {
+        const input = document.createElement("input");
+        input.type = "file";
+        input.multiple = true;
+        input.accept = ".txt,.zip,.tar,.gz,.tgz,.bz2,.tbz2,.xz,.txz";
+        input.addEventListener("change", () => {
+            if (input.files.length) {
+                uploadFiles(Array.from(input.files));
+            }
+        });
+        input.click();
+    }
+
+    document.addEventListener("click", event => {
+        const selector = event.target.closest("#file-upload-selector");
+        if (selector && !uploading && !selector.classList.contains("import-running")) {
+            selectFiles();
+        }
+        if (controller && event.target.closest("#import-cancel-button")) {
+            controller.abort();
+        }
+    });
+})();